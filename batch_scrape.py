@@ -0,0 +1,110 @@
+"""Ejecuta el scraper sobre páginas de Prydwen guardadas, en paralelo y sin red.
+
+Sirve para volver a pasar el parser por un mes de páginas archivadas (comprobar un
+cambio de parsing, reconstruir el historial...). Escribe un JSON por página (JSON
+Lines) en stdout o en --output, y el informe de rendimiento en stderr.
+
+Uso:
+    python batch_scrape.py paginas/ [--workers 8] [--output snapshots.jsonl]
+    python batch_scrape.py "archivo/2025-*/*.html" otra_pagina.html
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# El bot registra en stdout, que aquí está reservado para el JSON Lines
+_stdout, sys.stdout = sys.stdout, sys.stderr
+try:
+    import bot
+finally:
+    sys.stdout = _stdout
+
+HTML_EXTENSIONS = ('.html', '.htm')
+
+def expand_inputs(inputs):
+    """Directorios (recursivos), patrones glob y ficheros sueltos, sin duplicados y ordenados"""
+    paths = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, _, files in os.walk(entry):
+                paths.update(os.path.join(root, name) for name in files if name.lower().endswith(HTML_EXTENSIONS))
+        elif os.path.isfile(entry):
+            paths.add(entry)
+        else:
+            paths.update(path for path in glob.glob(entry, recursive=True) if os.path.isfile(path))
+    return sorted(paths)
+
+def configure_worker(verbose):
+    logging.getLogger(bot.__name__).setLevel(logging.INFO if verbose else logging.WARNING)
+
+def scrape_file(path):
+    """Un registro por página: el snapshot completo o el error que impidió sacarlo"""
+    start = time.perf_counter()
+    record = {'file': path}
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            chunks = iter(lambda: f.read(bot.STREAM_CHUNK_SIZE), '')
+            snapshot = bot.scraper.build_snapshot(bot.iter_accordion_items_from_chunks(chunks), source=path)
+        # La fecha de la página archivada es la de su fichero, no la de ahora
+        snapshot.fetched_at = datetime.fromtimestamp(os.path.getmtime(path))
+        record['snapshot'] = snapshot.to_dict()
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scraper por lotes sobre páginas HTML guardadas")
+    arg_parser.add_argument('inputs', nargs='+', help="Directorios, patrones glob o ficheros HTML")
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    arg_parser.add_argument('--output', help="Fichero JSON Lines (por defecto, stdout)")
+    arg_parser.add_argument('--chunksize', type=int, default=4, help="Páginas por envío a cada proceso")
+    arg_parser.add_argument('--verbose', action='store_true', help="Incluir el registro del scraper en stderr")
+    args = arg_parser.parse_args()
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("❌ No se encontró ninguna página HTML", file=sys.stderr)
+        sys.exit(1)
+
+    configure_worker(args.verbose)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    totals = {'pages': 0, 'errors': 0, 'banners': 0, 'endgame': 0, 'bytes': 0}
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=configure_worker,
+                                 initargs=(args.verbose,)) as executor:
+            # map conserva el orden de entrada y entrega cada resultado en cuanto le toca
+            for record in executor.map(scrape_file, paths, chunksize=args.chunksize):
+                output.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                output.flush()
+
+                totals['pages'] += 1
+                totals['bytes'] += os.path.getsize(record['file'])
+                if 'error' in record:
+                    totals['errors'] += 1
+                    print(f"⚠️ {record['file']}: {record['error']}", file=sys.stderr)
+                else:
+                    totals['banners'] += len(record['snapshot']['banners'])
+                    totals['endgame'] += len(record['snapshot']['endgame'])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"📊 {totals['pages']} páginas ({totals['bytes'] / 1024 / 1024:.1f} MiB) en {elapsed:.2f}s "
+        f"con {args.workers} procesos → {totals['pages'] / elapsed:.1f} páginas/s · "
+        f"{totals['banners']} banners, {totals['endgame']} End Game, {totals['errors']} errores",
+        file=sys.stderr
+    )
+
+if __name__ == "__main__":
+    main()
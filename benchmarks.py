@@ -0,0 +1,642 @@
+"""Benchmarks del bot de HSR.
+
+Uso:
+    python benchmarks.py stream [--html pagina.html] [--chunk 16384]
+    python benchmarks.py hedge [--primary-latency 6] [--primary-down]
+    python benchmarks.py search [--iterations 2000]
+    python benchmarks.py subscriptions [--users 20000] [--per-user 3] [--channels 5] [--featured 4]
+    python benchmarks.py archive [--fetches 30] [--variants 3] [--max-mb 1]
+    python benchmarks.py warps [--pulls 160] [--pity 0] [--guaranteed] [--runs 200000]
+    python benchmarks.py reruns [--rows 1000000] [--iterations 20]
+    python benchmarks.py memory [--guilds 500] [--messages 20]
+"""
+import argparse
+import asyncio
+import difflib
+import gc
+import http.server
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import bot
+
+# Los benchmarks no necesitan el detalle de cada banner
+logging.getLogger(bot.__name__).setLevel(logging.WARNING)
+
+# ============================================
+# PÁGINA DE EJEMPLO
+# ============================================
+SAMPLE_CHARACTERS = [
+    ('kafka', 'Lightning'), ('firefly', 'Fire'), ('acheron', 'Lightning'),
+    ('robin', 'Physical'), ('blade', 'Wind'), ('ruan-mei', 'Ice'),
+]
+
+def build_sample_event(index, character_key, element):
+    """Genera un accordion-item con la misma estructura que los warps de Prydwen"""
+    warp = bot.scraper.real_warps[index % len(bot.scraper.real_warps)]
+    return (
+        '<div class="accordion-item">'
+        '<h2 class="accordion-header"><button class="accordion-button">'
+        f'<div class="event-name">{warp} {index}</div>'
+        '<span class="time">12d 5h</span>'
+        '</button></h2>'
+        '<div class="accordion-collapse"><div class="accordion-body">'
+        '<p class="duration">Event Duration 2025/01/01 12:00 - 2099/01/22 15:00</p>'
+        '<p class="featured">Featured <span class="hsr-rar rar-5">5★</span> character:</p>'
+        '<div class="featured-characters">'
+        f'<div class="avatar-card rarity-5"><a href="/star-rail/characters/{character_key}">'
+        f'<span class="floating-element"><img alt="{element}" src="x.png"/></span>'
+        '<img src="avatar.webp" alt="avatar"/></a></div>'
+        '</div>'
+        '<p class="featured">Featured <span class="hsr-rar rar-4">4★</span> characters:</p>'
+        '<div class="featured-characters">'
+        '<div class="avatar-card rarity-4"><a href="/star-rail/characters/pela"></a></div>'
+        '<div class="avatar-card rarity-4"><a href="/star-rail/characters/asta"></a></div>'
+        '</div>'
+        '</div></div></div>'
+    )
+
+def build_sample_endgame(mode, version):
+    return (
+        '<div class="accordion-item">'
+        f'<div class="event-name">{mode} ({version})</div>'
+        '<span class="time">20d 10h</span>'
+        '<p class="duration">Event Duration 2025/01/01 04:00 - 2099/02/01 04:00</p>'
+        '</div>'
+    )
+
+def build_sample_page(events=12, filler_kb=600):
+    """Página completa: cabecera, sección de eventos y un resto pesado (guías, tier lists...)"""
+    items = [
+        build_sample_event(i, *SAMPLE_CHARACTERS[i % len(SAMPLE_CHARACTERS)])
+        for i in range(events)
+    ]
+    items.extend(
+        build_sample_endgame(mode, '3.1')
+        for mode in bot.scraper.endgame_modes
+    )
+    filler_block = '<div class="tier-card"><a href="/star-rail/characters/x"><span>Guía</span></a></div>'
+    filler = filler_block * (filler_kb * 1024 // len(filler_block))
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Prydwen</title></head><body>'
+        '<div id="___gatsby"><nav class="top-nav">Menú</nav>'
+        '<div class="event-tracker"><div class="accordion">'
+        + ''.join(items) +
+        '</div></div>'
+        f'<div class="content">{filler}</div>'
+        '</div></body></html>'
+    )
+
+def iter_text_chunks(text, chunk_size):
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+# ============================================
+# SERVIDORES LOCALES DE SUSTITUCIÓN
+# ============================================
+class StandInServer:
+    """Servidor HTTP local que sirve una página con latencia y estado configurables"""
+
+    def __init__(self, page, latency=0.0, status=200):
+        self.page = page.encode('utf-8')
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.requests += 1
+                time.sleep(standin.latency)
+                self.send_response(standin.status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(standin.page)))
+                self.end_headers()
+                self.wfile.write(standin.page)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/star-rail/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ============================================
+# BENCHMARK: PARSER INCREMENTAL VS ÁRBOL COMPLETO
+# ============================================
+def measure(label, run):
+    """Ejecuta run(on_first) y devuelve (tiempo total, tiempo al primer banner, pico de memoria)"""
+    first_banner = []
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    def on_first():
+        if not first_banner:
+            first_banner.append(time.perf_counter() - start)
+
+    banners = run(on_first)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<22} banners={len(banners):<3} total={total * 1000:8.1f} ms  "
+          f"primer banner={first_banner[0] * 1000 if first_banner else float('nan'):8.1f} ms  "
+          f"pico={peak / 1024 / 1024:7.2f} MiB")
+    return total, first_banner[0] if first_banner else None, peak
+
+def bench_stream(args):
+    if args.html:
+        with open(args.html, 'r', encoding='utf-8') as f:
+            page = f.read()
+    else:
+        page = build_sample_page()
+    print(f"Página: {len(page.encode('utf-8')) / 1024:.0f} KiB, trozos de {args.chunk} caracteres")
+
+    scraper = bot.scraper
+
+    def full_tree(on_first):
+        soup = BeautifulSoup(page, 'html.parser')
+        banners = []
+        for banner in scraper.iter_banners(soup.find_all('div', class_='accordion-item')):
+            on_first()
+            banners.append(banner)
+        return banners
+
+    def streaming(on_first):
+        items = bot.iter_accordion_items_from_chunks(iter_text_chunks(page, args.chunk))
+        banners = []
+        for banner in scraper.iter_banners(items):
+            on_first()
+            banners.append(banner)
+        return banners
+
+    full_total, full_first, full_peak = measure("Árbol completo", full_tree)
+    stream_total, stream_first, stream_peak = measure("Incremental", streaming)
+
+    print(f"Reducción de pico de memoria: {(1 - stream_peak / full_peak) * 100:.1f}%")
+    if full_first and stream_first:
+        print(f"Primer banner {full_first / stream_first:.1f}x antes, total {full_total / stream_total:.1f}x más rápido")
+
+# ============================================
+# BENCHMARK: PETICIONES CON COBERTURA
+# ============================================
+def bench_hedge(args):
+    page = build_sample_page(filler_kb=50)
+    # Al espejo le falta el tiempo restante del primer banner: la combinación lo completa
+    mirror_page = page.replace('<span class="time">12d 5h</span>', '', 1)
+
+    with StandInServer(page, latency=args.primary_latency,
+                       status=503 if args.primary_down else 200) as primary, \
+         StandInServer(mirror_page, latency=args.mirror_latency) as mirror:
+        scraper = bot.BannerScraper()
+        scraper.sources = [
+            bot.HtmlBannerSource(scraper, "prydwen", primary.url),
+            bot.HtmlBannerSource(scraper, "espejo1", mirror.url),
+        ]
+        scraper.fetcher = bot.HedgedFetcher(scraper.sources)
+
+        # Calentar el histograma de latencias de la fuente principal
+        primary.latency = args.warm_latency
+        primary.status = 200
+        for _ in range(args.warmup):
+            scraper.fetch_snapshot()
+        print(f"Retardo de cobertura (p{bot.HEDGE_PERCENTILE * 100:.0f}): "
+              f"{scraper.fetcher.hedge_delay(scraper.sources[0]):.2f}s")
+
+        # Una fuente caída responde al momento con error: se conmuta sin esperar
+        primary.latency = 0.0 if args.primary_down else args.primary_latency
+        primary.status = 503 if args.primary_down else 200
+        start = time.perf_counter()
+        snapshot = scraper.fetch_snapshot()
+        elapsed = time.perf_counter() - start
+
+        print(f"Fuente: {snapshot.source}  banners={len(snapshot.banners)}  "
+              f"End Game={len(snapshot.endgame)}  tiempo={elapsed:.2f}s  "
+              f"(principal: {args.primary_latency:.1f}s{' caída' if args.primary_down else ''})")
+        print(f"Tiempo restante del primer banner: {snapshot.banners[0].time_remaining}")
+
+# ============================================
+# BENCHMARK: BÚSQUEDA DE PERSONAJES
+# ============================================
+SEARCH_QUERIES = [
+    "Firefy", "Imbibitor", "kafk", "silverwolf", "Dr Ratio", "ruan mei",
+    "acheorn", "topaz", "blade", "Jing yuan", "the herta", "sparkel",
+]
+
+def bench_search(args):
+    index = bot.CATALOG.search_index
+    names = [c['name'] for c in index.characters] + [c['id'] for c in index.characters]
+
+    def run_index():
+        return [index.search(q) for q in SEARCH_QUERIES]
+
+    def run_difflib():
+        return [difflib.get_close_matches(q, names, n=3, cutoff=0.3) for q in SEARCH_QUERIES]
+
+    for label, run in (("Índice de trigramas", run_index), ("difflib (fuerza bruta)", run_difflib)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            results = run()
+        elapsed = time.perf_counter() - start
+        per_query = elapsed / (args.iterations * len(SEARCH_QUERIES))
+        print(f"{label:<24} {per_query * 1e6:8.1f} µs/consulta")
+
+    print()
+    for query, index_result, difflib_result in zip(SEARCH_QUERIES, run_index(), run_difflib()):
+        best = index_result[0][0]['name'] if index_result else "-"
+        print(f"{query:<12} índice: {best:<28} difflib: {difflib_result[0] if difflib_result else '-'}")
+
+# ============================================
+# BENCHMARK: AVISOS A SUSCRIPTORES
+# ============================================
+def bench_subscriptions(args):
+    character_ids = [c['id'] for c in bot.CATALOG.characters]
+    channel_ids = [100 + i for i in range(args.channels)]
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "subscriptions.jsonl")
+        store = bot.SubscriptionStore(path)
+
+        start = time.perf_counter()
+        for user_id in range(10 ** 17, 10 ** 17 + args.users):
+            for character_id in rng.sample(character_ids, args.per_user):
+                store.subscribe(user_id, character_id, rng.choice(channel_ids))
+        subscribe_time = time.perf_counter() - start
+        total = sum(len(subscribers) for subscribers in store.by_character.values())
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        reloaded = bot.SubscriptionStore(path)
+        load_time = time.perf_counter() - start
+        assert reloaded.by_character == store.by_character
+
+    print(f"Suscripciones: {total} ({args.users} usuarios) en {subscribe_time * 1000:.0f} ms, "
+          f"con escritura en disco → {subscribe_time / total * 1e6:.1f} µs/suscripción")
+    print(f"Cargar el diario: {load_time * 1000:.0f} ms ({size / 1024:.0f} KiB)")
+
+    # Los personajes con más suscriptores son el peor caso del reparto
+    featured = sorted(store.by_character, key=lambda c: len(store.by_character[c]), reverse=True)[:args.featured]
+    start = time.perf_counter()
+    plan = store.plan_notifications(featured)
+    messages = [
+        content
+        for (channel_id, character_id), user_ids in plan.items()
+        for content in bot.chunk_mentions(f"🔔 **{character_id}** ya tiene banner:", user_ids)
+    ]
+    fanout_time = time.perf_counter() - start
+    notified = sum(len(user_ids) for user_ids in plan.values())
+
+    print(f"Reparto: {len(featured)} personajes nuevos, {notified} suscriptores, {len(plan)} grupos canal/personaje "
+          f"→ {len(messages)} mensajes en {fanout_time * 1000:.1f} ms "
+          f"(un aviso por usuario serían {notified} llamadas)")
+    assert all(len(content) <= bot.MENTION_MESSAGE_LIMIT for content in messages)
+
+# ============================================
+# BENCHMARK: ARCHIVO DE PÁGINAS
+# ============================================
+def bench_archive(args):
+    # Varias versiones de la página que se repiten, como entre dos cambios de Prydwen
+    pages = [build_sample_page(events=12 + variant) for variant in range(args.variants)]
+
+    with tempfile.TemporaryDirectory() as directory, StandInServer(pages[0]) as server:
+        archive = bot.PageArchive(directory, max_bytes=args.max_mb * 1024 * 1024)
+        scraper = bot.BannerScraper(archive=archive)
+        scraper.sources = [bot.HtmlBannerSource(scraper, "prydwen", server.url)]
+        scraper.fetcher = bot.HedgedFetcher(scraper.sources)
+
+        live = []
+        start = time.perf_counter()
+        for fetch in range(args.fetches):
+            server.page = pages[fetch % len(pages)].encode('utf-8')
+            live.append(scraper.fetch_snapshot())
+        fetch_time = time.perf_counter() - start
+
+        read_bytes = sum(entry['size'] for entry in archive.entries)
+        print(f"Descargas: {args.fetches} en {fetch_time:.2f}s · índice: {len(archive.entries)} entradas, "
+              f"{len(archive.sizes)} objetos, {archive.total_bytes / 1024:.0f} KiB en disco "
+              f"para {read_bytes / 1024:.0f} KiB leídos")
+
+        start = time.perf_counter()
+        replayed = [archive.replay(entry, scraper) for entry in archive.entries]
+        replay_time = time.perf_counter() - start
+        print(f"Reproducción: {len(replayed)} páginas en {replay_time:.2f}s → {len(replayed) / replay_time:.1f} páginas/s")
+
+        # Las entradas que sobreviven a la retención son las más recientes
+        def parsed(snapshot):
+            data = snapshot.to_dict()
+            return data['banners'], data['endgame']
+
+        for original, copy in zip(live[-len(replayed):], replayed):
+            assert parsed(original) == parsed(copy)
+        print("Snapshots reproducidos idénticos a los originales ✅")
+
+# ============================================
+# BENCHMARK: PROBABILIDADES DE WARP
+# ============================================
+def simulate_warps_python(pulls, pity, guaranteed, runs, rng):
+    """Referencia: la misma simulación tirada a tirada en Python puro"""
+    rates = bot.FIVE_STAR_RATES.tolist()
+    copies = [0] * (bot.WARP_MAX_COPIES + 1)
+    for _ in range(runs):
+        current, is_guaranteed, won = pity, guaranteed, 0
+        for _ in range(pulls):
+            if rng.random() < rates[current]:
+                if is_guaranteed or rng.random() < bot.WARP_FEATURED_RATE:
+                    won += 1
+                    is_guaranteed = False
+                else:
+                    is_guaranteed = True
+                current = 0
+            else:
+                current += 1
+        copies[min(won, bot.WARP_MAX_COPIES)] += 1
+    return [count / runs for count in copies]
+
+def bench_warps(args):
+    start = time.perf_counter()
+    exact = bot.warp_copies_distribution(args.pulls, args.pity, args.guaranteed)
+    exact_time = time.perf_counter() - start
+    print(f"Cálculo exacto: {args.pulls} tiradas en {exact_time * 1000:.1f} ms → P(≥1) = {1 - exact[0]:.4%}")
+
+    python_runs = max(1, args.runs // 100)
+    start = time.perf_counter()
+    reference = simulate_warps_python(args.pulls, args.pity, args.guaranteed, python_runs, random.Random(1))
+    python_time = time.perf_counter() - start
+    python_rate = python_runs * args.pulls / python_time
+
+    start = time.perf_counter()
+    simulated = bot.simulate_warps(args.pulls, args.pity, args.guaranteed, args.runs, bot.np.random.default_rng(1))
+    numpy_time = time.perf_counter() - start
+    numpy_rate = args.runs * args.pulls / numpy_time
+
+    print(f"Monte Carlo en Python: {python_runs} simulaciones → {python_rate / 1e6:.2f} M tiradas/s, P(≥1) = {1 - reference[0]:.4%}")
+    print(f"Monte Carlo por lotes: {args.runs} simulaciones en {numpy_time:.2f}s → {numpy_rate / 1e6:.1f} M tiradas/s "
+          f"({numpy_rate / python_rate:.0f}x), P(≥1) = {1 - simulated[0]:.4%}")
+    print(f"Mayor diferencia con el exacto: {abs(bot.np.array(exact) - simulated).max():.4%}")
+
+    bot.warp_odds.cache_clear()
+    start = time.perf_counter()
+    bot.warp_odds(args.pulls, args.pity, args.guaranteed)
+    cold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        bot.warp_odds(args.pulls, args.pity, args.guaranteed)
+    cached_time = (time.perf_counter() - start) / 1000
+    print(f"Consulta del comando: {cold_time * 1000:.0f} ms la primera vez, {cached_time * 1e6:.2f} µs desde la caché")
+
+# ============================================
+# BENCHMARK: HISTORIAL DE RERUNS
+# ============================================
+def bench_reruns(args):
+    rng = bot.np.random.default_rng(1)
+    character_ids = sorted({c['id'] for c in bot.CATALOG.characters})
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = bot.BannerHistory(os.path.join(directory, "banner_history.npz"))
+        history.characters = list(character_ids)
+        history.char_codes = {char_id: code for code, char_id in enumerate(history.characters)}
+        history.banners = [f"banner{i}" for i in range(args.rows // 4)]
+        # Apariciones sintéticas: un banner de 21 días cada tanto durante años
+        history.char = rng.integers(0, len(character_ids), args.rows).astype(bot.np.int16)
+        history.banner = (bot.np.arange(args.rows) // 4).astype(bot.np.int32)
+        history.start = bot.np.sort(rng.integers(1_600_000_000, 1_760_000_000, args.rows))
+        history.end = history.start + 21 * 86400
+
+        start = time.perf_counter()
+        history.save()
+        save_time = time.perf_counter() - start
+        size = os.path.getsize(history.path)
+        start = time.perf_counter()
+        reloaded = bot.BannerHistory(history.path)
+        load_time = time.perf_counter() - start
+        print(f"Historial: {args.rows} apariciones → {size / 1024:.0f} KiB en disco, "
+              f"guardar {save_time * 1000:.0f} ms, cargar {load_time * 1000:.0f} ms")
+
+        nihility = sorted({c['id'] for c in bot.CATALOG.characters if c['path'] == 'Nihility'})
+        for label, char_ids in (("todos", None), ("vía Nihility", nihility), ("un personaje", character_ids[:1])):
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                vectorized = reloaded.summary(char_ids)
+            vectorized_time = (time.perf_counter() - start) / args.iterations
+
+            # Referencia: el mismo agregado recorriendo las filas en Python
+            start = time.perf_counter()
+            now = int(time.time())
+            wanted = set(char_ids or character_ids)
+            counts, last_end = {}, {}
+            for char, row_start, row_end in zip(reloaded.char.tolist(), reloaded.start.tolist(), reloaded.end.tolist()):
+                char_id = reloaded.characters[char]
+                if char_id in wanted and row_start <= now:
+                    counts[char_id] = counts.get(char_id, 0) + 1
+                    last_end[char_id] = max(last_end.get(char_id, 0), row_end)
+            python_time = time.perf_counter() - start
+
+            assert {r['char_id']: r['appearances'] for r in vectorized} == counts
+            print(f"Consulta {label}: {vectorized_time * 1000:.2f} ms vectorizada vs "
+                  f"{python_time * 1000:.1f} ms en Python ({python_time / vectorized_time:.0f}x)")
+
+# ============================================
+# BENCHMARK: MEMORIA POR PERFIL DE DISCORD.PY
+# ============================================
+def resident_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def synthetic_guild(guild_id, intents, rng, channels=30, threads=10, roles=40, emojis=50, voice=10):
+    """GUILD_CREATE tal como lo enviaría el gateway con esos intents"""
+    def member(user_id):
+        return {
+            'user': {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0', 'avatar': None, 'global_name': None},
+            'roles': [str(guild_id + 1 + rng.randrange(roles))], 'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False, 'mute': False, 'flags': 0
+        }
+
+    voice_users = [guild_id + 100_000 + i for i in range(voice)] if intents.voice_states else []
+    return {
+        'id': str(guild_id), 'name': f"Servidor {guild_id}", 'icon': None, 'owner_id': str(guild_id + 1),
+        'member_count': 5000, 'large': True, 'features': [], 'premium_tier': 0, 'verification_level': 0,
+        'default_message_notifications': 0, 'explicit_content_filter': 0, 'mfa_level': 0, 'nsfw_level': 0,
+        'afk_timeout': 300, 'preferred_locale': 'es-ES', 'system_channel_flags': 0,
+        'roles': [
+            {'id': str(guild_id + 1 + i), 'name': f"rol {i}", 'permissions': '0', 'position': i, 'color': 0,
+             'hoist': False, 'managed': False, 'mentionable': False}
+            for i in range(roles)
+        ],
+        'emojis': [
+            {'id': str(guild_id + 1000 + i), 'name': f"emoji{i}", 'roles': [], 'require_colons': True,
+             'managed': False, 'animated': False, 'available': True}
+            for i in range(emojis)
+        ],
+        'stickers': [],
+        'channels': [
+            {'id': str(guild_id + 2000 + i), 'type': 15 if i % 10 == 0 else 0, 'name': f"canal-{i}", 'position': i,
+             'permission_overwrites': [], 'parent_id': None, 'topic': "Canal de pruebas", 'nsfw': False,
+             'rate_limit_per_user': 0, 'available_tags': [], 'flags': 0}
+            for i in range(channels)
+        ],
+        'threads': [
+            {'id': str(guild_id + 3000 + i), 'type': 11, 'parent_id': str(guild_id + 2000), 'owner_id': str(guild_id + 1),
+             'name': f"hilo {i}", 'message_count': 1, 'member_count': 1, 'rate_limit_per_user': 0, 'flags': 0,
+             'thread_metadata': {'archived': False, 'auto_archive_duration': 10080, 'locked': False,
+                                 'archive_timestamp': '2024-01-01T00:00:00+00:00'}}
+            for i in range(threads)
+        ],
+        'voice_states': [
+            {'user_id': str(user_id), 'channel_id': str(guild_id + 2001), 'session_id': 'x', 'deaf': False, 'mute': False,
+             'self_deaf': False, 'self_mute': False, 'self_video': False, 'suppress': False,
+             'request_to_speak_timestamp': None}
+            for user_id in voice_users
+        ],
+        'members': [member(BENCH_BOT_ID)] + [member(user_id) for user_id in voice_users],
+        'presences': []
+    }
+
+def synthetic_message(message_id, guild_id, intents, rng):
+    author_id = guild_id + 200_000 + rng.randrange(5000)
+    return {
+        'id': str(message_id), 'channel_id': str(guild_id + 2001 + rng.randrange(29)), 'guild_id': str(guild_id), 'type': 0,
+        'author': {'id': str(author_id), 'username': f"user{author_id}", 'discriminator': '0', 'avatar': None, 'global_name': None},
+        'member': {'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0},
+        'content': ("¿Cuándo vuelve Kafka? " * 6) if intents.message_content else "",
+        'timestamp': '2025-01-01T00:00:00+00:00', 'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+        'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'flags': 0
+    }
+
+BENCH_BOT_ID = 10 ** 15
+
+async def measure_profile(profile, guilds, messages):
+    """Alimenta el estado de discord.py con el tráfico de N servidores y mide cuánto retiene"""
+    import discord
+
+    client = discord.Client(**bot.bot_client_options(profile))
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data={
+        'id': str(BENCH_BOT_ID), 'username': 'bot', 'discriminator': '0', 'avatar': None, 'bot': True
+    })
+    intents = state._intents
+    rng = random.Random(1)
+
+    gc.collect()
+    before = resident_bytes()
+    message_id = 10 ** 17
+    for index in range(guilds):
+        guild_id = (index + 1) * 10 ** 9
+        state.parse_guild_create(synthetic_guild(guild_id, intents, rng))
+        if intents.guild_messages:
+            for _ in range(messages):
+                message_id += 1
+                state.parse_message_create(synthetic_message(message_id, guild_id, intents, rng))
+    gc.collect()
+    retained = resident_bytes() - before
+
+    return {
+        'profile': profile,
+        'rss_per_guild': retained / guilds,
+        'rss_total': retained,
+        'messages': len(client.cached_messages),
+        'members': sum(len(guild.members) for guild in client.guilds),
+        'emojis': len(client.emojis)
+    }
+
+def bench_memory(args):
+    if args.child:
+        print(json.dumps(asyncio.run(measure_profile(args.child, args.guilds, args.messages))))
+        return
+
+    # Un proceso por perfil: el RSS de uno no debe contaminar al otro
+    results = []
+    for profile in ('default', 'lean'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'memory', '--child', profile,
+             '--guilds', str(args.guilds), '--messages', str(args.messages)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for result in results:
+        print(f"{result['profile']:>8}: {result['rss_per_guild'] / 1024:.1f} KiB/servidor "
+              f"({result['rss_total'] / 1024 / 1024:.1f} MiB en {args.guilds} servidores) · "
+              f"{result['messages']} mensajes, {result['members']} miembros, {result['emojis']} emojis en caché")
+    default, lean = results
+    print(f"El perfil lean retiene {(1 - lean['rss_total'] / max(default['rss_total'], 1)):.0%} menos memoria")
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmarks del bot de HSR")
+    subparsers = arg_parser.add_subparsers(dest='benchmark', required=True)
+
+    stream_parser = subparsers.add_parser('stream', help="Parser incremental vs BeautifulSoup completo")
+    stream_parser.add_argument('--html', help="Página de Prydwen guardada (por defecto, una página sintética)")
+    stream_parser.add_argument('--chunk', type=int, default=bot.STREAM_CHUNK_SIZE)
+    stream_parser.set_defaults(func=bench_stream)
+
+    hedge_parser = subparsers.add_parser('hedge', help="Cobertura y conmutación entre fuentes locales")
+    hedge_parser.add_argument('--primary-latency', type=float, default=6.0)
+    hedge_parser.add_argument('--primary-down', action='store_true')
+    hedge_parser.add_argument('--mirror-latency', type=float, default=0.2)
+    hedge_parser.add_argument('--warm-latency', type=float, default=0.3)
+    hedge_parser.add_argument('--warmup', type=int, default=10)
+    hedge_parser.set_defaults(func=bench_hedge)
+
+    search_parser = subparsers.add_parser('search', help="Índice de trigramas vs difflib")
+    search_parser.add_argument('--iterations', type=int, default=2000)
+    search_parser.set_defaults(func=bench_search)
+
+    subscriptions_parser = subparsers.add_parser('subscriptions', help="Índice de suscripciones y reparto de avisos")
+    subscriptions_parser.add_argument('--users', type=int, default=20000)
+    subscriptions_parser.add_argument('--per-user', type=int, default=3)
+    subscriptions_parser.add_argument('--channels', type=int, default=5)
+    subscriptions_parser.add_argument('--featured', type=int, default=4)
+    subscriptions_parser.set_defaults(func=bench_subscriptions)
+
+    archive_parser = subparsers.add_parser('archive', help="Archivo comprimido de páginas y su reproducción")
+    archive_parser.add_argument('--fetches', type=int, default=30)
+    archive_parser.add_argument('--variants', type=int, default=3)
+    archive_parser.add_argument('--max-mb', type=int, default=200)
+    archive_parser.set_defaults(func=bench_archive)
+
+    warps_parser = subparsers.add_parser('warps', help="Probabilidad exacta vs Monte Carlo por lotes y en Python")
+    warps_parser.add_argument('--pulls', type=int, default=160)
+    warps_parser.add_argument('--pity', type=int, default=0)
+    warps_parser.add_argument('--guaranteed', action='store_true')
+    warps_parser.add_argument('--runs', type=int, default=200000)
+    warps_parser.set_defaults(func=bench_warps)
+
+    reruns_parser = subparsers.add_parser('reruns', help="Agregados del historial en columnas vs bucle Python")
+    reruns_parser.add_argument('--rows', type=int, default=1_000_000)
+    reruns_parser.add_argument('--iterations', type=int, default=20)
+    reruns_parser.set_defaults(func=bench_reruns)
+
+    memory_parser = subparsers.add_parser('memory', help="RSS por servidor con el perfil por defecto y el lean")
+    memory_parser.add_argument('--guilds', type=int, default=500)
+    memory_parser.add_argument('--messages', type=int, default=20, help="Mensajes recibidos por servidor")
+    memory_parser.add_argument('--child', help=argparse.SUPPRESS)
+    memory_parser.set_defaults(func=bench_memory)
+
+    args = arg_parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
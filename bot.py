@@ -1,597 +1,559 @@
 import os
 import discord
 from discord.ext import commands, tasks
+from discord import app_commands
 import requests
 from bs4 import BeautifulSoup
+import numpy as np
 from datetime import datetime
 import re
 import asyncio
 import logging
+import logging.handlers
+import queue
+import atexit
 import sys
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+import codecs
+import contextlib
+import contextvars
+import functools
+import gzip
+import hashlib
+import random
+import threading
+import time
 import json
-import difflib
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+import mmap
+import unicodedata
+import zlib
+
+# ============================================
+# LOGGING ESTRUCTURADO EN COLA
+# ============================================
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_SAMPLE_BURST = 5
+LOG_SAMPLE_WINDOW = 60.0
+
+# Marca para las líneas de los bucles calientes: se limitan por punto de llamada
+SAMPLED = {'sampled': True}
+
+class JsonLogFormatter(logging.Formatter):
+    """Una línea JSON por registro, con el punto de llamada y los campos estructurados"""
+    
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'site': f"{record.funcName}:{record.lineno}",
+            'msg': record.getMessage()
+        }
+        if getattr(record, 'summary', None):
+            data['summary'] = record.summary
+        if getattr(record, 'suppressed', 0):
+            data['suppressed'] = record.suppressed
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class CallSiteSampler(logging.Filter):
+    """Deja pasar como máximo LOG_SAMPLE_BURST registros marcados por punto de llamada y ventana"""
+    
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sites = {}  # (fichero, línea) -> [inicio de ventana, emitidos, descartados]
+        self.lock = threading.Lock()
+    
+    def filter(self, record):
+        if not getattr(record, 'sampled', False):
+            return True
+        
+        site = (record.pathname, record.lineno)
+        with self.lock:
+            state = self.sites.get(site)
+            if state is None or record.created - state[0] >= self.window:
+                dropped = state[2] if state else 0
+                self.sites[site] = [record.created, 1, 0]
+                # El primer registro de la ventana nueva informa de lo descartado en la anterior
+                record.suppressed = dropped
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+def setup_logging():
+    """Los registros se encolan en el hilo que llama; la E/S la hace un hilo QueueListener"""
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # QueueHandler solo interpola el mensaje; el formato final lo aplica el listener
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    queue_handler.addFilter(CallSiteSampler())
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler], force=True)
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
+# ============================================
+# TRAZAS (SPANS ANIDADOS, JSON COMPATIBLE CON OPENTELEMETRY)
+# ============================================
+TRACE_FILE = os.environ.get('TRACE_FILE', 'traces.jsonl')
+TRACE_SLOW_THRESHOLD = float(os.environ.get('TRACE_SLOW_MS', '2000')) / 1000
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+
+current_span = contextvars.ContextVar('current_span', default=None)
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+class Span:
+    """Un tramo con nombre, atributos y tiempos en nanosegundos; pertenece a una traza"""
+    
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'error')
+    
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+    
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def to_otlp(self):
+        data = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or time.time_ns()),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1}
+        }
+        if self.parent_id:
+            data['parentSpanId'] = self.parent_id
+        return data
+
+class NoopSpan:
+    """Sustituto cuando no hay traza activa: set() no hace nada"""
+    
+    def set(self, **attributes):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class Trace:
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans = []  # list.append es atómico: los hilos del fetcher añaden sin bloqueo
+        self.finished = False
+
+class Tracer:
+    """Trazas por contextvars: sobreviven a await, tareas y asyncio.to_thread"""
+    
+    def __init__(self, slow_threshold=TRACE_SLOW_THRESHOLD):
+        self.slow_threshold = slow_threshold
+        self.exporter = None  # Sin start() las trazas no se registran ni se abre ningún fichero
+    
+    def start(self, path=TRACE_FILE):
+        """Abre el exportador; solo lo llaman el bot y el worker al arrancar (TRACE_FILE='' lo desactiva)"""
+        if not path or self.exporter is not None:
+            return
+        self.exporter = logging.getLogger(f"{__name__}.trazas")
+        self.exporter.setLevel(logging.INFO)
+        self.exporter.propagate = False
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter('%(message)s'))
+        # La escritura al fichero la hace un hilo aparte, como el resto del logging
+        trace_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(trace_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.exporter.addHandler(queue_handler)
+        listener = logging.handlers.QueueListener(trace_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+    
+    @contextlib.contextmanager
+    def trace(self, name, **attributes):
+        """Abre una traza nueva (raíz), aunque haya otra activa"""
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        trace = Trace()
+        root = Span(trace, name, attributes=attributes)
+        try:
+            with self._activate(root):
+                yield root
+        finally:
+            trace.finished = True
+            self.export(trace, root)
+    
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """Tramo hijo del activo; sin traza en curso no registra nada"""
+        parent = current_span.get()
+        if parent is None or parent.trace.finished:
+            yield NOOP_SPAN
+            return
+        with self._activate(Span(parent.trace, name, parent.span_id, attributes)) as span:
+            yield span
+    
+    @contextlib.contextmanager
+    def _activate(self, span):
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            current_span.reset(token)
+            span.trace.spans.append(span)
+    
+    def export(self, trace, root):
+        duration = (root.end_ns - root.start_ns) / 1e9
+        spans = trace.spans
+        if duration < self.slow_threshold:
+            # Las trazas normales solo guardan la raíz; el detalle completo es para las lentas
+            root.set(**{'trace.spans_dropped': len(spans) - 1})
+            spans = [root]
+        else:
+            logger.warning("🐌 Traza lenta %s: %.0f ms (%s)", root.name, duration * 1000, trace.trace_id, extra=SAMPLED)
+        
+        self.exporter.info(json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'hsr-bot'}}]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span.to_otlp() for span in spans]}]
+        }]}, ensure_ascii=False, separators=(',', ':')))
+
+tracer = Tracer()
+
+def traced(name):
+    """Decorador: envuelve la función en un tramo hijo de la traza activa"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return function(*args, **kwargs)
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_discord_http(http):
+    """Cada llamada REST a Discord dentro de una traza es un tramo con su ruta y estado"""
+    original_request = http.request
+    
+    async def request(route, **kwargs):
+        if current_span.get() is None:
+            return await original_request(route, **kwargs)
+        with tracer.span(f"discord {route.method} {route.path}", **{
+            'http.method': route.method,
+            'discord.route': route.path,
+            'discord.channel_id': str(route.channel_id or '')
+        }):
+            return await original_request(route, **kwargs)
+    
+    http.request = request
+
 # Configuración del bot
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+BOT_PROFILE = os.environ.get('BOT_PROFILE', 'default').strip().lower()
+
+def bot_client_options(profile):
+    """Intents y cachés de discord.py: 'lean' conserva solo lo que usan los comandos y los foros"""
+    if profile != 'lean':
+        intents = discord.Intents.default()
+        intents.message_content = True
+        return {'intents': intents}
+    
+    intents = discord.Intents.none()
+    intents.guilds = True           # Canales, foros e hilos para bot.get_channel
+    intents.guild_messages = True   # Comandos con prefijo en servidores...
+    intents.dm_messages = True      # ...y por mensaje directo
+    intents.message_content = True
+    return {
+        'intents': intents,
+        'max_messages': None,       # Ningún comando vuelve a leer mensajes ya recibidos
+        'chunk_guilds_at_startup': False,
+        # El autor llega completo en cada mensaje; no hace falta guardar miembros
+        'member_cache_flags': discord.MemberCacheFlags.none()
+    }
+
+bot = commands.Bot(command_prefix='!', **bot_client_options(BOT_PROFILE))
+instrument_discord_http(bot.http)
 
 # ============================================
 # BASE DE DATOS DE ÍCONOS DE PERSONAJES 5★
 # ============================================
+# El catálogo vive en un fichero JSON vigilado: añadir un personaje no requiere reiniciar
+CHARACTER_CATALOG_FILE = os.environ.get('CHARACTER_CATALOG_FILE', 'characters.json')
 
-CHARACTER_ICONS = [
-    {
-        "id": "acheron",
-        "name": "Acheron",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/2/24/Character_Acheron_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Lightning"
-    },
-    {
-        "id": "aglaea",
-        "name": "Aglaea",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/f8/Character_Aglaea_Icon.png",
-        "rarity": 5,
-        "path": "Remembrance",
-        "element": "Lightning"
-    },
-    {
-        "id": "anaxa",
-        "name": "Anaxa",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/f0/Character_Anaxa_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Wind"
-    },
-    {
-        "id": "archer",
-        "name": "Archer",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/8f/Character_Archer_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "argenti",
-        "name": "Argenti",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/c/c0/Character_Argenti_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Physical"
-    },
-    {
-        "id": "aventurine",
-        "name": "Aventurine",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/d/da/Character_Aventurine_Icon.png",
-        "rarity": 5,
-        "path": "Preservation",
-        "element": "Imaginary"
-    },
-    {
-        "id": "bailu",
-        "name": "Bailu",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/47/Character_Bailu_Icon.png",
-        "rarity": 5,
-        "path": "Abundance",
-        "element": "Lightning"
-    },
-    {
-        "id": "black-swan",
-        "name": "Black Swan",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/90/Character_Black_Swan_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Wind"
-    },
-    {
-        "id": "blade",
-        "name": "Blade",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/90/Character_Blade_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Wind"
-    },
-    {
-        "id": "boothill",
-        "name": "Boothill",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/7/78/Character_Boothill_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Physical"
-    },
-    {
-        "id": "bronya",
-        "name": "Bronya",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/0/0f/Character_Bronya_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Wind"
-    },
-    {
-        "id": "castorice",
-        "name": "Castorice",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/d/da/Character_Castorice_Icon.png",
-        "rarity": 5,
-        "path": "Remembrance",
-        "element": "Quantum"
-    },
-    {
-        "id": "cerydra",
-        "name": "Cerydra",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/c/c9/Character_Cerydra_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "cipher",
-        "name": "Cipher",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/99/Character_Cipher_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "clara",
-        "name": "Clara",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/a/a4/Character_Clara_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Physical"
-    },
-    {
-        "id": "cyrene",
-        "name": "Cyrene",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/99/Character_Cyrene_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "dan-heng-•-imbibitor-lunae",
-        "name": "Dan Heng • Imbibitor Lunae",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/2/2a/Character_Dan_Heng_%E2%80%A2_Imbibitor_Lunae_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Imaginary"
-    },
-    {
-        "id": "dan-heng-•-permansor-terrae",
-        "name": "Dan Heng • Permansor Terrae",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/fc/Character_Dan_Heng_%E2%80%A2_Permansor_Terrae_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "dr-ratio",
-        "name": "Dr. Ratio",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/47/Character_Dr._Ratio_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Imaginary"
-    },
-    {
-        "id": "evernight",
-        "name": "Evernight",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/b/b7/Character_Evernight_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "feixiao",
-        "name": "Feixiao",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/7/75/Character_Feixiao_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Wind"
-    },
-    {
-        "id": "firefly",
-        "name": "Firefly",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/9e/Character_Firefly_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Fire"
-    },
-    {
-        "id": "fu-xuan",
-        "name": "Fu Xuan",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/1/1a/Character_Fu_Xuan_Icon.png",
-        "rarity": 5,
-        "path": "Preservation",
-        "element": "Quantum"
-    },
-    {
-        "id": "fugue",
-        "name": "Fugue",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/c/c0/Character_Fugue_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Fire"
-    },
-    {
-        "id": "gepard",
-        "name": "Gepard",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/7/75/Character_Gepard_Icon.png",
-        "rarity": 5,
-        "path": "Preservation",
-        "element": "Ice"
-    },
-    {
-        "id": "himeko",
-        "name": "Himeko",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/0/00/Character_Himeko_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Fire"
-    },
-    {
-        "id": "huohuo",
-        "name": "Huohuo",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/6/68/Character_Huohuo_Icon.png",
-        "rarity": 5,
-        "path": "Abundance",
-        "element": "Wind"
-    },
-    {
-        "id": "hyacine",
-        "name": "Hyacine",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/c/c0/Character_Hyacine_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "hysilens",
-        "name": "Hysilens",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/1/19/Character_Hysilens_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "jade",
-        "name": "Jade",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/fd/Character_Jade_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Quantum"
-    },
-    {
-        "id": "jiaoqiu",
-        "name": "Jiaoqiu",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/48/Character_Jiaoqiu_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Fire"
-    },
-    {
-        "id": "jing-yuan",
-        "name": "Jing Yuan",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/88/Character_Jing_Yuan_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Lightning"
-    },
-    {
-        "id": "jingliu",
-        "name": "Jingliu",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/f9/Character_Jingliu_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Ice"
-    },
-    {
-        "id": "kafka",
-        "name": "Kafka",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/8c/Character_Kafka_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Lightning"
-    },
-    {
-        "id": "lingsha",
-        "name": "Lingsha",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/a/ab/Character_Lingsha_Icon.png",
-        "rarity": 5,
-        "path": "Abundance",
-        "element": "Fire"
-    },
-    {
-        "id": "luocha",
-        "name": "Luocha",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/2/20/Character_Luocha_Icon.png",
-        "rarity": 5,
-        "path": "Abundance",
-        "element": "Imaginary"
-    },
-    {
-        "id": "mydei",
-        "name": "Mydei",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/89/Character_Mydei_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Imaginary"
-    },
-    {
-        "id": "phainon",
-        "name": "Phainon",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/e/ef/Character_Phainon_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "rappa",
-        "name": "Rappa",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/84/Character_Rappa_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Imaginary"
-    },
-    {
-        "id": "robin",
-        "name": "Robin",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/7/72/Character_Robin_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Physical"
-    },
-    {
-        "id": "ruan-mei",
-        "name": "Ruan Mei",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/1/16/Character_Ruan_Mei_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Ice"
-    },
-    {
-        "id": "saber",
-        "name": "Saber",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/43/Character_Saber_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "seele",
-        "name": "Seele",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/9/9a/Character_Seele_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Quantum"
-    },
-    {
-        "id": "silver-wolf",
-        "name": "Silver Wolf",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/a/a3/Character_Silver_Wolf_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Quantum"
-    },
-    {
-        "id": "sparkle",
-        "name": "Sparkle",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/6/6b/Character_Sparkle_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Quantum"
-    },
-    {
-        "id": "sunday",
-        "name": "Sunday",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/3/38/Character_Sunday_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Imaginary"
-    },
-    {
-        "id": "the-dahlia",
-        "name": "The Dahlia",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/7/71/Character_The_Dahlia_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    },
-    {
-        "id": "the-herta",
-        "name": "The Herta",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/3/39/Character_The_Herta_Icon.png",
-        "rarity": 5,
-        "path": "Erudition",
-        "element": "Ice"
-    },
-    {
-        "id": "topaz-&-numby",
-        "name": "Topaz & Numby",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/89/Character_Topaz_%26_Numby_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Fire"
-    },
-    {
-        "id": "trailblazer",
-        "name": "Trailblazer",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/8/89/Character_Trailblazer_%28Destruction%29_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Physical"
-    },
-    {
-        "id": "trailblazer",
-        "name": "Trailblazer",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/c/c3/Character_Trailblazer_%28Preservation%29_Icon.png",
-        "rarity": 5,
-        "path": "Preservation",
-        "element": "Fire"
-    },
-    {
-        "id": "trailblazer",
-        "name": "Trailblazer",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/fd/Character_Trailblazer_%28Harmony%29_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Imaginary"
-    },
-    {
-        "id": "trailblazer",
-        "name": "Trailblazer",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/43/Character_Trailblazer_%28Remembrance%29_Icon.png",
-        "rarity": 5,
-        "path": "Remembrance",
-        "element": "Ice"
-    },
-    {
-        "id": "tribbie",
-        "name": "Tribbie",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/f/f3/Character_Tribbie_Icon.png",
-        "rarity": 5,
-        "path": "Harmony",
-        "element": "Quantum"
-    },
-    {
-        "id": "welt",
-        "name": "Welt",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/1/11/Character_Welt_Icon.png",
-        "rarity": 5,
-        "path": "Nihility",
-        "element": "Imaginary"
-    },
-    {
-        "id": "yanqing",
-        "name": "Yanqing",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/5/57/Character_Yanqing_Icon.png",
-        "rarity": 5,
-        "path": "The Hunt",
-        "element": "Ice"
-    },
-    {
-        "id": "yunli",
-        "name": "Yunli",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/4/43/Character_Yunli_Icon.png",
-        "rarity": 5,
-        "path": "Destruction",
-        "element": "Physical"
-    },
-    {
-        "id": "yao-guang",
-        "name": "Yao Guang",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/1/1e/Character_Yao_Guang_Icon.png",
-        "rarity": 5,
-        "path": "Elation",
-        "element": "Physical"
-    },
-    {
-        "id": "march-7th-evernight",
-        "name": "March 7th Evernight",
-        "image": "https://static.wikia.nocookie.net/houkai-star-rail/images/b/b7/Character_Evernight_Icon.png",
-        "rarity": 5,
-        "path": "Unknown",
-        "element": "Unknown"
-    }
-]
-
-# Crear diccionarios para búsqueda rápida (solo personajes 5★)
-CHARACTER_ICON_MAP = {}
-CHARACTER_INFO_MAP = {}
-
-for char in CHARACTER_ICONS:
-    # Solo incluir personajes 5★ en el mapa
-    if char['rarity'] == 5:
-        # Versión normalizada del nombre
-        normalized_name = char['name'].lower().strip()
-        CHARACTER_ICON_MAP[normalized_name] = char['image']
-        CHARACTER_INFO_MAP[normalized_name] = {
-            'path': char['path'],
-            'element': char['element'],
-            'rarity': char['rarity']
-        }
+def build_character_maps(characters):
+    """Crea los diccionarios para búsqueda rápida (solo personajes 5★)"""
+    icon_map = {}
+    info_map = {}
+    
+    for char in characters:
+        # Solo incluir personajes 5★ en el mapa
+        if char['rarity'] == 5:
+            info = {
+                'path': char['path'],
+                'element': char['element'],
+                'rarity': char['rarity']
+            }
+            
+            # Versión normalizada del nombre
+            normalized_name = char['name'].lower().strip()
+            # También por id
+            char_id = char['id'].lower()
+            # Versión sin caracteres especiales
+            simple_name = re.sub(r'[^a-z0-9]', '', normalized_name)
+            
+            for key in (normalized_name, char_id, simple_name):
+                icon_map[key] = char['image']
+                info_map[key] = info
+    
+    return icon_map, info_map
+
+DEFAULT_IMAGE = "https://static.wikia.nocookie.net/houkai-star-rail/images/8/83/Site-logo.png"
+
+# ============================================
+# ÍNDICE DE TRIGRAMAS PARA BÚSQUEDA DIFUSA
+# ============================================
+def normalize_search_text(text: str) -> str:
+    """Minúsculas, sin acentos y solo letras/números separados por un espacio"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CharacterSearchIndex:
+    """Índice invertido trigrama → personajes sobre los nombres e ids del catálogo"""
+    
+    def __init__(self, characters, min_score=0.3):
+        self.characters = [c for c in characters if c['rarity'] == 5]
+        self.min_score = min_score
+        self.postings = {}
+        self.key_sizes = []  # (índice de personaje, nº de trigramas, texto normalizado)
         
-        # También por id
-        char_id = char['id'].lower()
-        CHARACTER_ICON_MAP[char_id] = char['image']
-        CHARACTER_INFO_MAP[char_id] = {
-            'path': char['path'],
-            'element': char['element'],
-            'rarity': char['rarity']
-        }
+        for char_index, char in enumerate(self.characters):
+            keys = {normalize_search_text(char['name']), normalize_search_text(char['id'].replace('-', ' '))}
+            for key in keys:
+                key_index = len(self.key_sizes)
+                grams = trigrams(key)
+                self.key_sizes.append((char_index, len(grams), key))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(key_index)
+    
+    def search(self, query: str, limit: int = 3):
+        """Devuelve [(personaje, puntuación)] ordenado por similitud (coeficiente de Dice)"""
+        query = normalize_search_text(query)
+        if not query:
+            return []
         
-        # Versión sin caracteres especiales
-        simple_name = re.sub(r'[^a-z0-9]', '', normalized_name)
-        CHARACTER_ICON_MAP[simple_name] = char['image']
-        CHARACTER_INFO_MAP[simple_name] = {
-            'path': char['path'],
-            'element': char['element'],
-            'rarity': char['rarity']
-        }
+        query_grams = trigrams(query)
+        hits = {}
+        for gram in query_grams:
+            for key_index in self.postings.get(gram, ()):
+                hits[key_index] = hits.get(key_index, 0) + 1
+        
+        best = {}
+        for key_index, shared in hits.items():
+            char_index, size, key = self.key_sizes[key_index]
+            score = 2 * shared / (len(query_grams) + size)
+            # Un prefijo de palabra ("dan heng", "imbibitor") cuenta como coincidencia fuerte
+            if key.startswith(query) or f" {query}" in key:
+                score = max(score, 0.9)
+            if score > best.get(char_index, 0):
+                best[char_index] = score
+        
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        return [(self.characters[i], score) for i, score in ranked[:limit] if score >= self.min_score]
 
-DEFAULT_IMAGE = "https://static.wikia.nocookie.net/houkai-star-rail/images/8/83/Site-logo.png"
 
+# ============================================
+# CATÁLOGO CON RECARGA EN CALIENTE
+# ============================================
+CATALOG_FIELDS = {'id': str, 'name': str, 'image': str, 'rarity': int, 'path': str, 'element': str}
+
+class CatalogError(Exception):
+    """El fichero del catálogo no es válido"""
+
+def validate_character_entries(entries):
+    if not isinstance(entries, list) or not entries:
+        raise CatalogError("el catálogo debe ser una lista no vacía")
+    
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise CatalogError(f"entrada {position}: no es un objeto")
+        for field, field_type in CATALOG_FIELDS.items():
+            if not isinstance(entry.get(field), field_type) or entry.get(field) == "":
+                raise CatalogError(f"entrada {position} ({entry.get('name', '?')}): campo '{field}' ausente o inválido")
+    return entries
+
+class CharacterCatalog:
+    """Versión inmutable del catálogo: entradas, mapas de búsqueda e índice de trigramas"""
+    
+    def __init__(self, characters, mtime=None):
+        self.characters = characters
+        self.icon_map, self.info_map = build_character_maps(characters)
+        self.search_index = CharacterSearchIndex(characters)
+        self.mtime = mtime
+
+def load_character_catalog(path=CHARACTER_CATALOG_FILE):
+    """Lee, valida e indexa el catálogo (pensado para ejecutarse fuera del bucle de eventos)"""
+    mtime = os.path.getmtime(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return CharacterCatalog(validate_character_entries(entries), mtime=mtime)
+
+def diff_catalogs(old_catalog, new_catalog):
+    """Devuelve (añadidos, eliminados, modificados) por id; un cambio de vía o elemento es una modificación"""
+    def by_key(catalog):
+        # El Trailblazer repite id (una entrada por vía): las repeticiones se distinguen por su orden
+        entries, seen = {}, {}
+        for c in catalog.characters:
+            occurrence = seen[c['id']] = seen.get(c['id'], -1) + 1
+            entries[(c['id'], occurrence)] = c
+        return entries
+    
+    old_entries = by_key(old_catalog)
+    new_entries = by_key(new_catalog)
+    added = [new_entries[k]['name'] for k in new_entries.keys() - old_entries.keys()]
+    removed = [old_entries[k]['name'] for k in old_entries.keys() - new_entries.keys()]
+    changed = [new_entries[k]['name'] for k in new_entries.keys() & old_entries.keys()
+               if new_entries[k] != old_entries[k]]
+    return sorted(added), sorted(removed), sorted(changed)
+
+try:
+    CATALOG = load_character_catalog()
+    logger.info(f"📚 Catálogo cargado: {len(CATALOG.characters)} personajes desde {CHARACTER_CATALOG_FILE}")
+except Exception as e:
+    logger.error(f"❌ No se pudo cargar el catálogo {CHARACTER_CATALOG_FILE}: {e}")
+    CATALOG = CharacterCatalog([])
+
+_rejected_catalog_mtime = None
+
+async def reload_character_catalog(force=False):
+    """Recarga el catálogo si el fichero cambió; el índice se construye en otro hilo y se sustituye de una vez"""
+    global CATALOG, _rejected_catalog_mtime
+    
+    try:
+        mtime = os.path.getmtime(CHARACTER_CATALOG_FILE)
+    except OSError as e:
+        logger.error(f"❌ Catálogo no accesible: {e}")
+        return None
+    
+    if not force and mtime in (CATALOG.mtime, _rejected_catalog_mtime):
+        return None
+    
+    try:
+        new_catalog = await asyncio.to_thread(load_character_catalog)
+    except Exception as e:
+        # Un fichero a medio editar o inválido no reemplaza al catálogo en uso
+        _rejected_catalog_mtime = mtime
+        logger.error(f"❌ Catálogo inválido, se mantiene la versión anterior: {e}")
+        raise CatalogError(str(e)) from e
+    
+    diff = diff_catalogs(CATALOG, new_catalog)
+    CATALOG = new_catalog
+    added, removed, changed = diff
+    logger.info(f"🔄 Catálogo recargado: +{len(added)} -{len(removed)} ~{len(changed)}")
+    return diff
+
+@traced("get_character_info")
 def get_character_info(character_name):
     """Obtiene información SOLO de personajes 5★"""
     if not character_name:
         return None
     
+    # Leer una sola versión del catálogo aunque se recargue a mitad de la búsqueda
+    catalog = CATALOG
+    icon_map = catalog.icon_map
+    info_map = catalog.info_map
+    
     # Normalizar el nombre de búsqueda
     search_name = character_name.lower().strip()
     
     # PASO 1: Búsqueda exacta
-    if search_name in CHARACTER_INFO_MAP:
-        logger.info(f"✅ Coincidencia exacta para 5★: {character_name}")
+    if search_name in info_map:
+        logger.info("✅ Coincidencia exacta para 5★: %s", character_name, extra=SAMPLED)
         return {
             'name': character_name,
-            'image': CHARACTER_ICON_MAP[search_name],
-            'path': CHARACTER_INFO_MAP[search_name]['path'],
-            'element': CHARACTER_INFO_MAP[search_name]['element'],
+            'image': icon_map[search_name],
+            'path': info_map[search_name]['path'],
+            'element': info_map[search_name]['element'],
             'rarity': 5
         }
     
     # PASO 2: Búsqueda por nombre simplificado
     search_simple = re.sub(r'[^a-z0-9]', '', search_name)
-    for key, info in CHARACTER_INFO_MAP.items():
+    for key, info in info_map.items():
         key_simple = re.sub(r'[^a-z0-9]', '', key)
         if search_simple == key_simple:
-            logger.info(f"✅ Coincidencia simplificada para 5★: {character_name}")
+            logger.info("✅ Coincidencia simplificada para 5★: %s", character_name, extra=SAMPLED)
             return {
                 'name': character_name,
-                'image': CHARACTER_ICON_MAP[key],
+                'image': icon_map[key],
                 'path': info['path'],
                 'element': info['element'],
                 'rarity': 5
             }
     
     # PASO 3: Búsqueda por coincidencia parcial (solo si es claramente el mismo personaje)
-    for key, info in CHARACTER_INFO_MAP.items():
+    for key, info in info_map.items():
         # Evitar coincidencias cortas como "Hanya" con "Anaxa"
         if len(key) >= 4 and len(search_name) >= 4:
             if key in search_name or search_name in key:
                 # Verificar que no sea una coincidencia falsa
                 if key not in ['hanya', 'pela', 'qingque']:  # Excluir nombres 4★ conocidos
-                    logger.info(f"✅ Coincidencia parcial para 5★: {character_name} con {key}")
+                    logger.info("✅ Coincidencia parcial para 5★: %s con %s", character_name, key, extra=SAMPLED)
                     return {
                         'name': character_name,
-                        'image': CHARACTER_ICON_MAP[key],
+                        'image': icon_map[key],
                         'path': info['path'],
                         'element': info['element'],
                         'rarity': 5
                     }
     
     # No es un personaje 5★ conocido
-    logger.info(f"⏩ {character_name} no es un personaje 5★ reconocido")
+    logger.info("⏩ %s no es un personaje 5★ reconocido", character_name, extra=SAMPLED)
     return None
 
 # ============================================
@@ -625,6 +587,282 @@ class Banner:
         self.end_date = end_date
         self.banner_id = banner_id
 
+# ============================================
+# CLASE SNAPSHOT
+# ============================================
+class Snapshot:
+    """Resultado de una lectura de la página: banners y End Game obtenidos juntos"""
+
+    def __init__(self, banners: list, endgame: list, source: str = "", fetched_at=None):
+        self.banners = banners if banners else []
+        self.endgame = endgame if endgame else []
+        self.source = source
+        self.fetched_at = fetched_at or datetime.now()
+        self.stale = False
+    
+    def age_seconds(self) -> float:
+        return (datetime.now() - self.fetched_at).total_seconds()
+    
+    def to_dict(self) -> dict:
+        def encode_banner(banner):
+            data = dict(vars(banner))
+            data['start_date'] = banner.start_date.isoformat() if banner.start_date else None
+            data['end_date'] = banner.end_date.isoformat() if banner.end_date else None
+            return data
+        
+        return {
+            'source': self.source,
+            'fetched_at': self.fetched_at.isoformat(),
+            'banners': [encode_banner(b) for b in self.banners],
+            'endgame': [vars(e) for e in self.endgame]
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        def decode_banner(item):
+            item = dict(item)
+            item['start_date'] = datetime.fromisoformat(item['start_date']) if item['start_date'] else None
+            item['end_date'] = datetime.fromisoformat(item['end_date']) if item['end_date'] else None
+            return Banner(**item)
+        
+        return cls(
+            [decode_banner(b) for b in data['banners']],
+            [EndgameContent(**e) for e in data['endgame']],
+            source=data['source'],
+            fetched_at=datetime.fromisoformat(data['fetched_at'])
+        )
+
+class ScrapeError(Exception):
+    """Ninguna fuente pudo devolver datos válidos"""
+
+# ============================================
+# SNAPSHOT PERSISTIDO (ARRANQUE EN CALIENTE)
+# ============================================
+SNAPSHOT_SCHEMA_VERSION = 1
+
+class SnapshotStore:
+    """Guarda el último snapshot en un fichero JSON comprimido y versionado"""
+    
+    def __init__(self, path="snapshot.json.gz"):
+        self.path = path
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        
+        start = time.perf_counter()
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            if data.get('schema') != SNAPSHOT_SCHEMA_VERSION:
+                logger.warning(f"🗑️ Snapshot con esquema {data.get('schema')} incompatible (se espera {SNAPSHOT_SCHEMA_VERSION}), descartado")
+                os.remove(self.path)
+                return None
+            
+            snapshot = Snapshot.from_dict(data['snapshot'])
+        except Exception as e:
+            logger.error(f"Error cargando snapshot guardado: {e}")
+            return None
+        
+        logger.info(f"💾 Snapshot cargado en {(time.perf_counter() - start) * 1000:.1f} ms ({len(snapshot.banners)} banners, de {snapshot.fetched_at:%Y-%m-%d %H:%M})")
+        return snapshot
+    
+    def save(self, snapshot):
+        data = {'schema': SNAPSHOT_SCHEMA_VERSION, 'snapshot': snapshot.to_dict()}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            # Reemplazo atómico: nunca queda un fichero a medio escribir
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando snapshot: {e}")
+
+# ============================================
+# ARCHIVO DE PÁGINAS DESCARGADAS
+# ============================================
+PAGE_ARCHIVE_MAX_BYTES = int(os.environ.get('PAGE_ARCHIVE_MAX_MB', '200')) * 1024 * 1024
+# Archivar el cuerpo entero aunque el parser pare antes: un fallo del corte solo se reproduce con la página completa
+PAGE_ARCHIVE_FULL_BODY = os.environ.get('PAGE_ARCHIVE_FULL_BODY', '1') != '0'
+
+class PageArchive:
+    """Cuerpos descargados comprimidos y deduplicados por sha256, con un índice fecha → hash"""
+    
+    def __init__(self, directory="page_archive", max_bytes=PAGE_ARCHIVE_MAX_BYTES):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = self.load_index()
+        self.refs = {}
+        self.sizes = {}
+        for entry in self.entries:
+            self.refs[entry['sha256']] = self.refs.get(entry['sha256'], 0) + 1
+            self.sizes[entry['sha256']] = entry['stored']
+        self.total_bytes = sum(self.sizes.values())
+    
+    def load_index(self):
+        entries = []
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    entries = [json.loads(line) for line in f if line.strip()]
+        except Exception as e:
+            logger.error(f"Error cargando índice del archivo de páginas: {e}")
+        return entries
+    
+    def object_path(self, sha256):
+        return os.path.join(self.directory, "objects", sha256[:2], sha256 + ".z")
+    
+    def store(self, body: bytes, source="", url="", truncated=False):
+        """Guarda un cuerpo; si el mismo contenido ya existe solo se añade la entrada al índice"""
+        sha256 = hashlib.sha256(body).hexdigest()
+        entry = {
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'url': url,
+            'sha256': sha256,
+            'size': len(body),
+            'truncated': truncated
+        }
+        try:
+            with self.lock:
+                path = self.object_path(sha256)
+                if sha256 not in self.sizes:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(zlib.compress(body, 6))
+                    os.replace(tmp_path, path)
+                    self.sizes[sha256] = os.path.getsize(path)
+                    self.total_bytes += self.sizes[sha256]
+                entry['stored'] = self.sizes[sha256]
+                self.refs[sha256] = self.refs.get(sha256, 0) + 1
+                self.entries.append(entry)
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                if self.total_bytes > self.max_bytes:
+                    self.enforce_retention()
+        except Exception as e:
+            logger.error(f"Error archivando página de {source}: {e}")
+            return None
+        logger.info("🗄️ Página archivada: %s (%d → %d bytes)", sha256[:12], len(body), entry['stored'], extra=SAMPLED)
+        return entry
+    
+    def store_remaining(self, response, head_chunks, source="", url=""):
+        """Termina de leer en otro hilo el cuerpo que el parser dejó a medias y lo archiva entero"""
+        def drain():
+            chunks = list(head_chunks)
+            truncated = False
+            try:
+                chunks.extend(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            except Exception as e:
+                truncated = True
+                logger.warning(f"⚠️ No se pudo leer el resto de la página de {source} para archivarla: {e}")
+            finally:
+                response.close()
+            self.store(b''.join(chunks), source=source, url=url, truncated=truncated)
+        
+        threading.Thread(target=drain, name="archive-drain", daemon=True).start()
+    
+    def enforce_retention(self):
+        """Olvida las entradas más antiguas hasta volver al límite; borra los objetos sin referencias"""
+        removed = 0
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            sha256 = self.entries.pop(0)['sha256']
+            removed += 1
+            self.refs[sha256] -= 1
+            if self.refs[sha256] == 0:
+                del self.refs[sha256]
+                self.total_bytes -= self.sizes.pop(sha256)
+                os.remove(self.object_path(sha256))
+        
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self.entries)
+        os.replace(tmp_path, self.index_path)
+        logger.info(f"🧹 Archivo de páginas: {removed} entradas antiguas eliminadas ({self.total_bytes / 1024 / 1024:.1f} MiB)")
+    
+    def find(self, since=None, until=None, source=None):
+        """Entradas del índice en un intervalo de fechas (ISO) y, opcionalmente, de una fuente"""
+        return [
+            entry for entry in self.entries
+            if (since is None or entry['fetched_at'] >= since)
+            and (until is None or entry['fetched_at'] <= until)
+            and (source is None or entry['source'] == source)
+        ]
+    
+    def read(self, sha256) -> bytes:
+        """Lee un cuerpo: el objeto comprimido se mapea en memoria y se descomprime sin copiarlo"""
+        with open(self.object_path(sha256), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return zlib.decompress(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return zlib.decompress(mapped)
+    
+    def replay(self, entry, scraper):
+        """Vuelve a pasar el parser actual por una página archivada"""
+        text = self.read(entry['sha256']).decode('utf-8', errors='replace')
+        chunks = (text[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE))
+        snapshot = scraper.build_snapshot(iter_accordion_items_from_chunks(chunks), source=entry['source'])
+        snapshot.fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        return snapshot
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_DELAY = 30
+BREAKER_MAX_DELAY = 30 * 60
+
+class CircuitBreaker:
+    """Corta las peticiones tras varios fallos seguidos y vuelve a probar con espera exponencial y jitter"""
+    
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 base_delay=BREAKER_BASE_DELAY, max_delay=BREAKER_MAX_DELAY):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = "cerrado"
+        self.failures = 0
+        self.open_count = 0
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        with self.lock:
+            if self.state == "cerrado":
+                return True
+            # Solo una petición de prueba cuando vence la espera
+            if self.state == "abierto" and time.monotonic() >= self.retry_at:
+                self.state = "semiabierto"
+                return True
+            return False
+    
+    def retry_in(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+    
+    def record_success(self):
+        with self.lock:
+            if self.state != "cerrado":
+                logger.info("🟢 Circuito de scraping cerrado de nuevo")
+            self.state = "cerrado"
+            self.failures = 0
+            self.open_count = 0
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "semiabierto" or self.failures >= self.failure_threshold:
+                # Espera exponencial con "equal jitter": entre la mitad y el total del retardo
+                delay = min(self.max_delay, self.base_delay * (2 ** self.open_count))
+                delay = random.uniform(delay / 2, delay)
+                self.open_count += 1
+                self.retry_at = time.monotonic() + delay
+                self.state = "abierto"
+                logger.warning(f"🔴 Circuito de scraping abierto durante {delay:.0f}s tras {self.failures} fallos")
+
 # ============================================
 # CLASE PARA GESTIONAR PUBLICACIONES DE FORO
 # ============================================
@@ -651,13 +889,27 @@ class ForumManager:
         except Exception as e:
             logger.error(f"Error guardando publicaciones: {e}")
     
+    def get_post(self, channel_id, content_id):
+        """Registro {'thread_id', 'message_id', 'fingerprint'}; los registros antiguos solo guardaban el id del hilo"""
+        record = self.posts.get(f"{channel_id}_{content_id}")
+        if isinstance(record, int):
+            return {'thread_id': record}
+        return record
+    
     def get_post_id(self, channel_id, content_id):
-        key = f"{channel_id}_{content_id}"
-        return self.posts.get(key)
+        record = self.get_post(channel_id, content_id)
+        return record['thread_id'] if record else None
     
-    def set_post_id(self, channel_id, content_id, thread_id):
+    def set_post_id(self, channel_id, content_id, thread_id, message_id=None, fingerprint=None, end_date=None):
         key = f"{channel_id}_{content_id}"
-        self.posts[key] = thread_id
+        record = {'thread_id': thread_id}
+        if message_id:
+            record['message_id'] = message_id
+        if fingerprint:
+            record['fingerprint'] = fingerprint
+        if end_date:
+            record['end_date'] = end_date
+        self.posts[key] = record
         self.save_posts()
     
     def remove_post(self, channel_id, content_id):
@@ -666,19 +918,140 @@ class ForumManager:
             del self.posts[key]
             self.save_posts()
     
+    def channel_posts(self, channel_id):
+        """Registros de un canal por id de contenido"""
+        prefix = f"{channel_id}_"
+        return {key[len(prefix):]: self.get_post(channel_id, key[len(prefix):])
+                for key in self.posts if key.startswith(prefix)}
+    
     def clear_channel(self, channel_id):
         keys_to_delete = [k for k in self.posts.keys() if k.startswith(f"{channel_id}_")]
         for key in keys_to_delete:
             del self.posts[key]
+        if keys_to_delete:
             self.save_posts()
 
+# ============================================
+# PARSER INCREMENTAL DE ACCORDION-ITEMS
+# ============================================
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Clases de las secciones que Prydwen pone después de todos los eventos (tier lists, guías):
+# solo al abrirse una de ellas se deja de leer; sin ninguna, se lee la página entera.
+# No están sacadas de una captura real: STREAM_STOP_CLASSES las cambia ('' desactiva el corte)
+STREAM_STOP_CLASSES = set(os.environ.get('STREAM_STOP_CLASSES', 'tier-list,tier-card,guides-section').replace(',', ' ').split())
+
+# Elementos HTML que nunca tienen etiqueta de cierre
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+def response_encoding(response):
+    """Sin charset explícito requests asume ISO-8859-1, lo que rompe los "★": usar UTF-8"""
+    content_type = response.headers.get('content-type', '').lower()
+    return response.encoding if 'charset' in content_type else 'utf-8'
+
+class AccordionStreamParser(HTMLParser):
+    """Parser por trozos que separa los accordion-item de nivel superior sin construir el árbol completo"""
+
+    def __init__(self, stop_classes=STREAM_STOP_CLASSES):
+        super().__init__(convert_charrefs=False)
+        self.stop_classes = stop_classes
+        self.stack = []  # (etiqueta, clases) de cada elemento abierto
+        self.item_depth = None
+        self.item_parts = []
+        self.items_seen = 0
+        self.section_closed = False
+        self.completed_items = []
+
+    def _capture(self, text):
+        if self.item_depth is not None:
+            self.item_parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        classes = []
+        for attr_name, attr_value in attrs:
+            if attr_name == 'class' and attr_value:
+                classes = attr_value.split()
+
+        if self.item_depth is None and not self.section_closed and tag == 'div' and 'accordion-item' in classes:
+            self.item_depth = len(self.stack)
+            self.item_parts = []
+            self.items_seen += 1
+
+        # Los eventos actuales y próximos pueden ir en acordeones separados: no basta con que se cierre uno
+        if self.item_depth is None and self.items_seen and self.stop_classes.intersection(classes):
+            self.section_closed = True
+
+        self._capture(self.get_starttag_text())
+
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, classes))
+
+    def handle_startendtag(self, tag, attrs):
+        self._capture(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        # Ignorar cierres sin apertura (HTML mal formado)
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+
+        self._capture(f"</{tag}>")
+        while self.stack:
+            open_tag, _ = self.stack.pop()
+            if open_tag == tag:
+                break
+
+        if self.item_depth is not None and len(self.stack) <= self.item_depth:
+            self.completed_items.append(''.join(self.item_parts))
+            self.item_depth = None
+            self.item_parts = []
+
+    def handle_data(self, data):
+        self._capture(data)
+
+    def handle_entityref(self, name):
+        self._capture(f"&{name};")
+
+    def handle_charref(self, name):
+        self._capture(f"&#{name};")
+
+    def handle_comment(self, data):
+        self._capture(f"<!--{data}-->")
+
+    def pop_items(self):
+        items = self.completed_items
+        self.completed_items = []
+        return items
+
+def build_item_soup(fragment):
+    # El tramo se cierra antes del yield: un tramo nunca debe quedar abierto entre iteraciones
+    with tracer.span("soup build", bytes=len(fragment)):
+        return BeautifulSoup(fragment, 'html.parser').div
+
+def iter_accordion_items_from_chunks(chunks, stop_classes=STREAM_STOP_CLASSES):
+    """Emite cada accordion-item (como fragmento BeautifulSoup) en cuanto se cierra, deteniéndose en la primera sección posterior a los eventos"""
+    stream_parser = AccordionStreamParser(stop_classes)
+
+    for chunk in chunks:
+        stream_parser.feed(chunk)
+        for fragment in stream_parser.pop_items():
+            yield build_item_soup(fragment)
+        if stream_parser.section_closed:
+            return
+
+    stream_parser.close()
+    for fragment in stream_parser.pop_items():
+        yield build_item_soup(fragment)
+
 # ============================================
 # CLASE BANNER SCRAPER
 # ============================================
 class BannerScraper:
     """Clase para hacer scraping de los banners de warps en Prydwen"""
     
-    def __init__(self):
+    def __init__(self, store=None, archive=None):
         self.url = "https://www.prydwen.gg/star-rail/"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -696,6 +1069,20 @@ class BannerScraper:
         
         # Lista de contenido End Game
         self.endgame_modes = ['Memory of Chaos', 'Pure Fiction', 'Apocalyptic Shadow']
+        
+        # Fuentes de datos: Prydwen primero, después los espejos configurados
+        self.sources = [HtmlBannerSource(self, "prydwen", self.url, session=self.session)]
+        fallback_urls = os.environ.get('BANNER_FALLBACK_URLS', '')
+        for index, url in enumerate(u.strip() for u in fallback_urls.split(',') if u.strip()):
+            self.sources.append(HtmlBannerSource(self, f"espejo{index + 1}", url))
+        self.fetcher = HedgedFetcher(self.sources)
+        
+        # Circuito alrededor de la descarga y último snapshot válido
+        self.breaker = CircuitBreaker()
+        self.store = store
+        self.last_snapshot = store.load() if store else None
+        self.archive = archive
+        self.snapshot_lock = threading.Lock()
     
     def parse_date_from_duration(self, duration_text):
         if not duration_text:
@@ -834,7 +1221,7 @@ class BannerScraper:
         # CORRECCIÓN: Restar 2 días y 5 horas del tiempo extraído
         corrected_time = self.subtract_time(time_remaining, days=2, hours=5)
         
-        logger.info(f"⏱️ {content_type} - Original: {time_remaining} → Corregido: {corrected_time}")
+        logger.info("⏱️ %s - Original: %s → Corregido: %s", content_type, time_remaining, corrected_time, extra=SAMPLED)
         
         return EndgameContent(name, version, corrected_time, content_type)
     
@@ -871,6 +1258,7 @@ class BannerScraper:
             logger.error(f"Error parseando personaje: {e}")
             return None
     
+    @traced("extract_characters")
     def extract_characters(self, item):
         featured_5star_char = []
         featured_4star_char = []
@@ -935,78 +1323,181 @@ class BannerScraper:
         else:
             return "Mixto"
     
-    def get_banners(self):
+    def iter_accordion_items(self, url=None, session=None, source=""):
+        """Descarga la página por trozos y emite los accordion-item a medida que se completan"""
+        with tracer.span("session.get", url=url or self.url, source=source) as span:
+            response = (session or self.session).get(url or self.url, timeout=15, stream=True)
+            span.set(**{'http.status_code': response.status_code})
+        # Bytes leídos, para archivar exactamente lo que vio el parser
+        raw_chunks = []
+        complete = False
         try:
-            logger.info(f"Obteniendo banners desde {self.url}")
-            response = self.session.get(self.url, timeout=15)
             response.raise_for_status()
+
+            decoder = codecs.getincrementaldecoder(response_encoding(response))(errors='replace')
+
+            def text_chunks():
+                nonlocal complete
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    raw_chunks.append(chunk)
+                    yield decoder.decode(chunk)
+                complete = True
+                yield decoder.decode(b'', final=True)
+
+            yield from iter_accordion_items_from_chunks(text_chunks())
+            # Así se ve en producción si los marcadores de STREAM_STOP_CLASSES siguen existiendo en la página
+            read_bytes = sum(len(c) for c in raw_chunks)
+            if complete:
+                logger.info(f"📥 Página leída entera ({read_bytes} bytes): ninguna sección de parada cortó la lectura")
+            else:
+                logger.info(f"📥 Lectura detenida tras {read_bytes} bytes")
+        finally:
+            if self.archive and raw_chunks and not complete and PAGE_ARCHIVE_FULL_BODY:
+                # El snapshot no espera: el resto se descarga para el archivo en segundo plano
+                self.archive.store_remaining(response, raw_chunks, source=source, url=response.url)
+            else:
+                response.close()
+                if self.archive and raw_chunks:
+                    self.archive.store(b''.join(raw_chunks), source=source, url=response.url, truncated=not complete)
+
+    def build_banner(self, item):
+        """Construye un Banner a partir de un accordion-item, o None si no es un warp real"""
+        if not self.is_warp_banner(item):
+            return None
+
+        name_tag = item.find('div', class_='event-name')
+        banner_name = name_tag.text.strip() if name_tag else "Banner sin nombre"
+
+        if not any(warp in banner_name for warp in self.real_warps):
+            return None
+
+        banner_id = re.sub(r'[^a-zA-Z0-9]', '', banner_name.lower())
+
+        time_tag = item.find('span', class_='time')
+        time_remaining = time_tag.text.strip() if time_tag else "Tiempo desconocido"
+
+        duration_tag = item.find('p', class_='duration')
+        duration_text = duration_tag.text.strip() if duration_tag else ""
+
+        start_date, end_date = self.parse_date_from_duration(duration_text)
+
+        featured_5star_char, featured_4star_char = self.extract_characters(item)
+        featured_5star_cone, featured_4star_cone = self.extract_light_cones(item)
+
+        banner_type = self.classify_banner_type(item, featured_5star_char, featured_4star_char,
+                                                featured_5star_cone, featured_4star_cone)
+
+        return Banner(
+            name=banner_name,
+            banner_type=banner_type,
+            time_remaining=time_remaining,
+            featured_5star_char=featured_5star_char,
+            featured_4star_char=featured_4star_char,
+            featured_5star_cone=featured_5star_cone,
+            featured_4star_cone=featured_4star_cone,
+            duration_text=duration_text,
+            start_date=start_date,
+            end_date=end_date,
+            banner_id=banner_id
+        )
+
+    def iter_banners(self, items):
+        """Emite cada Banner en cuanto su accordion-item termina de llegar"""
+        item_count = 0
+        warp_count = 0
+        skipped_count = 0
+
+        for item in items:
+            item_count += 1
+            try:
+                banner = self.build_banner(item)
+            except Exception as e:
+                logger.error(f"Error procesando banner: {e}")
+                continue
+
+            if not banner:
+                skipped_count += 1
+                continue
+
+            warp_count += 1
+            logger.info("✅ Warp %d: %s - Personajes 5★: %s", warp_count, banner.name,
+                        [c['name'] for c in banner.featured_5star_char], extra=SAMPLED)
+            yield banner
+
+        logger.debug(f"Accordion-items: {item_count}, warps reales: {warp_count}, descartados: {skipped_count}")
+
+    def iter_endgame_content(self, items):
+        """Emite cada contenido End Game en cuanto su accordion-item termina de llegar"""
+        for item in items:
+            if self.is_endgame_content(item):
+                content = self.extract_endgame_content(item)
+                if content:
+                    logger.info("✅ End Game encontrado: %s - Versión: %s - Tiempo: %s",
+                                content.name, content.version, content.time_remaining, extra=SAMPLED)
+                    yield content
+
+    def build_snapshot(self, items, source=""):
+        """Recorre los accordion-item una sola vez y separa banners y End Game"""
+        start = time.perf_counter()
+        with tracer.span("parse accordion", source=source) as span:
+            items = list(items)
+            span.set(items=len(items))
+        if not items:
+            raise ScrapeError(f"{source or 'fuente'}: la página no contiene accordion-items")
+        
+        with tracer.span("extract banners") as span:
+            banners = list(self.iter_banners(items))
+            endgame = list(self.iter_endgame_content(items))
+            span.set(banners=len(banners), endgame=len(endgame))
+        
+        logger.info("📊 Resumen de scrape", extra={'summary': {
+            'kind': 'scrape',
+            'source': source,
+            'items': len(items),
+            'banners': len(banners),
+            'endgame': len(endgame),
+            'skipped': len(items) - len(banners) - len(endgame),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+        }})
+        return Snapshot(banners, endgame, source=source)
+    
+    def fetch_snapshot(self):
+        """Obtiene un Snapshot combinando las fuentes configuradas"""
+        return self.fetcher.fetch()
+    
+    def get_snapshot(self):
+        """Snapshot nuevo si la descarga funciona; si falla o el circuito está abierto, el último válido"""
+        with self.snapshot_lock:
+            last_snapshot = self.last_snapshot
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            all_items = soup.find_all('div', class_='accordion-item')
-            logger.info(f"Total accordion-items encontrados: {len(all_items)}")
-            
-            banners = []
-            warp_count = 0
-            skipped_count = 0
-            
-            for item in all_items:
-                if not self.is_warp_banner(item):
-                    skipped_count += 1
-                    continue
-                
-                try:
-                    name_tag = item.find('div', class_='event-name')
-                    banner_name = name_tag.text.strip() if name_tag else "Banner sin nombre"
-                    
-                    if not any(warp in banner_name for warp in self.real_warps):
-                        skipped_count += 1
-                        continue
-                    
-                    banner_id = re.sub(r'[^a-zA-Z0-9]', '', banner_name.lower())
-                    
-                    time_tag = item.find('span', class_='time')
-                    time_remaining = time_tag.text.strip() if time_tag else "Tiempo desconocido"
-                    
-                    duration_tag = item.find('p', class_='duration')
-                    duration_text = duration_tag.text.strip() if duration_tag else ""
-                    
-                    start_date, end_date = self.parse_date_from_duration(duration_text)
-                    
-                    featured_5star_char, featured_4star_char = self.extract_characters(item)
-                    featured_5star_cone, featured_4star_cone = self.extract_light_cones(item)
-                    
-                    banner_type = self.classify_banner_type(item, featured_5star_char, featured_4star_char, 
-                                                            featured_5star_cone, featured_4star_cone)
-                    
-                    warp_count += 1
-                    
-                    banner = Banner(
-                        name=banner_name,
-                        banner_type=banner_type,
-                        time_remaining=time_remaining,
-                        featured_5star_char=featured_5star_char,
-                        featured_4star_char=featured_4star_char,
-                        featured_5star_cone=featured_5star_cone,
-                        featured_4star_cone=featured_4star_cone,
-                        duration_text=duration_text,
-                        start_date=start_date,
-                        end_date=end_date,
-                        banner_id=banner_id
-                    )
-                    banners.append(banner)
-                    
-                    logger.info(f"✅ Warp {warp_count}: {banner_name}")
-                    logger.info(f"   - Personajes 5★: {[c['name'] for c in featured_5star_char]}")
-                    
-                except Exception as e:
-                    logger.error(f"Error procesando banner: {e}")
-                    continue
+            if not self.breaker.allow_request():
+                if last_snapshot:
+                    logger.warning(f"⚡ Circuito abierto ({self.breaker.retry_in():.0f}s), sirviendo snapshot de hace {last_snapshot.age_seconds():.0f}s")
+                    last_snapshot.stale = True
+                    return last_snapshot
+                raise ScrapeError("circuito abierto y sin snapshot previo")
             
-            logger.info(f"✅ WARPS REALES ENCONTRADOS: {len(banners)}")
-            logger.info(f"📊 Items que no son warps: {skipped_count}")
-            return banners
+            try:
+                logger.info(f"Obteniendo banners desde {self.url}")
+                snapshot = self.fetch_snapshot()
+            except Exception as e:
+                self.breaker.record_failure()
+                logger.error(f"Error en scraping: {e}")
+                if last_snapshot:
+                    last_snapshot.stale = True
+                    return last_snapshot
+                raise
             
+            self.breaker.record_success()
+            self.last_snapshot = snapshot
+            if self.store:
+                self.store.save(snapshot)
+            return snapshot
+    
+    def get_banners(self):
+        try:
+            return self.get_snapshot().banners
+
         except Exception as e:
             logger.error(f"Error en scraping: {e}")
             return []
@@ -1014,47 +1505,1108 @@ class BannerScraper:
     def get_endgame_content(self):
         """Obtiene todo el contenido End Game"""
         try:
-            response = self.session.get(self.url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            all_items = soup.find_all('div', class_='accordion-item')
-            
-            endgame_list = []
-            
-            for item in all_items:
-                if self.is_endgame_content(item):
-                    content = self.extract_endgame_content(item)
-                    if content:
-                        endgame_list.append(content)
-                        logger.info(f"✅ End Game encontrado: {content.name} - Versión: {content.version} - Tiempo: {content.time_remaining}")
-            
-            return endgame_list
+            return self.get_snapshot().endgame
             
         except Exception as e:
             logger.error(f"Error obteniendo End Game content: {e}")
             return []
 
 # ============================================
-# INSTANCIAS GLOBALES
+# FUENTES DE DATOS Y PETICIONES CON COBERTURA
 # ============================================
-scraper = BannerScraper()
-forum_manager = ForumManager()
+HEDGE_PERCENTILE = 0.9
+HEDGE_DEFAULT_DELAY = 4.0
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MERGE_GRACE = 0.25
 
-# ============================================
-# FUNCIONES AUXILIARES
-# ============================================
-def get_path_emoji(path: str) -> str:
-    """Devuelve el emoji de la Vía"""
-    path_emojis = {
-        'Abundance': '🌿',
-        'Destruction': '💥',
-        'Erudition': '📚',
-        'Harmony': '🎵',
-        'Nihility': '🌑',
-        'Preservation': '🛡️',
-        'The Hunt': '🏹',
+class BannerSource(ABC):
+    """Adaptador base: cada fuente devuelve un Snapshot con registros Banner/EndgameContent"""
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    @abstractmethod
+    def fetch(self) -> Snapshot:
+        """Descarga y parsea la fuente; lanza una excepción si no hay datos utilizables"""
+
+class HtmlBannerSource(BannerSource):
+    """Fuente HTML con el marcado de Prydwen (sitio principal o un espejo)"""
+    
+    def __init__(self, scraper, name: str, url: str, session=None):
+        super().__init__(name)
+        self.scraper = scraper
+        self.url = url
+        if session is None:
+            session = requests.Session()
+            session.headers.update(scraper.headers)
+        self.session = session
+    
+    def fetch(self) -> Snapshot:
+        items = self.scraper.iter_accordion_items(self.url, session=self.session, source=self.name)
+        return self.scraper.build_snapshot(items, source=self.name)
+
+def fill_missing_fields(primary, secondary, empty_values):
+    """Completa los campos vacíos de primary con los de secondary"""
+    for field, value in vars(secondary).items():
+        if getattr(primary, field, None) in empty_values and value not in empty_values:
+            setattr(primary, field, value)
+
+def merge_snapshots(snapshots):
+    """Une los snapshots por orden de prioridad: gana la primera fuente y las demás rellenan huecos"""
+    if len(snapshots) == 1:
+        return snapshots[0]
+    
+    empty_values = (None, "", [], "Tiempo desconocido")
+    banners = {}
+    endgame = {}
+    
+    for snapshot in snapshots:
+        for banner in snapshot.banners:
+            if banner.banner_id in banners:
+                fill_missing_fields(banners[banner.banner_id], banner, empty_values)
+            else:
+                banners[banner.banner_id] = banner
+        
+        for content in snapshot.endgame:
+            content_id = (content.content_type, content.version)
+            if content_id in endgame:
+                fill_missing_fields(endgame[content_id], content, empty_values)
+            else:
+                endgame[content_id] = content
+    
+    return Snapshot(
+        list(banners.values()),
+        list(endgame.values()),
+        source="+".join(s.source for s in snapshots),
+        fetched_at=min(s.fetched_at for s in snapshots)
+    )
+
+class HedgedFetcher:
+    """Lanza la fuente principal y recurre a la siguiente si falla o supera su percentil de latencia"""
+    
+    def __init__(self, sources, percentile=HEDGE_PERCENTILE):
+        self.sources = sources
+        self.percentile = percentile
+        self.latencies = {source.name: deque(maxlen=50) for source in sources}
+        self.executor = ThreadPoolExecutor(max_workers=max(2, len(sources) * 2), thread_name_prefix="scrape")
+    
+    def hedge_delay(self, source) -> float:
+        """Percentil de latencia de la fuente; valor por defecto hasta tener muestras suficientes"""
+        samples = sorted(self.latencies[source.name])
+        if len(samples) < 5:
+            return HEDGE_DEFAULT_DELAY
+        index = min(len(samples) - 1, int(len(samples) * self.percentile))
+        return max(HEDGE_MIN_DELAY, samples[index])
+    
+    def _timed_fetch(self, source):
+        start = time.perf_counter()
+        with tracer.span(f"fuente {source.name}"):
+            snapshot = source.fetch()
+        self.latencies[source.name].append(time.perf_counter() - start)
+        return snapshot
+    
+    def fetch(self) -> Snapshot:
+        queue = list(self.sources)
+        pending = {}
+        results = {}
+        errors = []
+        
+        def launch():
+            source = queue.pop(0)
+            # Cada hilo lleva una copia del contexto para que sus tramos cuelguen de la traza actual
+            context = contextvars.copy_context()
+            pending[self.executor.submit(context.run, self._timed_fetch, source)] = source
+        
+        launch()
+        while pending and not results:
+            delay = self.hedge_delay(self.sources[0]) if queue else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                logger.warning(f"🐢 {self.sources[0].name} supera {delay:.1f}s, lanzando petición de respaldo")
+                launch()
+                continue
+            
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    results[source.name] = future.result()
+                except Exception as e:
+                    errors.append(f"{source.name}: {e}")
+                    logger.error(f"❌ Fuente {source.name} falló: {e}")
+            
+            if not results and queue:
+                launch()
+        
+        # Dar un margen corto a las peticiones en curso para combinar sus datos
+        if results and pending:
+            done, _ = wait(pending, timeout=HEDGE_MERGE_GRACE)
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    results[source.name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Fuente {source.name} falló: {e}")
+        
+        if not results:
+            raise ScrapeError("; ".join(errors) or "ninguna fuente respondió")
+        
+        ordered = [results[s.name] for s in self.sources if s.name in results]
+        snapshot = merge_snapshots(ordered)
+        logger.info(f"📦 Snapshot obtenido de {snapshot.source}: {len(snapshot.banners)} banners, {len(snapshot.endgame)} End Game")
+        return snapshot
+
+# ============================================
+# ENRIQUECIMIENTO DEL CATÁLOGO EN SEGUNDO PLANO
+# ============================================
+ENRICH_CONCURRENCY = 3
+HTTP_CACHE_MAX_AGE = 24 * 3600
+
+KNOWN_PATHS = {
+    'abundance': 'Abundance', 'destruction': 'Destruction', 'erudition': 'Erudition',
+    'harmony': 'Harmony', 'nihility': 'Nihility', 'preservation': 'Preservation',
+    'the hunt': 'The Hunt', 'hunt': 'The Hunt', 'remembrance': 'Remembrance', 'elation': 'Elation'
+}
+KNOWN_ELEMENTS = {
+    'physical': 'Physical', 'fire': 'Fire', 'ice': 'Ice', 'lightning': 'Lightning',
+    'wind': 'Wind', 'quantum': 'Quantum', 'imaginary': 'Imaginary'
+}
+
+class HttpCache:
+    """Caché HTTP en disco: respuestas recientes sin red y revalidación con ETag / Last-Modified"""
+    
+    def __init__(self, directory="http_cache", max_age=HTTP_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+    
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + ".json")
+    
+    def _read(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write(self, url, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(url) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(url))
+    
+    def get(self, session, url) -> str:
+        entry = self._read(url)
+        if entry and time.time() - entry['fetched_at'] < self.max_age:
+            return entry['body']
+        
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        response = session.get(url, headers=headers, timeout=15)
+        if response.status_code == 304 and entry:
+            entry['fetched_at'] = time.time()
+            self._write(url, entry)
+            return entry['body']
+        response.raise_for_status()
+        
+        response.encoding = response_encoding(response)
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'body': response.text
+        }
+        self._write(url, entry)
+        return entry['body']
+
+def find_character_header(soup):
+    """Cabecera de la ficha: el contenedor del h1 con el nombre, sin menús, filtros ni equipos recomendados"""
+    title = soup.find('h1')
+    if title is None:
+        return None
+    for parent in title.parents:
+        if parent.name in ('body', '[document]'):
+            break
+        classes = ' '.join(parent.get('class', [])).lower()
+        if any(marker in classes for marker in ('top', 'header', 'hero')):
+            return parent
+    return title.parent
+
+def find_header_label(header, labels):
+    """Vía/elemento de la cabecera por texto corto o atributo alt; None si no hay ninguno o hay varios distintos"""
+    if header is None:
+        return None
+    found = set()
+    for tag in [header, *header.find_all(True)]:
+        for candidate in (tag.get('alt'), tag.string):
+            if candidate and candidate.strip().lower() in labels:
+                found.add(labels[candidate.strip().lower()])
+    return found.pop() if len(found) == 1 else None
+
+def find_catalog_entry(catalog, char_data):
+    """Entrada del catálogo que corresponde a un personaje del banner (por nombre o slug)"""
+    keys = {normalize_search_text(char_data['name']), normalize_search_text(char_data.get('char_key', '').replace('-', ' '))}
+    for entry in catalog.characters:
+        if {normalize_search_text(entry['name']), normalize_search_text(entry['id'].replace('-', ' '))} & keys:
+            return entry
+    return None
+
+def merge_into_catalog_file(updates, path=CHARACTER_CATALOG_FILE):
+    """Aplica las fichas enriquecidas al fichero del catálogo (la recarga en caliente hace el resto)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    
+    by_id = {entry['id']: entry for entry in entries}
+    for update in updates:
+        entry = by_id.get(update['id'])
+        if entry is None:
+            entries.append(update)
+            by_id[update['id']] = update
+            continue
+        for field in ('path', 'element'):
+            if entry.get(field) == "Unknown" and update[field] != "Unknown":
+                entry[field] = update[field]
+    
+    validate_character_entries(entries)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=4, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+class CharacterEnricher:
+    """Completa el catálogo con las fichas de Prydwen de los 5★ nuevos o con vía/elemento desconocidos"""
+    
+    def __init__(self, headers, cache, base_url="https://www.prydwen.gg/star-rail/characters/"):
+        self.base_url = base_url
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+        self.lock = asyncio.Lock()
+    
+    def find_candidates(self, snapshot):
+        catalog = CATALOG
+        candidates = {}
+        for banner in snapshot.banners:
+            for char_data in banner.featured_5star_char:
+                if not char_data.get('char_key'):
+                    continue
+                entry = find_catalog_entry(catalog, char_data)
+                if entry is None or "Unknown" in (entry['path'], entry['element']):
+                    candidates[char_data['char_key']] = (char_data, entry)
+        return list(candidates.values())
+    
+    def fetch_details(self, char_data, entry):
+        """Descarga y analiza la ficha del personaje (se ejecuta en un hilo)"""
+        html = self.cache.get(self.session, self.base_url + char_data['char_key'])
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        image_tag = soup.find('meta', attrs={'property': 'og:image'})
+        header = find_character_header(soup)
+        # Lo dudoso se queda en "Unknown": un valor equivocado se quedaría para siempre en el catálogo
+        path = find_header_label(header, KNOWN_PATHS) or "Unknown"
+        # El elemento que trae el banner manda; la ficha solo lo completa
+        element = KNOWN_ELEMENTS.get(char_data['element'].lower()) or find_header_label(header, KNOWN_ELEMENTS) or "Unknown"
+        if "Unknown" in (path, element):
+            logger.warning(f"⚠️ Ficha de {char_data['name']} sin vía/elemento claros en la cabecera")
+        
+        if entry is not None:
+            return dict(entry, path=path, element=element)
+        
+        return {
+            'id': char_data['char_key'],
+            'name': char_data['name'],
+            'image': image_tag['content'] if image_tag and image_tag.get('content') else DEFAULT_IMAGE,
+            'rarity': 5,
+            'path': path,
+            'element': element
+        }
+    
+    async def _fetch_bounded(self, char_data, entry):
+        async with self.semaphore:
+            try:
+                return await asyncio.to_thread(self.fetch_details, char_data, entry)
+            except Exception as e:
+                logger.error(f"Error enriqueciendo {char_data['name']}: {e}")
+                return None
+    
+    async def enrich(self, snapshot):
+        """Busca fichas de los personajes incompletos y las fusiona en el catálogo; devuelve los nombres actualizados"""
+        async with self.lock:
+            candidates = self.find_candidates(snapshot)
+            if not candidates:
+                return []
+            
+            logger.info(f"🧩 Enriqueciendo {len(candidates)} personajes: {[c['name'] for c, _ in candidates]}")
+            results = await asyncio.gather(*(self._fetch_bounded(c, e) for c, e in candidates))
+            
+            updates = []
+            for (char_data, entry), result in zip(candidates, results):
+                if result is None:
+                    continue
+                # Solo guardar si aporta algo: personaje nuevo o vía/elemento ya conocidos
+                if entry is None or (result['path'], result['element']) != (entry['path'], entry['element']):
+                    updates.append(result)
+            
+            if not updates:
+                return []
+            
+            try:
+                await asyncio.to_thread(merge_into_catalog_file, updates)
+                await reload_character_catalog()
+            except Exception as e:
+                logger.error(f"Error guardando el catálogo enriquecido: {e}")
+                return []
+            
+            names = [u['name'] for u in updates]
+            logger.info(f"✅ Catálogo enriquecido: {names}")
+            return names
+
+# ============================================
+# SUSCRIPCIONES A PERSONAJES
+# ============================================
+MENTION_MESSAGE_LIMIT = 2000
+
+class SubscriptionStore:
+    """Índice personaje → {usuario: canal} y su inverso usuario → personajes.
+    
+    Se persiste como un diario JSON Lines: cada alta o baja añade una línea en O(1),
+    y al cargar se compacta si las bajas acumuladas lo han inflado.
+    """
+    
+    def __init__(self, path="subscriptions.jsonl"):
+        self.path = path
+        self.by_character = {}
+        self.by_user = {}
+        self.load()
+    
+    def apply(self, record):
+        user_id, character_id = record['u'], record['c']
+        if record.get('del'):
+            subscribers = self.by_character.get(character_id, {})
+            subscribers.pop(user_id, None)
+            if not subscribers:
+                self.by_character.pop(character_id, None)
+            character_ids = self.by_user.get(user_id, set())
+            character_ids.discard(character_id)
+            if not character_ids:
+                self.by_user.pop(user_id, None)
+        else:
+            self.by_character.setdefault(character_id, {})[user_id] = record['ch']
+            self.by_user.setdefault(user_id, set()).add(character_id)
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.apply(json.loads(line))
+                        lines += 1
+        except Exception as e:
+            logger.error(f"Error cargando suscripciones (línea {lines + 1}): {e}")
+        
+        live = sum(len(subscribers) for subscribers in self.by_character.values())
+        if lines > 2 * live + 100:
+            self.compact()
+        logger.info(f"🔔 {live} suscripciones de {len(self.by_user)} usuarios")
+    
+    def append(self, records):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+        except Exception as e:
+            logger.error(f"Error guardando suscripciones: {e}")
+    
+    def compact(self):
+        """Reescribe el diario solo con las suscripciones vivas"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for character_id, subscribers in self.by_character.items():
+                    for user_id, channel_id in subscribers.items():
+                        f.write(json.dumps({'u': user_id, 'c': character_id, 'ch': channel_id}, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error compactando suscripciones: {e}")
+    
+    def subscribe(self, user_id, character_id, channel_id, save=True):
+        """Devuelve False si ya estaba suscrito (el canal de aviso se actualiza igualmente)"""
+        is_new = user_id not in self.by_character.get(character_id, {})
+        record = {'u': user_id, 'c': character_id, 'ch': channel_id}
+        self.apply(record)
+        if save:
+            self.append([record])
+        return is_new
+    
+    def unsubscribe(self, user_id, character_id=None):
+        """Quita una suscripción o, sin personaje, todas las del usuario; devuelve los ids quitados"""
+        removed = [c for c in self.by_user.get(user_id, ()) if character_id in (None, c)]
+        records = [{'u': user_id, 'c': removed_id, 'del': True} for removed_id in removed]
+        for record in records:
+            self.apply(record)
+        if records:
+            self.append(records)
+        return removed
+    
+    def subscriptions_of(self, user_id):
+        return sorted(self.by_user.get(user_id, ()))
+    
+    def plan_notifications(self, character_ids):
+        """Agrupa los suscriptores de cada personaje por canal: {(canal, personaje): [usuarios]}"""
+        plan = {}
+        for character_id in character_ids:
+            for user_id, channel_id in self.by_character.get(character_id, {}).items():
+                plan.setdefault((NOTIFY_CHANNEL or channel_id, character_id), []).append(user_id)
+        return plan
+
+def chunk_mentions(header, user_ids, limit=MENTION_MESSAGE_LIMIT):
+    """Reparte las menciones en el mínimo de mensajes que caben en el límite de Discord"""
+    messages = []
+    current = header
+    for user_id in user_ids:
+        mention = f" <@{user_id}>"
+        if len(current) + len(mention) > limit:
+            messages.append(current)
+            current = header
+        current += mention
+    messages.append(current)
+    return messages
+
+def featured_character_id(catalog, char_data):
+    """Id del catálogo de un 5★ destacado, o su slug de Prydwen si aún no está en él"""
+    entry = find_catalog_entry(catalog, char_data)
+    return entry['id'] if entry else char_data.get('char_key') or normalize_search_text(char_data['name'])
+
+def featured_character_ids(snapshot):
+    """Ids del catálogo (o slug de Prydwen) de los 5★ destacados en un snapshot"""
+    catalog = CATALOG
+    return {
+        featured_character_id(catalog, char_data)
+        for banner in snapshot.banners
+        for char_data in banner.featured_5star_char
+    }
+
+async def notify_new_featured(previous, snapshot):
+    """Un mensaje por canal y personaje recién destacado, con todas las menciones juntas"""
+    if previous is None or snapshot is previous:
+        return 0
+    
+    added = featured_character_ids(snapshot) - featured_character_ids(previous)
+    plan = subscription_store.plan_notifications(added)
+    if not plan:
+        return 0
+    
+    names = {c['id']: c['name'] for c in CATALOG.characters}
+    allowed = discord.AllowedMentions(everyone=False, roles=False, users=True)
+    sent = 0
+    for (channel_id, character_id), user_ids in plan.items():
+        # Con el worker avisa un solo proceso: el canal puede ser de un shard que no tiene en caché
+        try:
+            channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+        except discord.HTTPException:
+            channel = None
+        if channel is None:
+            logger.warning(f"⚠️ Canal de avisos {channel_id} no encontrado ({len(user_ids)} suscriptores)")
+            continue
+        
+        header = f"🔔 **{names.get(character_id, character_id)}** ya tiene banner:"
+        for content in chunk_mentions(header, user_ids):
+            try:
+                await channel.send(content, allowed_mentions=allowed)
+                sent += 1
+            except discord.HTTPException as e:
+                logger.error(f"❌ Error avisando en {channel_id}: {e}")
+    
+    logger.info(f"🔔 Avisos: {len(added)} personajes nuevos, {sum(len(u) for u in plan.values())} suscriptores, {sent} mensajes")
+    return sent
+
+# ============================================
+# CICLO DE VIDA DE LAS PUBLICACIONES
+# ============================================
+LIFECYCLE_CONCURRENCY = 3
+LIFECYCLE_FORGET_DAYS = 30
+
+def banner_stage(banner, now) -> str:
+    """'actual', 'proximo' o 'terminado' según las fechas del banner"""
+    if banner.end_date and banner.end_date <= now:
+        return 'terminado'
+    return 'actual' if is_banner_current(banner, now) else 'proximo'
+
+class PostLifecycle:
+    """Etapa de cada par personaje-banner (próximo → actual → terminado), persistida entre reinicios"""
+    
+    def __init__(self, path="post_lifecycle.json"):
+        self.path = path
+        self.stages = self.load()
+    
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error cargando ciclo de vida: {e}")
+        return {}
+    
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stages, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando ciclo de vida: {e}")
+    
+    @staticmethod
+    def observe(snapshot, now):
+        """Etapa actual de cada par personaje-banner del snapshot"""
+        observed = {}
+        for banner in snapshot.banners:
+            stage = banner_stage(banner, now)
+            end_date = banner.end_date.isoformat() if banner.end_date else ""
+            for char_data in banner.featured_5star_char:
+                char_id = re.sub(r'[^a-zA-Z0-9]', '', char_data['name'].lower())
+                observed[f"{char_id}|{banner.banner_id}"] = {
+                    'character': char_data['name'],
+                    'char_id': char_id,
+                    'stage': stage,
+                    'end_date': end_date
+                }
+        return observed
+    
+    def diff(self, observed, now):
+        """Transiciones respecto al estado guardado"""
+        transitions = []
+        for key, entry in observed.items():
+            previous = self.stages.get(key)
+            if previous is None or previous['stage'] != entry['stage']:
+                transitions.append({**entry, 'key': key, 'from': previous['stage'] if previous else None, 'to': entry['stage']})
+        
+        # Prydwen quita los banners al terminar; si desaparece uno que aún no acabó (o sin fecha de fin), es un fallo de scrape
+        for key, previous in self.stages.items():
+            if (key not in observed and previous['stage'] != 'terminado'
+                    and previous['end_date'] and previous['end_date'] <= now.isoformat()):
+                transitions.append({**previous, 'key': key, 'from': previous['stage'], 'to': 'terminado'})
+        return transitions
+    
+    def commit(self, observed, transitions, now, failed=()):
+        # Las transiciones cuyo hilo no se pudo retirar no se dan por hechas: se replanifican en la siguiente
+        pending = {transition['key'] for transition in transitions if transition['char_id'] in failed}
+        
+        # Lo observado refresca también la fecha de fin, que Prydwen a veces corrige
+        for key, entry in observed.items():
+            if key not in pending:
+                self.stages[key] = entry
+            elif key in self.stages:
+                self.stages[key] = {**entry, 'stage': self.stages[key]['stage']}
+        for transition in transitions:
+            if transition['key'] not in observed and transition['key'] not in pending:
+                self.stages[transition['key']]['stage'] = transition['to']
+        
+        # Olvidar los banners terminados hace tiempo para que el estado no crezca sin límite
+        cutoff = (now - relativedelta(days=LIFECYCLE_FORGET_DAYS)).isoformat()
+        self.stages = {
+            key: entry for key, entry in self.stages.items()
+            if not (entry['stage'] == 'terminado' and entry['end_date'] and entry['end_date'] < cutoff)
+        }
+        self.save()
+
+def plan_lifecycle_jobs(transitions, observed, forums):
+    """Traduce las transiciones en un lote de retiradas: (foro, char_id, personaje, aviso, tipo)"""
+    live_stages = {}
+    for entry in observed.values():
+        live_stages.setdefault(entry['char_id'], set()).add(entry['stage'])
+    
+    jobs = {}
+    for transition in transitions:
+        char_id = transition['char_id']
+        still_live = live_stages.get(char_id, set())
+        
+        if transition['to'] == 'actual' and 'proximo' not in still_live and forums.get('proximo'):
+            jobs[(forums['proximo'], char_id)] = (transition['character'], 'promoted')
+        
+        elif transition['to'] == 'terminado':
+            # Sin etapa previa (primer arranque) se limpian ambos foros
+            stages = [transition['from']] if transition['from'] else ['actual', 'proximo']
+            for stage in stages:
+                if stage not in still_live and forums.get(stage):
+                    jobs.setdefault((forums[stage], char_id), (transition['character'], 'retired'))
+    
+    return [(forum_id, char_id, character, kind) for (forum_id, char_id), (character, kind) in jobs.items()]
+
+async def apply_lifecycle_jobs(jobs, actual_forum_id=None):
+    """Enlaza y archiva los hilos retirados con concurrencia acotada; 'failed' lista los que hay que reintentar"""
+    stats = {'promoted': 0, 'retired': 0, 'errors': 0, 'failed': []}
+    semaphore = asyncio.Semaphore(LIFECYCLE_CONCURRENCY)
+    
+    async def retire(forum_id, char_id, character, kind):
+        record = forum_manager.get_post(forum_id, char_id)
+        if not record:
+            return
+        async with semaphore:
+            try:
+                thread = bot.get_channel(record['thread_id']) or await bot.fetch_channel(record['thread_id'])
+                if kind == 'promoted':
+                    live = forum_manager.get_post(actual_forum_id, char_id) if actual_forum_id else None
+                    link = f" <#{live['thread_id']}>" if live else ""
+                    await thread.send(f"🔴 **{character} ya está en el banner actual.**{link}")
+                else:
+                    await thread.send(f"🏁 **El banner de {character} ha terminado.**")
+                await thread.edit(archived=True, locked=True)
+                stats[kind] += 1
+                logger.info(f"📦 Hilo retirado ({kind}): {character}")
+            except discord.NotFound:
+                logger.warning(f"⚠️ El hilo de {character} ya no existe")
+            except discord.HTTPException as e:
+                stats['errors'] += 1
+                stats['failed'].append(char_id)
+                logger.error(f"❌ Error retirando el hilo de {character}: {e}")
+                return
+            forum_manager.remove_post(forum_id, char_id)
+    
+    await asyncio.gather(*(retire(*job) for job in jobs))
+    return stats
+
+# ============================================
+# HISTORIAL DE BANNERS EN COLUMNAS
+# ============================================
+HISTORY_MERGE_GAP = 7 * 86400  # Una reaparición del mismo banner tras este hueco es un rerun
+
+class BannerHistory:
+    """Una fila por aparición personaje-banner en columnas NumPy, agregadas sin bucles Python"""
+    
+    def __init__(self, path="banner_history.npz"):
+        self.path = path
+        self.characters, self.banners = [], []
+        self.char = np.zeros(0, dtype=np.int16)
+        self.banner = np.zeros(0, dtype=np.int32)
+        self.start = np.zeros(0, dtype=np.int64)
+        self.end = np.zeros(0, dtype=np.int64)  # 0 = fecha de fin aún desconocida
+        self.load()
+        self.char_codes = {char_id: code for code, char_id in enumerate(self.characters)}
+        self.banner_codes = {banner_id: code for code, banner_id in enumerate(self.banners)}
+    
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with np.load(self.path, allow_pickle=False) as data:
+                    self.characters = data['characters'].tolist()
+                    self.banners = data['banners'].tolist()
+                    self.char, self.banner = data['char'], data['banner']
+                    self.start, self.end = data['start'], data['end']
+                logger.info(f"📚 Historial de banners: {len(self.char)} apariciones de {len(self.characters)} personajes")
+        except Exception as e:
+            logger.error(f"Error cargando historial de banners: {e}")
+    
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f, characters=np.array(self.characters, dtype=str), banners=np.array(self.banners, dtype=str),
+                    char=self.char, banner=self.banner, start=self.start, end=self.end
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando historial de banners: {e}")
+    
+    @staticmethod
+    def code(codes, names, key):
+        if key not in codes:
+            codes[key] = len(names)
+            names.append(key)
+        return codes[key]
+    
+    def record(self, snapshot):
+        """Añade las apariciones nuevas del snapshot o completa sus fechas; devuelve cuántas filas cambiaron"""
+        catalog = CATALOG
+        new_rows = []
+        changed = 0
+        
+        for banner in snapshot.banners:
+            start = int((banner.start_date or snapshot.fetched_at).timestamp())
+            end = int(banner.end_date.timestamp()) if banner.end_date else 0
+            for char_data in banner.featured_5star_char:
+                char = self.code(self.char_codes, self.characters, featured_character_id(catalog, char_data))
+                banner_code = self.code(self.banner_codes, self.banners, banner.banner_id or banner.name)
+                
+                rows = np.flatnonzero((self.char == char) & (self.banner == banner_code))
+                if len(rows):
+                    row = rows[np.argmax(self.start[rows])]
+                    if self.end[row] == 0 or start <= self.end[row] + HISTORY_MERGE_GAP:
+                        # La misma aparición: Prydwen puede publicar o corregir las fechas más tarde
+                        if (banner.start_date and self.start[row] != start) or (end and self.end[row] != end):
+                            self.start[row] = start if banner.start_date else self.start[row]
+                            self.end[row] = end or self.end[row]
+                            changed += 1
+                        continue
+                new_rows.append((char, banner_code, start, end))
+        
+        if new_rows:
+            char, banner_code, start, end = zip(*new_rows)
+            self.char = np.concatenate([self.char, np.array(char, dtype=np.int16)])
+            self.banner = np.concatenate([self.banner, np.array(banner_code, dtype=np.int32)])
+            self.start = np.concatenate([self.start, np.array(start, dtype=np.int64)])
+            self.end = np.concatenate([self.end, np.array(end, dtype=np.int64)])
+            logger.info(f"📚 {len(new_rows)} apariciones nuevas en el historial de banners")
+        
+        if new_rows or changed:
+            self.save()
+        return len(new_rows) + changed
+    
+    def summary(self, char_ids=None, now=None):
+        """Por personaje: apariciones pasadas, último fin, días desde entonces y próxima vuelta conocida"""
+        now = int((now or datetime.now()).timestamp())
+        if char_ids is None:
+            selected = np.ones(len(self.char), dtype=bool)
+        else:
+            codes = [self.char_codes[char_id] for char_id in char_ids if char_id in self.char_codes]
+            selected = np.isin(self.char, codes)
+        
+        size = len(self.characters)
+        past = selected & (self.start <= now)
+        future = selected & (self.start > now)
+        effective_end = np.where(self.end > 0, self.end, now)  # Sin fecha de fin: sigue en banner
+        
+        appearances = np.bincount(self.char[past], minlength=size)
+        last_end = np.zeros(size, dtype=np.int64)
+        np.maximum.at(last_end, self.char[past], effective_end[past])
+        next_start = np.full(size, np.iinfo(np.int64).max)
+        np.minimum.at(next_start, self.char[future], self.start[future])
+        
+        days_since = np.maximum(now - last_end, 0) // 86400
+        upcoming = next_start < np.iinfo(np.int64).max
+        
+        results = []
+        for code in np.flatnonzero((appearances > 0) | upcoming):
+            results.append({
+                'char_id': self.characters[code],
+                'appearances': int(appearances[code]),
+                'reruns': max(int(appearances[code]) - 1, 0),
+                'last_end': int(last_end[code]) if appearances[code] else None,
+                'on_banner': bool(appearances[code]) and last_end[code] >= now,
+                'days_since': int(days_since[code]) if appearances[code] else None,
+                'next_start': int(next_start[code]) if upcoming[code] else None
+            })
+        # Los que más tiempo llevan sin banner, primero
+        results.sort(key=lambda r: (r['on_banner'], -(r['days_since'] if r['days_since'] is not None else -1)))
+        return results
+    
+    def appearances_of(self, char_id):
+        """Fechas (inicio, fin) de cada aparición de un personaje, de la más reciente a la más antigua"""
+        if char_id not in self.char_codes:
+            return []
+        rows = np.flatnonzero(self.char == self.char_codes[char_id])
+        rows = rows[np.argsort(self.start[rows])[::-1]]
+        return [(int(self.start[row]), int(self.end[row])) for row in rows]
+
+# ============================================
+# TAREAS EN SEGUNDO PLANO
+# ============================================
+# El bucle de eventos solo guarda referencias débiles a las tareas: sin esta, podrían recogerse a medias
+_background_tasks = set()
+
+def spawn_background(coro, name):
+    """Lanza una tarea sin esperarla, con referencia fuerte y registro de sus fallos"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
+def _background_task_done(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Tarea en segundo plano '{task.get_name()}' falló: {task.exception()!r}")
+
+# ============================================
+# PUBLICACIÓN DE SNAPSHOTS ENTRE PROCESOS
+# ============================================
+SCRAPER_SOCKET = os.environ.get('SCRAPER_SOCKET', '')
+SNAPSHOT_FEED_LINE_LIMIT = 64 * 1024 * 1024
+SNAPSHOT_FEED_RECONNECT_MAX = 30.0
+SNAPSHOT_FEED_REFRESH_TIMEOUT = 60.0
+# Línea de control del worker: el bot que la recibe es el único que envía los avisos de suscripción
+SNAPSHOT_FEED_NOTIFIER_LINE = b'notifier\n'
+# Petición de refresco del bot y respuesta del worker tras el scrape: 'published', 'unchanged' o 'failed'
+SNAPSHOT_FEED_REFRESH_LINE = b'refresh\n'
+SNAPSHOT_FEED_REFRESHED_PREFIX = b'refreshed '
+
+def encode_snapshot_message(snapshot, epoch, version) -> bytes:
+    """Una línea JSON por versión: (época del worker, versión) ordena los snapshots"""
+    return json.dumps({
+        'epoch': epoch,
+        'version': version,
+        'stale': snapshot.stale,
+        'snapshot': snapshot.to_dict()
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+def decode_snapshot_message(line):
+    data = json.loads(line)
+    snapshot = Snapshot.from_dict(data['snapshot'])
+    snapshot.stale = data['stale']
+    return data['epoch'], data['version'], snapshot
+
+class SnapshotPublisher:
+    """Lado del worker: servidor en un socket Unix que envía cada snapshot nuevo a todos los bots"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.epoch = time.time_ns()
+        self.version = 0
+        self.latest = None
+        self.published = None
+        self.published_stale = None
+        self.clients = {}  # Por orden de conexión: el primero es el que avisa a los suscriptores
+        self.refresh_requested = asyncio.Event()
+        self.refresh_waiters = set()  # Bots que esperan la respuesta al próximo scrape
+    
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Socket huérfano de una ejecución anterior
+        self.server = await asyncio.start_unix_server(self.handle_client, self.path, limit=SNAPSHOT_FEED_LINE_LIMIT)
+        logger.info(f"📡 Publicando snapshots en {self.path}")
+    
+    async def handle_client(self, reader, writer):
+        self.clients[writer] = None
+        logger.info(f"🔌 Bot suscrito ({len(self.clients)} conectados)")
+        try:
+            if len(self.clients) == 1:
+                writer.write(SNAPSHOT_FEED_NOTIFIER_LINE)
+            if self.latest:
+                writer.write(self.latest)
+                await writer.drain()
+            # Lo único que envían los bots es la petición de refresco de !refresh_forum
+            while line := await reader.readline():
+                if line == SNAPSHOT_FEED_REFRESH_LINE:
+                    self.refresh_waiters.add(writer)
+                    self.refresh_requested.set()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            was_notifier = next(iter(self.clients), None) is writer
+            self.clients.pop(writer, None)
+            self.refresh_waiters.discard(writer)
+            writer.close()
+            logger.info(f"🔌 Bot desconectado ({len(self.clients)} conectados)")
+            if was_notifier and self.clients:
+                # El siguiente bot más antiguo hereda los avisos
+                next(iter(self.clients)).write(SNAPSHOT_FEED_NOTIFIER_LINE)
+    
+    async def publish(self, snapshot):
+        """Publica si es un snapshot nuevo o si cambió su marca de obsoleto"""
+        if self.published is snapshot and snapshot.stale == self.published_stale:
+            return False
+        self.version += 1
+        self.published, self.published_stale = snapshot, snapshot.stale
+        self.latest = encode_snapshot_message(snapshot, self.epoch, self.version)
+        
+        for writer in list(self.clients):
+            writer.write(self.latest)
+        results = await asyncio.gather(*(writer.drain() for writer in list(self.clients)), return_exceptions=True)
+        
+        logger.info(f"📡 Snapshot v{self.version} publicado a {len(results)} bots ({len(self.latest) / 1024:.0f} KiB)")
+        return True
+    
+    def take_refresh_waiters(self):
+        """Bots cuya petición cubre el scrape que empieza ahora; las que lleguen durante él esperan al siguiente"""
+        self.refresh_requested.clear()
+        waiters, self.refresh_waiters = self.refresh_waiters, set()
+        return waiters
+    
+    async def answer_refresh(self, waiters, status):
+        """Responde a cada petición de refresco, se haya publicado algo o no"""
+        line = SNAPSHOT_FEED_REFRESHED_PREFIX + status.encode('ascii') + b'\n'
+        waiters = [writer for writer in waiters if writer in self.clients]
+        for writer in waiters:
+            writer.write(line)
+        await asyncio.gather(*(writer.drain() for writer in waiters), return_exceptions=True)
+
+class SnapshotSubscriber:
+    """Lado del bot: recibe los snapshots del worker y nunca hace scraping por su cuenta"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.epoch = None
+        self.version = 0
+        self.writer = None
+        self.notifier = False  # Solo un bot por worker avisa a los suscriptores
+        self.refresh_reply = None  # Futuro con el estado que devuelve el worker al refresco pedido
+        self.task = None
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    async def run(self):
+        delay = 1.0
+        while True:
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path, limit=SNAPSHOT_FEED_LINE_LIMIT)
+                logger.info(f"📡 Suscrito al worker de scraping en {self.path}")
+                delay = 1.0
+                while line := await reader.readline():
+                    if line == SNAPSHOT_FEED_NOTIFIER_LINE:
+                        self.notifier = True
+                        logger.info("🔔 Este bot envía los avisos de suscripción")
+                        continue
+                    if line.startswith(SNAPSHOT_FEED_REFRESHED_PREFIX):
+                        self.resolve_refresh(line[len(SNAPSHOT_FEED_REFRESHED_PREFIX):].strip().decode('ascii'))
+                        continue
+                    self.apply(*decode_snapshot_message(line))
+                logger.warning("📡 El worker de scraping cerró la conexión")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"📡 Sin conexión con el worker de scraping: {e}")
+            finally:
+                self.writer = None
+                # Al reconectar, el worker vuelve a elegir quién avisa
+                self.notifier = False
+                # La respuesta no llegará por esta conexión
+                self.resolve_refresh(None)
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SNAPSHOT_FEED_RECONNECT_MAX)
+    
+    def apply(self, epoch, version, snapshot):
+        # Un worker reiniciado tiene otra época y vuelve a numerar desde 1
+        if epoch == self.epoch and version <= self.version:
+            return
+        self.epoch, self.version = epoch, version
+        previous = scraper.last_snapshot
+        scraper.last_snapshot = snapshot
+        logger.info(f"📥 Snapshot v{version} recibido: {len(snapshot.banners)} banners, {len(snapshot.endgame)} End Game")
+        
+        if self.notifier:
+            spawn_background(notify_new_featured(previous, snapshot), "avisos de suscripción")
+        banner_history.record(snapshot)
+    
+    def resolve_refresh(self, status):
+        if self.refresh_reply is not None and not self.refresh_reply.done():
+            self.refresh_reply.set_result(status)
+    
+    async def request_refresh(self, timeout=SNAPSHOT_FEED_REFRESH_TIMEOUT):
+        """Pide al worker un scrape inmediato y espera su respuesta; None si no contesta"""
+        if self.writer is None:
+            return None
+        # Peticiones simultáneas comparten la misma respuesta
+        if self.refresh_reply is None or self.refresh_reply.done():
+            self.refresh_reply = asyncio.get_running_loop().create_future()
+            self.writer.write(SNAPSHOT_FEED_REFRESH_LINE)
+            await self.writer.drain()
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.refresh_reply), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+# ============================================
+# PROBABILIDADES DE WARP
+# ============================================
+WARP_BASE_RATE = 0.006
+WARP_SOFT_PITY_START = 74      # Primera tirada con probabilidad aumentada
+WARP_SOFT_PITY_STEP = 0.06     # +6% por cada tirada desde entonces
+WARP_HARD_PITY = 90
+WARP_FEATURED_RATE = 0.5       # 50/50: si se pierde, el siguiente 5★ es el destacado
+WARP_MAX_COPIES = 7            # E6; la última casilla acumula "7 o más"
+WARP_MAX_PULLS = 1800
+WARP_MONTE_CARLO_PULLS = 20_000_000  # Tiradas simuladas por consulta como comprobación
+WARP_MONTE_CARLO_MAX_RUNS = 200_000
+
+def five_star_rates():
+    """Probabilidad de 5★ en la siguiente tirada según las tiradas acumuladas sin 5★ (0..89)"""
+    pull = np.arange(1, WARP_HARD_PITY + 1)
+    rates = WARP_BASE_RATE + WARP_SOFT_PITY_STEP * np.maximum(pull - WARP_SOFT_PITY_START + 1, 0)
+    rates[-1] = 1.0
+    return np.minimum(rates, 1.0)
+
+FIVE_STAR_RATES = five_star_rates()
+
+WarpOdds = namedtuple('WarpOdds', 'copies simulated runs')
+
+def warp_copies_distribution(pulls, pity=0, guaranteed=False):
+    """Distribución exacta de copias del 5★ destacado tras `pulls` tiradas"""
+    # Estado: (copias, garantizado, pity) → probabilidad; cada tirada es una operación sobre la matriz entera
+    state = np.zeros((WARP_MAX_COPIES + 1, 2, WARP_HARD_PITY))
+    state[0, int(guaranteed), pity] = 1.0
+    miss_rates = 1.0 - FIVE_STAR_RATES[:-1]
+    
+    for _ in range(pulls):
+        hits = state @ FIVE_STAR_RATES
+        state[:, :, 1:] = state[:, :, :-1] * miss_rates
+        state[:, :, 0] = 0.0
+        won = hits[:, 1] + WARP_FEATURED_RATE * hits[:, 0]
+        state[1:, 0, 0] += won[:-1]
+        state[-1, 0, 0] += won[-1]
+        state[:, 1, 0] += (1.0 - WARP_FEATURED_RATE) * hits[:, 0]
+    
+    return state.sum(axis=(1, 2))
+
+def simulate_warps(pulls, pity=0, guaranteed=False, runs=10_000, rng=None):
+    """Monte Carlo por lotes: cada tirada avanza todas las simulaciones a la vez"""
+    rng = rng or np.random.default_rng()
+    pity_now = np.full(runs, pity, dtype=np.int16)
+    guaranteed_now = np.full(runs, guaranteed)
+    copies = np.zeros(runs, dtype=np.int16)
+    
+    for _ in range(pulls):
+        hit = rng.random(runs, dtype=np.float32) < FIVE_STAR_RATES[pity_now]
+        won = hit & (guaranteed_now | (rng.random(runs, dtype=np.float32) < WARP_FEATURED_RATE))
+        copies += won
+        guaranteed_now = (guaranteed_now & ~hit) | (hit & ~won)
+        pity_now += 1
+        pity_now[hit] = 0
+    
+    return np.bincount(np.minimum(copies, WARP_MAX_COPIES), minlength=WARP_MAX_COPIES + 1) / runs
+
+@functools.lru_cache(maxsize=256)
+def warp_odds(pulls, pity=0, guaranteed=False):
+    """Distribución exacta más la comprobación por Monte Carlo, cacheada por parámetros"""
+    exact = warp_copies_distribution(pulls, pity, guaranteed)
+    runs = max(1000, min(WARP_MONTE_CARLO_MAX_RUNS, WARP_MONTE_CARLO_PULLS // max(pulls, 1)))
+    simulated = simulate_warps(pulls, pity, guaranteed, runs)
+    
+    expected, observed = 1.0 - exact[0], 1.0 - simulated[0]
+    tolerance = 4 * np.sqrt(max(expected * (1 - expected), 1 / runs) / runs)
+    if abs(expected - observed) > tolerance:
+        logger.warning(f"⚠️ Monte Carlo discrepa del cálculo exacto ({pulls} tiradas, pity {pity}): {observed:.4f} vs {expected:.4f}")
+    
+    return WarpOdds(tuple(float(p) for p in exact), float(observed), runs)
+
+# ============================================
+# INSTANCIAS GLOBALES
+# ============================================
+snapshot_store = SnapshotStore()
+page_archive = PageArchive()
+scraper = BannerScraper(store=snapshot_store, archive=page_archive)
+forum_manager = ForumManager()
+character_enricher = CharacterEnricher(scraper.headers, HttpCache())
+subscription_store = SubscriptionStore()
+post_lifecycle = PostLifecycle()
+banner_history = BannerHistory()
+# Con un worker de scraping configurado, este proceso solo se suscribe a sus snapshots
+snapshot_subscriber = SnapshotSubscriber(SCRAPER_SOCKET) if SCRAPER_SOCKET else None
+
+# ============================================
+# FUNCIONES AUXILIARES
+# ============================================
+def get_path_emoji(path: str) -> str:
+    """Devuelve el emoji de la Vía"""
+    path_emojis = {
+        'Abundance': '🌿',
+        'Destruction': '💥',
+        'Erudition': '📚',
+        'Harmony': '🎵',
+        'Nihility': '🌑',
+        'Preservation': '🛡️',
+        'The Hunt': '🏹',
         'Remembrance': '📖',
         'Elation': '🎭',
         'Unknown': '❓'
@@ -1075,267 +2627,988 @@ def get_element_emoji(element: str) -> str:
     }
     return element_emojis.get(element, '❓')
 
-async def create_character_post(forum_channel, character_name, character_info, banner_info, status):
-    """Crea una publicación en el foro para un personaje 5★"""
+SNAPSHOT_TTL = 15 * 60
+_snapshot_refresh_task = None
+
+async def refresh_snapshot():
+    """Descarga un snapshot en un hilo aparte para no bloquear el bucle de eventos"""
+    previous = scraper.last_snapshot
+    try:
+        # Traza propia: el refresco es compartido y puede sobrevivir al comando que lo lanzó
+        with tracer.trace("refresh snapshot"):
+            snapshot = await asyncio.to_thread(scraper.get_snapshot)
+    except Exception as e:
+        logger.error(f"Error refrescando snapshot: {e}")
+        return scraper.last_snapshot
+    
+    # Completar en segundo plano los 5★ que aún no están en el catálogo
+    spawn_background(character_enricher.enrich(snapshot), "enriquecer catálogo")
+    spawn_background(notify_new_featured(previous, snapshot), "avisos de suscripción")
+    banner_history.record(snapshot)
+    return snapshot
+
+def schedule_snapshot_refresh():
+    """Lanza un refresco en segundo plano si no hay otro en curso"""
+    global _snapshot_refresh_task
+    if _snapshot_refresh_task is None or _snapshot_refresh_task.done():
+        _snapshot_refresh_task = asyncio.create_task(refresh_snapshot())
+    return _snapshot_refresh_task
+
+async def get_current_snapshot(force_refresh=False):
+    """Responde al momento con el snapshot en memoria y lo revalida en segundo plano si caducó"""
+    if snapshot_subscriber:
+        if force_refresh:
+            status = await snapshot_subscriber.request_refresh()
+            if status is None:
+                logger.warning("⚠️ El worker de scraping no respondió a la petición de refresco")
+            elif status == 'failed':
+                logger.warning("⚠️ El scrape pedido al worker falló; se usa el último snapshot")
+        if scraper.last_snapshot is None:
+            raise ScrapeError("el worker de scraping aún no ha publicado ningún snapshot")
+        return scraper.last_snapshot
+    
+    snapshot = scraper.last_snapshot
+    
+    if snapshot is None or force_refresh:
+        snapshot = await schedule_snapshot_refresh()
+        if snapshot is None:
+            raise ScrapeError("no hay datos disponibles")
+        return snapshot
+    
+    if snapshot.age_seconds() > SNAPSHOT_TTL:
+        schedule_snapshot_refresh()
+    return snapshot
+
+def format_snapshot_age(snapshot) -> str:
+    """Texto con la antigüedad de los datos para mostrar en las respuestas"""
+    seconds = int(snapshot.age_seconds())
+    if seconds < 60:
+        age = "hace menos de 1 min"
+    elif seconds < 3600:
+        age = f"hace {seconds // 60} min"
+    elif seconds < 86400:
+        age = f"hace {seconds // 3600}h {seconds % 3600 // 60}min"
+    else:
+        age = f"hace {seconds // 86400}d {seconds % 86400 // 3600}h"
     
-    status_emoji = "🔴" if status == "actual" else "🟡"
+    if snapshot.stale:
+        return f"⚠️ Prydwen no responde: datos de {age}"
+    return f"🕒 Datos de {age}"
+
+# ============================================
+# VIGILANCIA DEL BUCLE DE EVENTOS
+# ============================================
+LOOP_LAG_THRESHOLD = float(os.environ.get('LOOP_LAG_THRESHOLD_MS', '250')) / 1000
+LOOP_HEARTBEAT_INTERVAL = 0.1
+LOOP_SAMPLE_INTERVAL = 0.02
+
+class LoopLagWatchdog:
+    """Mide el retraso del bucle con un latido y, si se bloquea, muestrea la pila del hilo del bucle"""
+    
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, interval=LOOP_HEARTBEAT_INTERVAL,
+                 sample_interval=LOOP_SAMPLE_INTERVAL, max_samples=600):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.delays = deque(maxlen=max_samples)
+        self.offenders = {}  # (sitio en bot.py, llamada bloqueante) -> [segundos, bloqueos]
+        self.stalls = 0
+        self.last_beat = time.monotonic()
+        self.loop_thread_id = None
+        self.heartbeat_task = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+    
+    def start(self):
+        if self.heartbeat_task and not self.heartbeat_task.done():
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopped.clear()
+        self.heartbeat_task = asyncio.get_running_loop().create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+        logger.info(f"🐕 Vigilancia del bucle activa (umbral {self.threshold * 1000:.0f} ms)")
+    
+    def stop(self):
+        self.stopped.set()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+    
+    async def heartbeat(self):
+        """Cuánto tarda en despertar un sleep corto es el retraso de planificación del bucle"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self.last_beat = time.monotonic()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.delays.append(max(0.0, loop.time() - start - self.interval))
+    
+    @staticmethod
+    def sample_stack(frame):
+        """Devuelve (sitio más interno de bot.py, llamada más interna) de la pila del bucle"""
+        innermost = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}"
+        while frame is not None:
+            if frame.f_code.co_filename == __file__:
+                return f"{frame.f_code.co_name}:{frame.f_lineno}", innermost
+            frame = frame.f_back
+        return "(fuera de bot.py)", innermost
+    
+    def watch(self):
+        """Hilo aparte: el bucle bloqueado no puede vigilarse a sí mismo"""
+        stall_sites = None
+        stall_start = None
+        while not self.stopped.wait(self.sample_interval):
+            blocked_for = time.monotonic() - self.last_beat - self.interval
+            if blocked_for < self.threshold:
+                if stall_sites is not None:
+                    self.finish_stall(time.monotonic() - stall_start, stall_sites)
+                    stall_sites = None
+                continue
+            
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            site = self.sample_stack(frame)
+            del frame
+            
+            if stall_sites is None:
+                stall_sites = {}
+                stall_start = self.last_beat + self.interval
+            stall_sites[site] = stall_sites.get(site, 0) + 1
+    
+    def finish_stall(self, duration, stall_sites):
+        total_samples = sum(stall_sites.values())
+        with self.lock:
+            self.stalls += 1
+            # La duración del bloqueo se reparte entre los sitios según sus muestras
+            for site, samples in stall_sites.items():
+                counts = self.offenders.setdefault(site, [0.0, 0])
+                counts[0] += duration * samples / total_samples
+                counts[1] += 1
+        (bot_site, call), _ = max(stall_sites.items(), key=lambda item: item[1])
+        logger.warning("🐢 Bucle bloqueado %.0f ms en %s → %s", duration * 1000, bot_site, call, extra=SAMPLED)
+    
+    def percentile(self, fraction):
+        delays = sorted(self.delays)
+        if not delays:
+            return None
+        return delays[min(len(delays) - 1, int(len(delays) * fraction))]
+    
+    def worst_offenders(self, limit=5):
+        """Sitios ordenados por tiempo total bloqueado"""
+        with self.lock:
+            items = sorted(self.offenders.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            (bot_site, call, seconds, stalls)
+            for (bot_site, call), (seconds, stalls) in items[:limit]
+        ]
+
+loop_watchdog = LoopLagWatchdog()
+
+# ============================================
+# PAGINACIÓN INTERACTIVA
+# ============================================
+PAGE_CHAR_LIMIT = 1900
+PAGINATOR_TIMEOUT = 10 * 60
+ALL_OPTION = "todos"
+
+def paginate_blocks(header, blocks, footer="", limit=PAGE_CHAR_LIMIT):
+    """Agrupa bloques completos en páginas: nunca corta una línea ni un marcador markdown"""
+    pages = []
+    current = header
+    for block in blocks:
+        if current != header and len(current) + len(block) + len(footer) > limit:
+            pages.append(current + footer)
+            current = header
+        current += block
+    pages.append(current + footer)
+    return pages
+
+class SnapshotPaginator(discord.ui.View):
+    """Pasa páginas y filtra sobre el snapshot ya cargado: sin re-scrape ni mensajes nuevos"""
+    
+    def __init__(self, render, filters=None, timeout=PAGINATOR_TIMEOUT):
+        super().__init__(timeout=timeout)
+        # render(**filtros) -> lista de páginas; filters: nombre -> (placeholder, [(valor, etiqueta)])
+        self.render = render
+        self.filters = {name: ALL_OPTION for name in (filters or {})}
+        self.pages = render(**self.filters)
+        self.page = 0
+        self.message = None
+        self.owner_id = None  # Quien usó el comando; lo fija quien envía la respuesta
+        
+        for row, (name, (placeholder, options)) in enumerate((filters or {}).items(), start=1):
+            select = discord.ui.Select(
+                placeholder=placeholder,
+                options=[discord.SelectOption(label=label, value=value) for value, label in options],
+                row=row
+            )
+            select.callback = self.make_filter_callback(name, select)
+            self.add_item(select)
+        
+        self.update_buttons()
+    
+    @property
+    def content(self):
+        return self.pages[self.page]
+    
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+        self.page_counter.label = f"{self.page + 1}/{len(self.pages)}"
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Solo quien usó el comando pasa páginas o filtra; al resto se le avisa en privado"""
+        if self.owner_id is None or interaction.user.id == self.owner_id:
+            return True
+        await interaction.response.send_message("🔒 **Estos controles son de quien usó el comando.** Usa tú el comando para tener los tuyos.", ephemeral=True)
+        return False
     
-    # Título: nombre del personaje
-    thread_name = f"{status_emoji} {character_name}"
+    async def show(self, interaction):
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.content, view=self)
+    
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary, row=0)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self.show(interaction)
+    
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True, row=0)
+    async def page_counter(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+    
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary, row=0)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(len(self.pages) - 1, self.page + 1)
+        await self.show(interaction)
+    
+    def make_filter_callback(self, name, select):
+        async def callback(interaction: discord.Interaction):
+            value = select.values[0]
+            self.filters[name] = value
+            # Mantener visible la opción elegida tras editar el mensaje
+            for option in select.options:
+                option.default = option.value == value
+            self.pages = self.render(**self.filters)
+            self.page = 0
+            await self.show(interaction)
+        return callback
+    
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+# ============================================
+# RESPUESTAS DE COMANDOS
+# ============================================
+NO_DATA_MESSAGE = "❌ **Prydwen no responde y no hay datos guardados.** Inténtalo más tarde."
+
+class CommandLatencyTracker:
+    """Registra la latencia de extremo a extremo (invocación → última respuesta) por comando"""
     
-    # Crear la publicación con la imagen como contenido principal
-    thread = await forum_channel.create_thread(
-        name=thread_name,
-        content=character_info['image'],
-        auto_archive_duration=10080
-    )
+    def __init__(self, max_samples=200):
+        self.samples = {}
+        self.max_samples = max_samples
     
-    thread_obj = thread[0] if isinstance(thread, tuple) else thread
+    def record(self, command_name, seconds):
+        self.samples.setdefault(command_name, deque(maxlen=self.max_samples)).append(seconds)
+        logger.info(f"⏱️ {command_name}: {seconds * 1000:.0f} ms")
     
-    # Formatear la información del personaje incluyendo la duración
-    duration_clean = banner_info['duration_text'].replace('Event Duration', '').strip()
+    def percentile(self, command_name, fraction):
+        samples = sorted(self.samples.get(command_name, []))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+    
+    def report_lines(self):
+        lines = []
+        for command_name in sorted(self.samples):
+            p50 = self.percentile(command_name, 0.5)
+            p95 = self.percentile(command_name, 0.95)
+            lines.append(f"`{command_name}` - p50 {p50 * 1000:.0f} ms · p95 {p95 * 1000:.0f} ms · {len(self.samples[command_name])} usos")
+        return lines
+
+command_latency = CommandLatencyTracker()
+
+def is_banner_current(banner, now) -> bool:
+    """Un banner es actual si no ha terminado y ya empezó (o no tiene fecha de inicio)"""
+    if banner.end_date and banner.end_date > now:
+        if banner.start_date and banner.start_date > now:
+            return False
+        return True
+    return False
+
+def collect_banner_characters(snapshot):
+    """Personajes 5★ sin duplicados, con su estado y su vía/elemento del catálogo"""
+    now = datetime.now()
+    entries = []
+    processed_names = set()
     
-    info_text = (
-        f"**{character_name}**\n"
-        f"{get_path_emoji(character_info['path'])} {character_info['path']}\n"
-        f"{get_element_emoji(character_info['element'])} {character_info['element']}\n"
-        f"⏳ **Duración:** {duration_clean}"
+    for banner in snapshot.banners:
+        status = 'actual' if is_banner_current(banner, now) else 'proximo'
+        
+        for char in banner.featured_5star_char:
+            if char['name'] in processed_names:
+                continue
+            processed_names.add(char['name'])
+            info = get_character_info(char['name']) or {}
+            entries.append({
+                'name': char['name'],
+                'time': banner.time_remaining,
+                'status': status,
+                'path': info.get('path', "Unknown"),
+                'element': info.get('element', char.get('element', "Unknown"))
+            })
+    return entries
+
+def render_personajes_pages(entries, age_line, status=ALL_OPTION, path=ALL_OPTION, element=ALL_OPTION):
+    selected = [
+        entry for entry in entries
+        if status in (ALL_OPTION, entry['status'])
+        and path in (ALL_OPTION, entry['path'])
+        and element in (ALL_OPTION, entry['element'])
+    ]
+    
+    blocks = []
+    for group_status, title in (('actual', "### 🔴 **ACTUALES**\n"), ('proximo', "### 🟡 **PRÓXIMOS**\n")):
+        group = [entry for entry in selected if entry['status'] == group_status]
+        for position, entry in enumerate(group):
+            line = (
+                f"✨ **{entry['name']}** {get_path_emoji(entry['path'])}{get_element_emoji(entry['element'])}"
+                f" - {entry['time']}\n"
+            )
+            # El título viaja con su primera línea para no quedar huérfano al final de una página
+            blocks.append(title + line if position == 0 else line)
+        if group:
+            blocks.append("\n")
+    
+    if not blocks:
+        blocks.append("*Ningún personaje coincide con el filtro.*\n")
+    
+    return paginate_blocks("## 📊 **Personajes 5★ en Banner**\n\n", blocks, f"\n*{age_line}*")
+
+def build_personajes_reply(snapshot):
+    if not snapshot.banners:
+        return [{'content': "❌ **No se encontraron personajes en banner.**"}]
+    
+    entries = collect_banner_characters(snapshot)
+    age_line = format_snapshot_age(snapshot)
+    
+    def options_for(field, emoji_for):
+        values = sorted({entry[field] for entry in entries})
+        return [(ALL_OPTION, "Todos")] + [(value, f"{emoji_for(value)} {value}") for value in values]
+    
+    view = SnapshotPaginator(
+        lambda **filters: render_personajes_pages(entries, age_line, **filters),
+        filters={
+            'status': ("Estado del banner", [(ALL_OPTION, "Todos"), ('actual', "🔴 Actuales"), ('proximo', "🟡 Próximos")]),
+            'path': ("Vía", options_for('path', get_path_emoji)),
+            'element': ("Elemento", options_for('element', get_element_emoji))
+        }
     )
+    return [{'content': view.content, 'view': view}]
+
+def build_endgame_reply(snapshot):
+    if not snapshot.endgame:
+        return [{'content': "❌ **No se encontró contenido End Game.**"}]
+    
+    blocks = [
+        f"### {content.content_type} {content.version}\n"
+        f"⏳ **Tiempo restante:** {content.time_remaining}\n\n"
+        for content in snapshot.endgame
+    ]
+    pages = paginate_blocks("## ⚔️ **Contenido End Game**\n\n", blocks, f"*{format_snapshot_age(snapshot)}*")
+    if len(pages) == 1:
+        return [{'content': pages[0]}]
+    
+    view = SnapshotPaginator(lambda: pages)
+    return [{'content': view.content, 'view': view}]
+
+def build_stats_reply(snapshot):
+    now = datetime.now()
+    banners_actuales = 0
+    banners_proximos = 0
+    personajes_set = set()
     
-    await thread_obj.send(info_text)
+    for banner in snapshot.banners:
+        if banner.end_date and banner.end_date > now:
+            if is_banner_current(banner, now):
+                banners_actuales += 1
+            else:
+                banners_proximos += 1
+        
+        for char in banner.featured_5star_char:
+            personajes_set.add(char['name'])
+    
+    embed = discord.Embed(
+        title="📊 **Estadísticas**",
+        description="Resumen del juego",
+        color=discord.Color.blue()
+    )
     
-    logger.info(f"✅ Publicación creada para personaje 5★: {character_name}")
+    embed.add_field(name="🔴 Banners actuales", value=str(banners_actuales), inline=True)
+    embed.add_field(name="🟡 Banners próximos", value=str(banners_proximos), inline=True)
+    embed.add_field(name="✨ Personajes 5★ únicos", value=str(len(personajes_set)), inline=True)
+    embed.add_field(name="⚔️ Modos End Game", value=str(len(snapshot.endgame)), inline=True)
+    embed.set_footer(text=format_snapshot_age(snapshot))
+    return [{'embed': embed}]
+
+def find_banner_for_character(snapshot, character):
+    """Busca el banner (actual o próximo) en el que aparece un personaje del catálogo"""
+    character_keys = {normalize_search_text(character['name']), normalize_search_text(character['id'].replace('-', ' '))}
+    now = datetime.now()
     
-    return thread_obj
+    for banner in snapshot.banners:
+        for char_data in banner.featured_5star_char:
+            names = {normalize_search_text(char_data['name']), normalize_search_text(char_data.get('char_key', '').replace('-', ' '))}
+            if character_keys & names:
+                return banner, is_banner_current(banner, now)
+    return None, False
+
+def build_probability_reply(snapshot, character, pulls, pity, guaranteed, odds):
+    """Probabilidad de conseguir el 5★ destacado y de cada eidolon con las tiradas indicadas"""
+    banner, is_current = find_banner_for_character(snapshot, character)
+    if banner is None:
+        return [{'content': f"❌ **{character['name']} no está en ningún banner actual ni próximo.**"}]
+    
+    status = f"🔴 En banner actual ({banner.time_remaining})" if is_current else "🟡 En banner próximo"
+    at_least = 1.0 - np.cumsum((0.0,) + odds.copies[:-1])
+    
+    response = f"## 🎲 **Probabilidad de conseguir {character['name']}**\n{status}\n\n"
+    response += f"**{pulls} tiradas** · pity {pity} · {'garantizado' if guaranteed else '50/50 pendiente'}\n\n"
+    response += f"**Al menos una copia: {at_least[1]:.1%}**\n"
+    for copies in range(2, WARP_MAX_COPIES + 1):
+        if at_least[copies] < 0.001:
+            break
+        response += f"   E{copies - 1} o más: {at_least[copies]:.1%}\n"
+    runs = f"{odds.runs:,}".replace(',', '.')
+    response += f"\n*Monte Carlo ({runs} simulaciones): {odds.simulated:.1%} · {format_snapshot_age(snapshot)}*"
+    
+    return [{'content': response}]
+
+def format_rerun_status(row):
+    if row['on_banner']:
+        return "🔴 En banner ahora"
+    if row['days_since'] is None:
+        return "🟡 Primera aparición próximamente"
+    return f"⏳ {row['days_since']} días sin banner (último hasta <t:{row['last_end']}:D>)"
+
+def build_reruns_reply(filtro=None, now=None):
+    """Última aparición, número de reruns y días sin banner de un personaje, una vía, un elemento o todos"""
+    catalog = CATALOG
+    by_id = {entry['id']: entry for entry in catalog.characters}
+    title = "Todos los personajes"
+    char_ids = None
+    
+    if filtro:
+        key = normalize_search_text(filtro)
+        by_path = [c['id'] for c in catalog.characters if key in {normalize_search_text(c['path']), normalize_search_text(c['path']).removeprefix('the ')}]
+        by_element = [c['id'] for c in catalog.characters if key == normalize_search_text(c['element'])]
+        
+        if by_path:
+            char_ids = by_path
+            path = by_id[by_path[0]]['path']
+            title = f"{get_path_emoji(path)} {path}"
+        elif by_element:
+            char_ids = by_element
+            element = by_id[by_element[0]]['element']
+            title = f"{get_element_emoji(element)} {element}"
+        else:
+            matches = catalog.search_index.search(filtro, limit=1)
+            if not matches:
+                return [{'content': f"❌ **No se encontró ningún personaje, vía o elemento parecido a** `{filtro}`"}]
+            return build_character_reruns_reply(matches[0][0], now)
+    
+    rows = banner_history.summary(char_ids, now)
+    if not rows:
+        return [{'content': f"📚 **Aún no hay historial de banners para {title}.**"}]
+    
+    blocks = []
+    for row in rows:
+        name = by_id.get(row['char_id'], {}).get('name', row['char_id'])
+        reruns = f" · {row['reruns']} rerun{'s' if row['reruns'] != 1 else ''}" if row['appearances'] else ""
+        upcoming = f" · 🟡 vuelve <t:{row['next_start']}:D>" if row['next_start'] else ""
+        blocks.append(f"**{name}** · {format_rerun_status(row)}{reruns}{upcoming}\n")
+    
+    pages = paginate_blocks(f"## 📅 **Reruns · {title}**\n\n", blocks)
+    if len(pages) == 1:
+        return [{'content': pages[0]}]
+    view = SnapshotPaginator(lambda: pages)
+    return [{'content': view.content, 'view': view}]
+
+def build_character_reruns_reply(character, now=None):
+    rows = banner_history.summary([character['id']], now)
+    if not rows:
+        return [{'content': f"📚 **{character['name']} no aparece en el historial de banners.**"}]
+    row = rows[0]
+    
+    response = f"## 📅 **Reruns de {character['name']}**\n{format_rerun_status(row)}\n\n"
+    response += f"**{row['appearances']} apariciones** · {row['reruns']} rerun{'s' if row['reruns'] != 1 else ''}\n"
+    if row['next_start']:
+        response += f"🟡 Vuelve <t:{row['next_start']}:D>\n"
+    
+    response += "\n"
+    for start, end in banner_history.appearances_of(character['id'])[:10]:
+        response += f"• <t:{start}:D> → {f'<t:{end}:D>' if end else 'fecha de fin desconocida'}\n"
+    return [{'content': response}]
+
+async def run_snapshot_command(command_name, send, build_reply, user_id=None):
+    """Responde desde el snapshot en caché con un solo envío por mensaje y mide la latencia total"""
+    start = time.perf_counter()
+    with tracer.trace(f"comando {command_name}", command=command_name):
+        try:
+            try:
+                with tracer.span("snapshot") as span:
+                    snapshot = await get_current_snapshot()
+                    span.set(stale=snapshot.stale, age_s=round(snapshot.age_seconds()))
+            except ScrapeError as e:
+                logger.error(f"Sin datos para {command_name}: {e}")
+                await send(content=NO_DATA_MESSAGE)
+                return
+            
+            with tracer.span("render"):
+                messages = build_reply(snapshot)
+            
+            for message in messages:
+                sent = await send(**message)
+                if 'view' in message:
+                    # Para desactivar los controles cuando caduque la vista
+                    message['view'].message = sent
+                    message['view'].owner_id = user_id
+        
+        except Exception as e:
+            logger.error(f"Error en comando {command_name}: {e}")
+            await send(content=f"❌ **Error:** {str(e)[:200]}")
+        
+        finally:
+            command_latency.record(command_name, time.perf_counter() - start)
+
+def followup_sender(interaction):
+    """followup.send solo devuelve el mensaje con wait=True, y la vista lo necesita para desactivarse al caducar"""
+    return functools.partial(interaction.followup.send, wait=True)
+
+def build_character_embed(character_name, character_info, banner_info, status):
+    """Tarjeta del personaje: miniatura, vía, elemento y duración del banner"""
+    duration_clean = banner_info['duration_text'].replace('Event Duration', '').strip()
+    
+    embed = discord.Embed(
+        title=character_name,
+        color=discord.Color.red() if status == "actual" else discord.Color.gold()
+    )
+    embed.set_thumbnail(url=character_info['image'])
+    embed.add_field(name="Vía", value=f"{get_path_emoji(character_info['path'])} {character_info['path']}", inline=True)
+    embed.add_field(name="Elemento", value=f"{get_element_emoji(character_info['element'])} {character_info['element']}", inline=True)
+    embed.add_field(name="⏳ Duración", value=duration_clean or "Desconocida", inline=False)
+    if banner_info.get('end_date'):
+        # Discord muestra la cuenta atrás en la zona horaria de cada usuario y la mantiene al día
+        embed.add_field(name="🕒 Termina", value=f"<t:{int(banner_info['end_date'].timestamp())}:R>", inline=False)
+    embed.set_footer(text="Actualización diaria automática")
+    return embed
 
-async def create_endgame_post(forum_channel, endgame_content):
-    """Crea una publicación en el foro para contenido End Game con tiempo visible en la tarjeta"""
-    
-    # Extraer el tiempo correcto del countdown
-    time_remaining = endgame_content.time_remaining
-    
-    # Título: nombre del modo + versión + tiempo (visible desde fuera)
-    thread_name = f"⚔️ {endgame_content.content_type} {endgame_content.version} - {time_remaining}"
-    
-    # Crear un embed con la imagen y el tiempo
+def embed_fingerprint(embed):
+    """Huella del contenido del embed, para editar solo cuando algo cambió"""
+    return hashlib.sha1(json.dumps(embed.to_dict(), sort_keys=True).encode('utf-8')).hexdigest()
+
+ENDGAME_IMAGE_URLS = {
+    'Memory of Chaos': 'https://img.game8.co/3870023/895243530f7a643802fda6397189f441.png/show',
+    'Pure Fiction': 'https://img.game8.co/3959509/cb02a378a39bc1fb9bc6cc12ea6bafc1.png/show',
+    'Apocalyptic Shadow': 'https://img.game8.co/3911733/48501779fee8f84224df2eab5f1d8059.png/show'
+}
+
+def build_endgame_embed(content):
+    """Tarjeta End Game: modo, versión, tiempo restante e imagen del modo"""
     embed = discord.Embed(
-        title=f"{endgame_content.content_type} {endgame_content.version}",
-        description=f"⏳ **Tiempo restante:** {time_remaining}",
+        title=f"{content.content_type} {content.version}",
+        description=f"⏳ **Tiempo restante:** {content.time_remaining}",
         color=discord.Color.orange()
     )
-    
-    # Aquí pondrás la URL de tu imagen (cámbiala por la que quieras usar)
-    # Puedes usar imágenes diferentes para cada modo
-    # IMPORTANTE: Reemplaza estas URLs con las imágenes que quieras usar
-    image_urls = {
-        'Memory of Chaos': 'https://img.game8.co/3870023/895243530f7a643802fda6397189f441.png/show',
-        'Pure Fiction': 'https://img.game8.co/3959509/cb02a378a39bc1fb9bc6cc12ea6bafc1.png/show', 
-        'Apocalyptic Shadow': 'https://img.game8.co/3911733/48501779fee8f84224df2eab5f1d8059.png/show'
-    }
-    
-    image_url = image_urls.get(endgame_content.content_type, 'https://ejemplo.com/default.jpg')
-    embed.set_image(url=image_url)
+    embed.set_image(url=ENDGAME_IMAGE_URLS.get(content.content_type, 'https://ejemplo.com/default.jpg'))
     embed.set_footer(text="Actualización diaria automática")
+    return embed
+
+def build_cone_embed(cone_name, banner, status):
+    """Tarjeta del cono de luz 5★: banner en el que aparece y su duración"""
+    duration_clean = banner.duration_text.replace('Event Duration', '').strip()
     
-    # Crear la publicación con el embed como contenido principal
-    thread = await forum_channel.create_thread(
-        name=thread_name,
-        embed=embed,
-        auto_archive_duration=10080
+    embed = discord.Embed(
+        title=cone_name,
+        description=f"Cono de luz 5★ del warp **{banner.name}**",
+        color=discord.Color.red() if status == "actual" else discord.Color.gold()
     )
-    
-    thread_obj = thread[0] if isinstance(thread, tuple) else thread
-    
-    logger.info(f"✅ Publicación creada para End Game: {endgame_content.content_type} {endgame_content.version} - {time_remaining}")
-    
-    return thread_obj
+    embed.add_field(name="⏳ Duración", value=duration_clean or "Desconocida", inline=False)
+    if banner.end_date:
+        embed.add_field(name="🕒 Termina", value=f"<t:{int(banner.end_date.timestamp())}:R>", inline=False)
+    embed.set_footer(text="Actualización diaria automática")
+    return embed
 
-async def update_forum_posts():
-    """Actualiza las publicaciones del foro por personaje (solo 5★) y End Game"""
-    
-    all_banners = scraper.get_banners()
-    all_endgame = scraper.get_endgame_content()
-    
-    now = datetime.now()
-    
-    # Procesar cada canal por separado
-    if TARGET_FORUM_ACTUAL:
-        await update_character_posts(TARGET_FORUM_ACTUAL, all_banners, now, "actual")
-    
-    if TARGET_FORUM_PROXIMO:
-        await update_character_posts(TARGET_FORUM_PROXIMO, all_banners, now, "proximo")
-    
-    if TARGET_FORUM_ENDGAME:
-        await update_endgame_posts(TARGET_FORUM_ENDGAME, all_endgame)
+# ============================================
+# FEEDS DE FORO
+# ============================================
+class ForumFeed:
+    """Un foro alimentado desde el snapshot: qué entradas publica y cómo se pinta cada una"""
+    
+    def __init__(self, key, label, env_var, select, render, retire_missing=False):
+        self.key = key                        # Nombre en !reset_forum y en el resumen de sincronización
+        self.label = label
+        self.env_var = env_var
+        # select(snapshot, now) -> [{'id', 'match', ...}]; 'match' localiza el hilo por su título
+        self.select = select
+        # render(entrada) -> (título del hilo, embed)
+        self.render = render
+        # Archivar los hilos cuya entrada ya no está en el snapshot y cuya fecha de fin ya pasó
+        # (los de personajes los retira el ciclo de vida)
+        self.retire_missing = retire_missing
+        self.channel_id = None
 
-async def update_character_posts(channel_id, banners, now, status):
-    """Actualiza las publicaciones de personajes 5★ en un canal específico"""
-    
+FORUM_FEEDS = {}
+
+def register_forum_feed(feed):
+    FORUM_FEEDS[feed.key] = feed
+    return feed
+
+def content_key(name) -> str:
+    return re.sub(r'[^a-zA-Z0-9]', '', name.lower())
+
+def select_characters(status):
+    """Personajes 5★ únicos de los banners en esa etapa que estén en el catálogo"""
+    def select(snapshot, now):
+        entries = {}
+        for banner in snapshot.banners:
+            # Los banners terminados no se publican
+            if banner_stage(banner, now) != status:
+                continue
+            for char_data in banner.featured_5star_char:
+                char_name = char_data['name']
+                if content_key(char_name) in entries:
+                    continue
+                
+                char_info = get_character_info(char_name)
+                if not char_info:
+                    logger.info("⏩ %s no es 5★ o no está en la base de datos", char_name, extra=SAMPLED)
+                    continue
+                entries[content_key(char_name)] = {
+                    'id': content_key(char_name),
+                    'match': char_name,
+                    'info': char_info,
+                    'banner_info': {
+                        'time_remaining': banner.time_remaining,
+                        'duration_text': banner.duration_text,
+                        'end_date': banner.end_date
+                    }
+                }
+        return list(entries.values())
+    return select
+
+def render_character(status):
+    status_emoji = "🔴" if status == "actual" else "🟡"
+    def render(entry):
+        embed = build_character_embed(entry['match'], entry['info'], entry['banner_info'], status)
+        return f"{status_emoji} {entry['match']}", embed
+    return render
+
+def select_endgame(snapshot, now):
+    # Un hilo por modo: el de la versión anterior se reutiliza al cambiar de versión
+    return [
+        {
+            'id': f"{content.content_type}_{content.version}".lower().replace(' ', '_'),
+            'match': content.content_type,
+            'content': content
+        }
+        for content in snapshot.endgame
+    ]
+
+def render_endgame(entry):
+    content = entry['content']
+    # El tiempo va en el título para verlo sin abrir el hilo
+    return f"⚔️ {content.content_type} {content.version} - {content.time_remaining}", build_endgame_embed(content)
+
+def select_cones(snapshot, now):
+    """Conos de luz 5★ de los banners actuales y próximos; si están en ambos, cuenta el actual"""
+    entries = {}
+    for banner in snapshot.banners:
+        status = banner_stage(banner, now)
+        if status == 'terminado':
+            continue
+        for cone in banner.featured_5star_cone:
+            cone_id = content_key(cone['name'])
+            if cone_id in entries and entries[cone_id]['status'] == 'actual':
+                continue
+            entries[cone_id] = {'id': cone_id, 'match': cone['name'], 'banner': banner, 'status': status,
+                                'end_date': banner.end_date.isoformat() if banner.end_date else ""}
+    return list(entries.values())
+
+def render_cone(entry):
+    status_emoji = "🔴" if entry['status'] == "actual" else "🟡"
+    return f"{status_emoji} {entry['match']}", build_cone_embed(entry['match'], entry['banner'], entry['status'])
+
+register_forum_feed(ForumFeed('actual', "actual", 'FORUM_CHANNEL_ACTUAL', select_characters('actual'), render_character('actual')))
+register_forum_feed(ForumFeed('proximo', "próximo", 'FORUM_CHANNEL_PROXIMO', select_characters('proximo'), render_character('proximo')))
+register_forum_feed(ForumFeed('endgame', "endgame", 'FORUM_CHANNEL_ENDGAME', select_endgame, render_endgame))
+register_forum_feed(ForumFeed('conos', "conos", 'FORUM_CHANNEL_CONOS', select_cones, render_cone, retire_missing=True))
+
+def resolve_forum_channel(channel_id):
     channel = bot.get_channel(channel_id)
     if not channel:
         logger.error(f"❌ No se encontró el canal {channel_id}")
-        return
-    
+        return None
     if not isinstance(channel, discord.ForumChannel):
         logger.error(f"❌ El canal {channel_id} no es un foro")
-        return
+        return None
+    return channel
+
+async def list_forum_threads(channel):
+    """Hilos activos y los últimos archivados del foro"""
+    threads = list(channel.threads)
+    async for thread in channel.archived_threads(limit=100):
+        threads.append(thread)
+    return threads
+
+async def update_feed_post(thread, record, name, embed):
+    """Edita en su sitio título y mensaje inicial si cambiaron; devuelve la huella o None si no hizo falta"""
+    fingerprint = embed_fingerprint(embed)
+    if record.get('fingerprint') == fingerprint and thread.name == name:
+        return None
+    
+    if thread.archived or thread.name != name:
+        await thread.edit(name=name, archived=False)
+    # En los foros el mensaje inicial comparte id con el hilo; content=None limpia las publicaciones antiguas
+    message_id = record.get('message_id') or thread.id
+    await thread.get_partial_message(message_id).edit(content=None, embed=embed)
+    return fingerprint
+
+async def sync_forum_feed(feed, snapshot, now):
+    """Motor común de los feeds: crea lo que falta, edita lo que cambió y retira lo que ya no está"""
+    channel = resolve_forum_channel(feed.channel_id)
+    if channel is None:
+        return None
     
+    stats = {'created': 0, 'updated': 0, 'existing': 0, 'retired': 0, 'errors': 0}
     try:
-        # Recopilar todos los personajes 5★ de los banners con su información
-        characters_to_post = []
-        processed_names = set()  # Para evitar duplicados
-        
-        for banner in banners:
-            # Determinar si el banner es actual o próximo
-            is_current = False
-            if banner.end_date and banner.end_date > now:
-                if banner.start_date and banner.start_date <= now:
-                    is_current = True
-                elif banner.start_date and banner.start_date > now:
-                    is_current = False
-                else:
-                    is_current = True
-            
-            # Solo procesar banners del estado correspondiente
-            if (status == "actual" and not is_current) or (status == "proximo" and is_current):
+        entries = feed.select(snapshot, now)
+        logger.info(f"Foro {channel.name}: {len(entries)} publicaciones de {feed.label}")
+        threads = await list_forum_threads(channel)
+        
+        # Mapear hilos existentes por el texto de su título (los bloqueados ya están retirados)
+        existing = {}
+        for thread in threads:
+            if thread.locked:
                 continue
-            
-            # Procesar personajes 5★
-            for char_data in banner.featured_5star_char:
-                char_name = char_data['name']
-                
-                # Evitar duplicados
-                if char_name in processed_names:
-                    continue
-                
-                # Obtener información completa del personaje
-                char_info = get_character_info(char_name)
-                
-                if char_info:
-                    characters_to_post.append({
-                        'name': char_name,
-                        'info': char_info,
-                        'banner_info': {
-                            'time_remaining': banner.time_remaining,
-                            'duration_text': banner.duration_text
-                        }
-                    })
-                    processed_names.add(char_name)
-                    logger.info(f"📌 Personaje 5★ encontrado: {char_name}")
-                else:
-                    logger.info(f"⏩ {char_name} no es 5★ o no está en la base de datos")
-        
-        logger.info(f"Foro {channel.name}: {len(characters_to_post)} personajes 5★ únicos para publicar")
-        
-        # Obtener hilos activos
-        active_threads = []
-        active_threads.extend(channel.threads)
-        async for thread in channel.archived_threads(limit=100):
-            active_threads.append(thread)
-        
-        # Mapear hilos existentes por nombre de personaje
-        existing_posts = {}
-        for thread in active_threads:
-            for char_data in characters_to_post:
-                if char_data['name'] in thread.name:
-                    char_id = re.sub(r'[^a-zA-Z0-9]', '', char_data['name'].lower())
-                    existing_posts[char_id] = thread
+            for entry in entries:
+                if entry['match'] in thread.name:
+                    existing[entry['id']] = thread
                     break
         
-        # Crear nuevas publicaciones para personajes que no existen
-        for char_data in characters_to_post:
-            char_name = char_data['name']
-            char_id = re.sub(r'[^a-zA-Z0-9]', '', char_name.lower())
-            
-            if char_id in existing_posts:
-                logger.info(f"⏩ Hilo ya existe para: {char_name}")
-            else:
-                # Crear nueva publicación
-                try:
-                    thread = await create_character_post(
-                        channel, 
-                        char_name, 
-                        char_data['info'], 
-                        char_data['banner_info'], 
-                        status
-                    )
-                    if thread:
-                        forum_manager.set_post_id(channel_id, char_id, thread.id)
-                        logger.info(f"✅ Publicación creada: {char_name}")
-                except Exception as e:
-                    logger.error(f"Error creando publicación {char_name}: {e}")
+        for entry in entries:
+            name, embed = feed.render(entry)
+            try:
+                if entry['id'] in existing:
+                    thread = existing[entry['id']]
+                    record = forum_manager.get_post(feed.channel_id, entry['id'])
+                    if not record or record['thread_id'] != thread.id:
+                        record = {'thread_id': thread.id}
+                    
+                    fingerprint = await update_feed_post(thread, record, name, embed)
+                    if fingerprint is None:
+                        stats['existing'] += 1
+                        logger.info("⏩ Publicación al día para: %s", entry['match'], extra=SAMPLED)
+                        if record.get('end_date') != entry.get('end_date'):
+                            forum_manager.set_post_id(feed.channel_id, entry['id'], thread.id, record.get('message_id'),
+                                                      record.get('fingerprint'), entry.get('end_date'))
+                        continue
+                    
+                    forum_manager.set_post_id(feed.channel_id, entry['id'], thread.id,
+                                              record.get('message_id') or thread.id, fingerprint, entry.get('end_date'))
+                    stats['updated'] += 1
+                    logger.info(f"✏️ Publicación actualizada: {name}")
+                else:
+                    # Hilo y tarjeta en una sola llamada
+                    thread, starter_message = await channel.create_thread(name=name, embed=embed, auto_archive_duration=10080)
+                    forum_manager.set_post_id(feed.channel_id, entry['id'], thread.id, starter_message.id,
+                                              embed_fingerprint(embed), entry.get('end_date'))
+                    stats['created'] += 1
+                    logger.info(f"✅ Publicación creada: {name}")
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"Error publicando {entry['match']}: {e}")
             
             await asyncio.sleep(1)
         
-        logger.info(f"✅ Foro {channel.name} actualizado con {len(characters_to_post)} personajes 5★")
+        if feed.retire_missing:
+            # Como en el ciclo de vida: que falte en un scrape parcial no basta, su banner tiene que haber terminado
+            selected = {entry['id'] for entry in entries}
+            names = {thread.id: thread.name.split(' ', 1)[-1] for thread in threads}
+            jobs = [
+                (feed.channel_id, content_id, names.get(record['thread_id'], content_id), 'retired')
+                for content_id, record in forum_manager.channel_posts(feed.channel_id).items()
+                if content_id not in selected and record.get('end_date') and record['end_date'] <= now.isoformat()
+            ]
+            retired = await apply_lifecycle_jobs(jobs)
+            stats['retired'] = retired['retired']
+            stats['errors'] += retired['errors']
         
+        logger.info(f"✅ Foro {channel.name} actualizado con {len(entries)} publicaciones de {feed.label}")
+    
     except Exception as e:
+        stats['errors'] += 1
         logger.error(f"❌ Error actualizando foro {channel.name}: {e}")
+    
+    return stats
 
-async def update_endgame_posts(channel_id, endgame_list):
-    """Actualiza las publicaciones de End Game en un canal específico"""
+async def update_forum_posts(force_refresh=False):
+    """Sincroniza todos los feeds de foro registrados contra un mismo snapshot"""
     
-    channel = bot.get_channel(channel_id)
-    if not channel:
-        logger.error(f"❌ No se encontró el canal {channel_id}")
-        return
+    with tracer.trace("sincronización foros", force_refresh=force_refresh):
+        start = time.perf_counter()
+        try:
+            snapshot = await get_current_snapshot(force_refresh)
+        except Exception as e:
+            logger.error(f"❌ Sin datos para actualizar los foros: {e}")
+            return
+        
+        # Los personajes nuevos deben estar en el catálogo antes de publicar (con worker, lo hace él)
+        if snapshot_subscriber is None:
+            await character_enricher.enrich(snapshot)
+        
+        now = datetime.now()
+        
+        # Transiciones de etapa respecto al último snapshot sincronizado
+        observed = post_lifecycle.observe(snapshot, now)
+        transitions = post_lifecycle.diff(observed, now)
+        
+        forums = {}
+        for feed in FORUM_FEEDS.values():
+            if feed.channel_id:
+                with tracer.span(f"feed {feed.key}"):
+                    forums[feed.key] = await sync_forum_feed(feed, snapshot, now)
+        
+        # Retirar en un solo lote, con los hilos de "actual" ya creados para poder enlazarlos
+        character_forums = {key: FORUM_FEEDS[key].channel_id for key in ('actual', 'proximo')}
+        jobs = plan_lifecycle_jobs(transitions, observed, character_forums)
+        forums['lifecycle'] = await apply_lifecycle_jobs(jobs, character_forums['actual'])
+        forums['lifecycle']['transitions'] = len(transitions)
+        failed = set(forums['lifecycle'].pop('failed'))
+        post_lifecycle.commit(observed, transitions, now, failed)
+        
+        logger.info("📊 Resumen de sincronización", extra={'summary': {
+            'kind': 'sync',
+            'source': snapshot.source,
+            'snapshot_age_s': round(snapshot.age_seconds()),
+            'forums': forums,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+        }})
+
+# ============================================
+# RESETEO MASIVO DE FOROS
+# ============================================
+RESET_CONCURRENCY = 4
+RESET_CHECKPOINT_EVERY = 20
+RESET_PROGRESS_INTERVAL = 5.0
+
+class ResetCheckpoint:
+    """Hilos ya archivados por canal, para reanudar un reseteo interrumpido"""
     
-    if not isinstance(channel, discord.ForumChannel):
-        logger.error(f"❌ El canal {channel_id} no es un foro")
-        return
+    def __init__(self, path="reset_checkpoint.json"):
+        self.path = path
+        self.channels = self.load()
     
-    try:
-        logger.info(f"Foro End Game: {len(endgame_list)} modos encontrados")
-        
-        # Obtener hilos activos
-        active_threads = []
-        active_threads.extend(channel.threads)
-        async for thread in channel.archived_threads(limit=100):
-            active_threads.append(thread)
-        
-        # Mapear hilos existentes por nombre del modo
-        existing_posts = {}
-        for thread in active_threads:
-            for content in endgame_list:
-                content_id = f"{content.content_type}_{content.version}".lower().replace(' ', '_')
-                if content.content_type in thread.name:
-                    existing_posts[content_id] = thread
-                    break
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return {key: set(ids) for key, ids in json.load(f).items()}
+        except Exception as e:
+            logger.error(f"Error cargando checkpoint de reseteo: {e}")
+        return {}
+    
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({key: sorted(ids) for key, ids in self.channels.items()}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando checkpoint de reseteo: {e}")
+    
+    def done(self, channel_id):
+        return self.channels.setdefault(str(channel_id), set())
+    
+    def finish(self, channel_id):
+        self.channels.pop(str(channel_id), None)
+        if self.channels:
+            self.save()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+async def iter_forum_threads(channel):
+    """Hilos activos y todos los archivados, paginando sin límite"""
+    for thread in channel.threads:
+        yield thread
+    async for thread in channel.archived_threads(limit=None):
+        yield thread
+
+async def reset_forum_channel(channel, checkpoint, progress=None):
+    """Archiva y bloquea todos los hilos del foro con concurrencia acotada"""
+    done = checkpoint.done(channel.id)
+    stats = {'archived': 0, 'skipped': 0, 'errors': 0, 'resumed': len(done)}
+    semaphore = asyncio.Semaphore(RESET_CONCURRENCY)
+    pending = set()
+    last_progress = time.monotonic()
+    
+    async def archive(thread):
+        try:
+            await thread.edit(archived=True, locked=True)
+            done.add(thread.id)
+            stats['archived'] += 1
+            if stats['archived'] % RESET_CHECKPOINT_EVERY == 0:
+                checkpoint.save()
+        except discord.HTTPException as e:
+            stats['errors'] += 1
+            logger.error("❌ No se pudo archivar el hilo %s: %s", thread.id, e, extra=SAMPLED)
+        finally:
+            semaphore.release()
+    
+    seen = set()
+    async for thread in iter_forum_threads(channel):
+        if thread.id in seen:
+            continue
+        seen.add(thread.id)
         
-        # Crear o actualizar publicaciones
-        for content in endgame_list:
-            content_id = f"{content.content_type}_{content.version}".lower().replace(' ', '_')
-            time_remaining = content.time_remaining
-            
-            if content_id in existing_posts:
-                # Actualizar título y enviar mensaje de actualización
-                thread = existing_posts[content_id]
-                new_title = f"⚔️ {content.content_type} {content.version} - {time_remaining}"
-                
-                try:
-                    if thread.name != new_title:
-                        await thread.edit(name=new_title)
-                    
-                    # Enviar mensaje de actualización
-                    await thread.send(f"🔄 **Actualización**\n⏳ Tiempo restante: {time_remaining}")
-                    logger.info(f"✅ Hilo actualizado: {content.content_type} {content.version}")
-                except Exception as e:
-                    logger.error(f"Error actualizando hilo: {e}")
-            else:
-                # Crear nueva publicación
-                try:
-                    thread = await create_endgame_post(channel, content)
-                    forum_manager.set_post_id(channel_id, content_id, thread.id)
-                    logger.info(f"✅ Publicación creada: {content.content_type} {content.version}")
-                except Exception as e:
-                    logger.error(f"Error creando publicación: {e}")
-            
-            await asyncio.sleep(1)
+        if thread.id in done or (thread.archived and thread.locked):
+            done.add(thread.id)
+            stats['skipped'] += 1
+            continue
         
-        logger.info(f"✅ Foro End Game actualizado con {len(endgame_list)} modos")
+        # El semáforo se toma antes de crear la tarea: nunca hay más de RESET_CONCURRENCY en vuelo
+        await semaphore.acquire()
+        task = asyncio.create_task(archive(thread))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
         
-    except Exception as e:
-        logger.error(f"❌ Error actualizando foro End Game: {e}")
+        if progress and time.monotonic() - last_progress >= RESET_PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            await progress(stats)
+    
+    if pending:
+        await asyncio.gather(*pending)
+    
+    if stats['errors']:
+        checkpoint.save()
+    else:
+        checkpoint.finish(channel.id)
+        forum_manager.clear_channel(channel.id)
+    
+    logger.info(
+        f"🧹 Reseteo de {channel.name}: {stats['archived']} archivados, {stats['skipped']} ya cerrados, {stats['errors']} errores",
+        extra={'summary': stats}
+    )
+    return stats
 
 # ============================================
 # VARIABLES DE ENTORNO
@@ -1345,50 +3618,60 @@ logger.info("🚀 INICIANDO BOT DE HONKAI STAR RAIL - CON END GAME")
 logger.info("=" * 60)
 
 TOKEN = os.environ.get('DISCORD_TOKEN')
-FORUM_CHANNEL_ID_ACTUAL = os.environ.get('FORUM_CHANNEL_ACTUAL')
-FORUM_CHANNEL_ID_PROXIMO = os.environ.get('FORUM_CHANNEL_PROXIMO')
-FORUM_CHANNEL_ID_ENDGAME = os.environ.get('FORUM_CHANNEL_ENDGAME')
+NOTIFY_CHANNEL_ID = os.environ.get('NOTIFY_CHANNEL')
+# Un solo proceso (o ninguno, usando !sync) debe registrar los comandos de barra al arrancar
+SYNC_COMMANDS_ON_START = os.environ.get('SYNC_COMMANDS_ON_START', '0') == '1'
 
 logger.info(f"🔑 DISCORD_TOKEN: {'✅ ENCONTRADO' if TOKEN else '❌ NO ENCONTRADO'}")
-logger.info(f"📢 Canal FORO ACTUAL: {'✅ ' + FORUM_CHANNEL_ID_ACTUAL if FORUM_CHANNEL_ID_ACTUAL else '❌ NO CONFIGURADO'}")
-logger.info(f"📢 Canal FORO PRÓXIMO: {'✅ ' + FORUM_CHANNEL_ID_PROXIMO if FORUM_CHANNEL_ID_PROXIMO else '❌ NO CONFIGURADO'}")
-logger.info(f"📢 Canal FORO ENDGAME: {'✅ ' + FORUM_CHANNEL_ID_ENDGAME if FORUM_CHANNEL_ID_ENDGAME else '❌ NO CONFIGURADO'}")
+for feed in FORUM_FEEDS.values():
+    logger.info(f"📢 Canal FORO {feed.label.upper()}: {'✅ ' + os.environ[feed.env_var] if os.environ.get(feed.env_var) else '❌ NO CONFIGURADO'}")
+logger.info(f"🔔 Canal de AVISOS: {'✅ ' + NOTIFY_CHANNEL_ID if NOTIFY_CHANNEL_ID else '➖ el de cada suscripción'}")
+logger.info(f"🧠 Perfil de memoria: {BOT_PROFILE}")
+logger.info(f"🔗 Comandos de barra: {'sincronizados al arrancar' if SYNC_COMMANDS_ON_START else 'con !sync'}")
 
-TARGET_FORUM_ACTUAL = None
-if FORUM_CHANNEL_ID_ACTUAL:
+NOTIFY_CHANNEL = None
+if NOTIFY_CHANNEL_ID:
     try:
-        TARGET_FORUM_ACTUAL = int(FORUM_CHANNEL_ID_ACTUAL.strip())
-        logger.info(f"✅ Foro actual: {TARGET_FORUM_ACTUAL}")
+        NOTIFY_CHANNEL = int(NOTIFY_CHANNEL_ID.strip())
+        logger.info(f"✅ Canal de avisos: {NOTIFY_CHANNEL}")
     except ValueError:
-        logger.error(f"❌ FORUM_CHANNEL_ACTUAL no es válido: {FORUM_CHANNEL_ID_ACTUAL}")
+        logger.error(f"❌ NOTIFY_CHANNEL no es válido: {NOTIFY_CHANNEL_ID}")
 
-TARGET_FORUM_PROXIMO = None
-if FORUM_CHANNEL_ID_PROXIMO:
+# Un canal por feed registrado (FORUM_CHANNEL_ACTUAL, FORUM_CHANNEL_PROXIMO, ...)
+for feed in FORUM_FEEDS.values():
+    raw_channel_id = os.environ.get(feed.env_var)
+    if not raw_channel_id:
+        continue
     try:
-        TARGET_FORUM_PROXIMO = int(FORUM_CHANNEL_ID_PROXIMO.strip())
-        logger.info(f"✅ Foro próximo: {TARGET_FORUM_PROXIMO}")
+        feed.channel_id = int(raw_channel_id.strip())
+        logger.info(f"✅ Foro {feed.label}: {feed.channel_id}")
     except ValueError:
-        logger.error(f"❌ FORUM_CHANNEL_PROXIMO no es válido: {FORUM_CHANNEL_ID_PROXIMO}")
-
-TARGET_FORUM_ENDGAME = None
-if FORUM_CHANNEL_ID_ENDGAME:
-    try:
-        TARGET_FORUM_ENDGAME = int(FORUM_CHANNEL_ID_ENDGAME.strip())
-        logger.info(f"✅ Foro endgame: {TARGET_FORUM_ENDGAME}")
-    except ValueError:
-        logger.error(f"❌ FORUM_CHANNEL_ENDGAME no es válido: {FORUM_CHANNEL_ID_ENDGAME}")
-
-if not TOKEN:
-    logger.error("❌ ERROR CRÍTICO: No hay token de Discord")
-    sys.exit(1)
+        logger.error(f"❌ {feed.env_var} no es válido: {raw_channel_id}")
 
 # ============================================
 # EVENTOS Y COMANDOS DEL BOT
 # ============================================
+@bot.event
+async def setup_hook():
+    # tree.sync es una llamada global con rate limit: con varios procesos solo se hace a petición (!sync)
+    if SYNC_COMMANDS_ON_START:
+        await sync_slash_commands()
+
+async def sync_slash_commands():
+    synced = await bot.tree.sync()
+    logger.info(f"🔗 {len(synced)} comandos de barra sincronizados")
+    return synced
+
 @bot.event
 async def on_ready():
     logger.info(f'✅ {bot.user} ha conectado a Discord!')
     
+    # Revalidar el snapshot cargado del disco sin bloquear los comandos
+    if snapshot_subscriber:
+        snapshot_subscriber.start()
+    else:
+        schedule_snapshot_refresh()
+    
     await bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching,
@@ -1396,7 +3679,12 @@ async def on_ready():
         )
     )
     
-    if TARGET_FORUM_ACTUAL or TARGET_FORUM_PROXIMO or TARGET_FORUM_ENDGAME:
+    if not watch_character_catalog.is_running():
+        watch_character_catalog.start()
+    
+    loop_watchdog.start()
+    
+    if any(feed.channel_id for feed in FORUM_FEEDS.values()):
         daily_forum_posts.start()
         logger.info(f"📅 Tarea diaria iniciada")
 
@@ -1408,123 +3696,203 @@ async def daily_forum_posts():
 async def before_daily_forum_posts():
     await bot.wait_until_ready()
 
+@tasks.loop(seconds=30)
+async def watch_character_catalog():
+    try:
+        await reload_character_catalog()
+    except CatalogError:
+        pass  # Ya registrado; se reintenta cuando el fichero vuelva a cambiar
+
 @bot.command(name='personajes', aliases=['banners', 'warps', '5★'])
 async def personajes_command(ctx):
     """Muestra los personajes 5★ en banner actualmente"""
-    
-    loading_msg = await ctx.send("🔮 **Escaneando personajes 5★ en banner...**")
-    
-    try:
-        all_banners = scraper.get_banners()
-        
-        if not all_banners:
-            await loading_msg.edit(content="❌ **No se encontraron personajes en banner.**")
-            return
-        
-        now = datetime.now()
-        personajes_actuales = []
-        personajes_proximos = []
-        processed_names = set()
-        
-        for banner in all_banners:
-            is_current = False
-            if banner.end_date and banner.end_date > now:
-                if banner.start_date and banner.start_date <= now:
-                    is_current = True
-                elif banner.start_date and banner.start_date > now:
-                    is_current = False
-                else:
-                    is_current = True
-            
-            target_list = personajes_actuales if is_current else personajes_proximos
-            
-            # Solo personajes 5★ y sin duplicados
-            for char in banner.featured_5star_char:
-                if char['name'] not in processed_names:
-                    target_list.append({
-                        'name': char['name'],
-                        'time': banner.time_remaining
-                    })
-                    processed_names.add(char['name'])
-        
-        await loading_msg.delete()
-        
-        response = "## 📊 **Personajes 5★ en Banner**\n\n"
-        
-        if personajes_actuales:
-            response += "### 🔴 **ACTUALES**\n"
-            for p in personajes_actuales:
-                response += f"✨ **{p['name']}** - {p['time']}\n"
-            response += "\n"
-        
-        if personajes_proximos:
-            response += "### 🟡 **PRÓXIMOS**\n"
-            for p in personajes_proximos:
-                response += f"✨ **{p['name']}** - {p['time']}\n"
-        
-        if len(response) > 2000:
-            parts = [response[i:i+1900] for i in range(0, len(response), 1900)]
-            for part in parts:
-                await ctx.send(part)
-        else:
-            await ctx.send(response)
-        
-    except Exception as e:
-        logger.error(f"Error en comando personajes: {e}")
-        await loading_msg.edit(content=f"❌ **Error:** {str(e)[:200]}")
+    await run_snapshot_command('personajes', ctx.send, build_personajes_reply, ctx.author.id)
+
+@bot.tree.command(name='personajes', description="Personajes 5★ en banner actual y próximo")
+@app_commands.describe(publico="Mostrar la respuesta a todo el canal")
+async def personajes_slash(interaction: discord.Interaction, publico: bool = False):
+    # Respuesta solo para quien pregunta salvo que pida lo contrario
+    await interaction.response.defer(ephemeral=not publico, thinking=True)
+    await run_snapshot_command('/personajes', followup_sender(interaction), build_personajes_reply, interaction.user.id)
 
 @bot.command(name='endgame')
 async def endgame_command(ctx):
     """Muestra el contenido End Game actual"""
+    await run_snapshot_command('endgame', ctx.send, build_endgame_reply, ctx.author.id)
+
+@bot.tree.command(name='endgame', description="Contenido End Game actual y su tiempo restante")
+@app_commands.describe(publico="Mostrar la respuesta a todo el canal")
+async def endgame_slash(interaction: discord.Interaction, publico: bool = False):
+    await interaction.response.defer(ephemeral=not publico, thinking=True)
+    await run_snapshot_command('/endgame', followup_sender(interaction), build_endgame_reply, interaction.user.id)
+
+@bot.command(name='personaje', aliases=['buscar'])
+async def personaje_command(ctx, *, nombre: str = None):
+    """Busca un personaje 5★ aunque el nombre esté mal escrito"""
+    if not nombre:
+        await ctx.send("❌ **Usa:** `!personaje <nombre>`")
+        return
     
-    loading_msg = await ctx.send("⚔️ **Escaneando contenido End Game...**")
+    start = time.perf_counter()
+    matches = CATALOG.search_index.search(nombre)
+    logger.info(f"🔎 Búsqueda '{nombre}': {len(matches)} resultados en {(time.perf_counter() - start) * 1e6:.0f} µs")
+    
+    if not matches:
+        await ctx.send(f"❌ **No se encontró ningún personaje 5★ parecido a** `{nombre}`")
+        return
     
     try:
-        endgame_list = scraper.get_endgame_content()
-        
-        if not endgame_list:
-            await loading_msg.edit(content="❌ **No se encontró contenido End Game.**")
-            return
-        
-        await loading_msg.delete()
-        
-        response = "## ⚔️ **Contenido End Game**\n\n"
-        
-        for content in endgame_list:
-            response += f"### {content.content_type} {content.version}\n"
-            response += f"⏳ **Tiempo restante:** {content.time_remaining}\n\n"
-        
-        if len(response) > 2000:
-            parts = [response[i:i+1900] for i in range(0, len(response), 1900)]
-            for part in parts:
-                await ctx.send(part)
+        snapshot = await get_current_snapshot()
+    except ScrapeError:
+        snapshot = None
+    
+    response = f"## 🔎 **Resultados para** `{nombre}`\n\n"
+    for position, (char, score) in enumerate(matches, start=1):
+        if snapshot is None:
+            status = "❔ Sin datos de banners"
         else:
-            await ctx.send(response)
+            banner, is_current = find_banner_for_character(snapshot, char)
+            if banner is None:
+                status = "⚪ Sin banner"
+            elif is_current:
+                status = f"🔴 En banner actual ({banner.time_remaining})"
+            else:
+                status = "🟡 En banner próximo"
         
-    except Exception as e:
-        logger.error(f"Error en comando endgame: {e}")
-        await loading_msg.edit(content=f"❌ **Error:** {str(e)[:200]}")
+        response += (
+            f"**{position}. {char['name']}** · "
+            f"{get_path_emoji(char['path'])} {char['path']} · "
+            f"{get_element_emoji(char['element'])} {char['element']}\n"
+            f"   {status}\n"
+        )
+    
+    if snapshot is not None:
+        response += f"\n*{format_snapshot_age(snapshot)}*"
+    
+    await ctx.send(response)
+
+@bot.command(name='suscribir')
+async def subscribe_command(ctx, *, nombre: str = None):
+    """Avisa al usuario cuando el personaje aparezca en un banner"""
+    if not nombre:
+        await ctx.send("❌ **Usa:** `!suscribir <personaje>`")
+        return
+    
+    matches = CATALOG.search_index.search(nombre, limit=1)
+    if not matches:
+        await ctx.send(f"❌ **No se encontró ningún personaje 5★ parecido a** `{nombre}`")
+        return
+    
+    character = matches[0][0]
+    where = f"<#{NOTIFY_CHANNEL}>" if NOTIFY_CHANNEL else "este canal"
+    if subscription_store.subscribe(ctx.author.id, character['id'], ctx.channel.id):
+        await ctx.send(f"🔔 **Te avisaré en {where} cuando {character['name']} tenga banner.**")
+    else:
+        await ctx.send(f"🔔 **Ya estabas suscrito a {character['name']}.** Los avisos llegarán a {where}.")
+
+@bot.command(name='desuscribir')
+async def unsubscribe_command(ctx, *, nombre: str = None):
+    """Quita la suscripción a un personaje, o todas si no se indica ninguno"""
+    character_id = None
+    if nombre:
+        matches = CATALOG.search_index.search(nombre, limit=1)
+        if not matches:
+            await ctx.send(f"❌ **No se encontró ningún personaje 5★ parecido a** `{nombre}`")
+            return
+        character_id = matches[0][0]['id']
+    
+    removed = subscription_store.unsubscribe(ctx.author.id, character_id)
+    if not removed:
+        await ctx.send("ℹ️ **No tenías esa suscripción.**")
+        return
+    
+    names = {c['id']: c['name'] for c in CATALOG.characters}
+    await ctx.send(f"🔕 **Suscripción eliminada:** {', '.join(names.get(c, c) for c in removed)}")
+
+GUARANTEED_WORDS = {'si', 'sí', 'garantizado', 'g', 'true'}
+NOT_GUARANTEED_WORDS = {'no', 'false', '50/50'}
+
+@bot.command(name='probabilidad', aliases=['prob'])
+async def probability_command(ctx, *, argumentos: str = None):
+    """Probabilidad de conseguir un 5★ destacado en N tiradas con pity y 50/50"""
+    usage = "❌ **Usa:** `!probabilidad <personaje> <tiradas> [pity] [garantizado]`"
+    words = (argumentos or "").split()
+    
+    guaranteed = False
+    if words and words[-1].lower() in GUARANTEED_WORDS | NOT_GUARANTEED_WORDS:
+        guaranteed = words.pop().lower() in GUARANTEED_WORDS
+    numbers = []
+    while words and words[-1].isdigit() and len(numbers) < 2:
+        numbers.insert(0, int(words.pop()))
+    if not words or not numbers:
+        await ctx.send(usage)
+        return
+    pulls, pity = numbers[0], numbers[1] if len(numbers) > 1 else 0
+    
+    if not 1 <= pulls <= WARP_MAX_PULLS or not 0 <= pity < WARP_HARD_PITY:
+        await ctx.send(f"❌ **Las tiradas van de 1 a {WARP_MAX_PULLS} y el pity de 0 a {WARP_HARD_PITY - 1}.**")
+        return
+    
+    nombre = " ".join(words)
+    matches = CATALOG.search_index.search(nombre, limit=1)
+    if not matches:
+        await ctx.send(f"❌ **No se encontró ningún personaje 5★ parecido a** `{nombre}`")
+        return
+    
+    # El cálculo exacto y la simulación no deben bloquear el bucle; luego quedan cacheados
+    odds = await asyncio.to_thread(warp_odds, pulls, pity, guaranteed)
+    await run_snapshot_command('probabilidad', ctx.send, functools.partial(
+        build_probability_reply, character=matches[0][0], pulls=pulls, pity=pity, guaranteed=guaranteed, odds=odds
+    ), ctx.author.id)
+
+@bot.command(name='reruns', aliases=['rerun'])
+async def reruns_command(ctx, *, filtro: str = None):
+    """Última aparición, reruns y días sin banner por personaje, vía o elemento"""
+    for message in build_reruns_reply(filtro):
+        sent = await ctx.send(**message)
+        if 'view' in message:
+            message['view'].message = sent
+            message['view'].owner_id = ctx.author.id
 
 @bot.command(name='refresh_forum')
 @commands.has_permissions(administrator=True)
 async def refresh_forum(ctx):
     await ctx.send("🔄 **Forzando actualización del foro...**")
-    await update_forum_posts()
+    await update_forum_posts(force_refresh=True)
+
+@bot.command(name='recargar_personajes')
+@commands.has_permissions(administrator=True)
+async def reload_catalog_command(ctx):
+    """Fuerza la recarga del catálogo de personajes y muestra los cambios"""
+    try:
+        diff = await reload_character_catalog(force=True)
+    except CatalogError as e:
+        await ctx.send(f"❌ **Catálogo inválido, se mantiene el anterior:** {str(e)[:200]}")
+        return
+    
+    if diff is None:
+        await ctx.send(f"❌ **No se pudo leer `{CHARACTER_CATALOG_FILE}`, se mantiene el catálogo anterior**")
+        return
+    added, removed, changed = diff
+    
+    def format_names(names):
+        return ", ".join(names) if names else "—"
+    
+    await ctx.send(
+        f"✅ **Catálogo recargado:** {len(CATALOG.characters)} personajes\n"
+        f"➕ **Añadidos:** {format_names(added)}\n"
+        f"➖ **Eliminados:** {format_names(removed)}\n"
+        f"✏️ **Modificados:** {format_names(changed)}"
+    )
 
 @bot.command(name='reset_forum')
 @commands.has_permissions(administrator=True)
 async def reset_forum(ctx, channel_type: str = None):
-    if not channel_type or channel_type not in ['actual', 'proximo', 'endgame']:
-        await ctx.send("❌ **Usa:** `!reset_forum actual`, `!reset_forum proximo` o `!reset_forum endgame`")
+    if channel_type not in FORUM_FEEDS:
+        await ctx.send("❌ **Usa:** " + ", ".join(f"`!reset_forum {key}`" for key in FORUM_FEEDS))
         return
     
-    if channel_type == 'actual':
-        channel_id = TARGET_FORUM_ACTUAL
-    elif channel_type == 'proximo':
-        channel_id = TARGET_FORUM_PROXIMO
-    else:
-        channel_id = TARGET_FORUM_ENDGAME
-    
+    channel_id = FORUM_FEEDS[channel_type].channel_id
     if not channel_id:
         await ctx.send(f"❌ **Foro {channel_type} no configurado**")
         return
@@ -1534,61 +3902,85 @@ async def reset_forum(ctx, channel_type: str = None):
         await ctx.send(f"❌ **No se encontró el foro**")
         return
     
-    async for thread in channel.archived_threads(limit=100):
-        try:
-            await thread.edit(archived=True, locked=True)
-            await asyncio.sleep(0.5)
-        except:
-            pass
+    checkpoint = ResetCheckpoint()
+    resumed = len(checkpoint.done(channel.id))
+    status_message = await ctx.send(
+        f"🧹 **Reseteando foro {channel_type}...**"
+        + (f" (reanudando: {resumed} hilos ya archivados)" if resumed else "")
+    )
     
-    for thread in channel.threads:
-        try:
-            await thread.edit(archived=True, locked=True)
-            await asyncio.sleep(0.5)
-        except:
-            pass
+    async def report_progress(stats):
+        await status_message.edit(
+            content=f"🧹 **Reseteando foro {channel_type}...** {stats['archived']} archivados, "
+                    f"{stats['skipped']} ya cerrados, {stats['errors']} errores"
+        )
+    
+    stats = await reset_forum_channel(channel, checkpoint, progress=report_progress)
     
-    forum_manager.clear_channel(channel_id)
+    if stats['errors']:
+        await status_message.edit(
+            content=f"⚠️ **Reseteo del foro {channel_type} incompleto:** {stats['archived']} archivados, "
+                    f"{stats['skipped']} ya cerrados, {stats['errors']} errores. "
+                    f"Vuelve a ejecutar `!reset_forum {channel_type}` para continuar."
+        )
+        return
     
-    await ctx.send(f"✅ **Foro {channel_type} reseteado. Las publicaciones se recrearán en la próxima actualización.**")
+    await status_message.edit(
+        content=f"✅ **Foro {channel_type} reseteado:** {stats['archived']} archivados, {stats['skipped']} ya cerrados. "
+                f"Las publicaciones se recrearán en la próxima actualización."
+    )
 
 @bot.command(name='stats')
 async def banner_stats(ctx):
-    banners = scraper.get_banners()
-    endgame = scraper.get_endgame_content()
-    
-    now = datetime.now()
-    banners_actuales = 0
-    banners_proximos = 0
-    total_personajes_5star = 0
-    personajes_set = set()
-    
-    for banner in banners:
-        if banner.end_date and banner.end_date > now:
-            if banner.start_date and banner.start_date <= now:
-                banners_actuales += 1
-            elif banner.start_date and banner.start_date > now:
-                banners_proximos += 1
-            else:
-                banners_actuales += 1
-        
-        for char in banner.featured_5star_char:
-            if char['name'] not in personajes_set:
-                total_personajes_5star += 1
-                personajes_set.add(char['name'])
-    
-    embed = discord.Embed(
-        title="📊 **Estadísticas**",
-        description="Resumen del juego",
-        color=discord.Color.blue()
-    )
-    
-    embed.add_field(name="🔴 Banners actuales", value=str(banners_actuales), inline=True)
-    embed.add_field(name="🟡 Banners próximos", value=str(banners_proximos), inline=True)
-    embed.add_field(name="✨ Personajes 5★ únicos", value=str(total_personajes_5star), inline=True)
-    embed.add_field(name="⚔️ Modos End Game", value=str(len(endgame)), inline=True)
+    await run_snapshot_command('stats', ctx.send, build_stats_reply, ctx.author.id)
+
+@bot.tree.command(name='stats', description="Resumen de banners y End Game")
+@app_commands.describe(publico="Mostrar la respuesta a todo el canal")
+async def stats_slash(interaction: discord.Interaction, publico: bool = False):
+    await interaction.response.defer(ephemeral=not publico, thinking=True)
+    await run_snapshot_command('/stats', followup_sender(interaction), build_stats_reply, interaction.user.id)
+
+@bot.command(name='sync')
+@commands.is_owner()
+async def sync_command(ctx):
+    """Registra los comandos de barra en Discord (solo hace falta tras cambiarlos)"""
+    try:
+        synced = await sync_slash_commands()
+    except discord.HTTPException as e:
+        await ctx.send(f"❌ **Error sincronizando comandos:** {str(e)[:200]}")
+        return
+    await ctx.send(f"🔗 **{len(synced)} comandos de barra sincronizados**")
+
+@bot.command(name='latencia')
+async def latency_command(ctx):
+    """Muestra la latencia de extremo a extremo de cada comando"""
+    lines = command_latency.report_lines()
+    if not lines:
+        await ctx.send("⏱️ **Todavía no hay comandos medidos.**")
+        return
+    await ctx.send("## ⏱️ **Latencia por comando**\n" + "\n".join(lines))
+
+@bot.command(name='lag')
+@commands.has_permissions(administrator=True)
+async def lag_command(ctx):
+    """Muestra el retraso del bucle de eventos y las llamadas que más lo bloquean"""
+    p50 = loop_watchdog.percentile(0.5)
+    if p50 is None:
+        await ctx.send("🐕 **La vigilancia del bucle todavía no tiene muestras.**")
+        return
     
-    await ctx.send(embed=embed)
+    p99 = loop_watchdog.percentile(0.99)
+    lines = [
+        "## 🐕 **Retraso del bucle de eventos**",
+        f"p50 {p50 * 1000:.1f} ms · p99 {p99 * 1000:.1f} ms · máx {max(loop_watchdog.delays) * 1000:.0f} ms",
+        f"Bloqueos de más de {loop_watchdog.threshold * 1000:.0f} ms: {loop_watchdog.stalls}"
+    ]
+    offenders = loop_watchdog.worst_offenders()
+    if offenders:
+        lines.append("\n**Llamadas bloqueantes:**")
+        for bot_site, call, seconds, stalls in offenders:
+            lines.append(f"`{bot_site}` → `{call}` - ~{seconds * 1000:.0f} ms en {stalls} bloqueos")
+    await ctx.send("\n".join(lines))
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -1613,6 +4005,11 @@ async def on_command_error(ctx, error):
 # INICIAR BOT
 # ============================================
 if __name__ == "__main__":
+    if not TOKEN:
+        logger.error("❌ ERROR CRÍTICO: No hay token de Discord")
+        sys.exit(1)
+    
+    tracer.start()
     try:
         bot.run(TOKEN)
     except Exception as e:
@@ -0,0 +1,337 @@
+"""Prueba de carga del bot contra Discord y Prydwen simulados en local.
+
+Levanta una API REST de Discord falsa (con buckets de rate limit que devuelven 429
+como la real) y un Prydwen falso con latencia configurable. Después lanza cientos
+de !personajes / !endgame / !stats concurrentes y sincronizaciones completas de
+foros, y muestra rendimiento, latencias p50/p99, retraso del bucle de eventos y
+llamadas a Discord por sincronización.
+
+Uso:
+    python loadtest.py [--commands 300] [--concurrency 100] [--channels 20]
+                       [--syncs 1] [--prydwen-latency 0.3] [--snapshot-ttl 0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Los ficheros de estado del bot (catálogo, snapshot, foros) van a un directorio temporal
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix="hsr-loadtest-")
+shutil.copy(os.path.join(REPO_DIR, 'characters.json'), WORK_DIR)
+os.chdir(WORK_DIR)
+
+import discord
+from aiohttp import web
+
+import bot
+import benchmarks
+
+GUILD_ID = 1000
+API_PREFIX = "/api/v10"
+
+# El ruido de cada petición no aporta nada al informe
+logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
+logging.getLogger(bot.__name__).setLevel(logging.WARNING)
+
+def json_response(data, status=200, headers=None):
+    """discord.py solo decodifica el cuerpo si el content-type es exactamente application/json"""
+    response = web.Response(body=json.dumps(data).encode('utf-8'), status=status, headers=headers)
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+# ============================================
+# DISCORD REST SIMULADO
+# ============================================
+class FakeDiscord:
+    """API REST mínima de Discord con buckets por ruta y canal, como el rate limit real"""
+
+    def __init__(self, bucket_limit, bucket_window):
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.buckets = {}
+        self.calls = Counter()
+        self.total_calls = 0
+        self.rate_limited = 0
+        self.snowflakes = itertools.count(10 ** 17)
+        self.channels = {}
+        self.bot_user = {'id': '900', 'username': 'sparxie', 'discriminator': '0', 'avatar': None, 'bot': True}
+
+    def snowflake(self):
+        return str(next(self.snowflakes))
+
+    # ---------- rate limit ----------
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = f"{request.method} {request.match_info.route.resource.canonical}"
+        bucket_key = (route, request.match_info.get('channel_id'))
+        now = time.monotonic()
+
+        window_start, count = self.buckets.get(bucket_key, (now, 0))
+        if now - window_start >= self.bucket_window:
+            window_start, count = now, 0
+        reset_after = max(0.0, self.bucket_window - (now - window_start))
+
+        headers = {
+            'X-RateLimit-Limit': str(self.bucket_limit),
+            'X-RateLimit-Reset': str(time.time() + reset_after),
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            'X-RateLimit-Bucket': f"{abs(hash(route)):x}",
+        }
+
+        if count >= self.bucket_limit:
+            self.rate_limited += 1
+            headers.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Scope': 'user', 'Via': '1.1 google'})
+            return json_response(
+                {'message': 'You are being rate limited.', 'retry_after': reset_after, 'global': False},
+                status=429, headers=headers
+            )
+
+        self.buckets[bucket_key] = (window_start, count + 1)
+        self.total_calls += 1
+        self.calls[route] += 1
+
+        response = await handler(request)
+        headers['X-RateLimit-Remaining'] = str(self.bucket_limit - count - 1)
+        response.headers.update(headers)
+        return response
+
+    # ---------- modelos ----------
+    def add_channel(self, channel_type, name):
+        channel = {
+            'id': self.snowflake(), 'type': channel_type, 'guild_id': str(GUILD_ID), 'name': name,
+            'position': 0, 'permission_overwrites': [], 'nsfw': False, 'parent_id': None,
+            'topic': None, 'rate_limit_per_user': 0, 'last_message_id': None, 'flags': 0,
+            'available_tags': [], 'default_reaction_emoji': None,
+        }
+        self.channels[channel['id']] = channel
+        return channel
+
+    def message(self, channel_id, body):
+        return {
+            'id': self.snowflake(), 'channel_id': channel_id, 'guild_id': str(GUILD_ID),
+            'author': self.bot_user, 'content': body.get('content') or '',
+            'timestamp': datetime.now(timezone.utc).isoformat(), 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [],
+            'attachments': [], 'embeds': body.get('embeds') or [], 'pinned': False, 'type': 0,
+        }
+
+    def thread(self, parent_id, name):
+        return {
+            'id': self.snowflake(), 'type': 11, 'guild_id': str(GUILD_ID), 'parent_id': parent_id,
+            'owner_id': self.bot_user['id'], 'name': name, 'last_message_id': None,
+            'rate_limit_per_user': 0, 'message_count': 1, 'member_count': 1, 'flags': 0,
+            'thread_metadata': {
+                'archived': False, 'auto_archive_duration': 10080, 'locked': False,
+                'archive_timestamp': datetime.now(timezone.utc).isoformat(),
+            },
+        }
+
+    # ---------- rutas ----------
+    async def get_me(self, request):
+        return json_response(self.bot_user)
+
+    async def get_application(self, request):
+        return json_response({
+            'id': '901', 'name': 'sparxie', 'description': '', 'icon': None, 'bot_public': False,
+            'bot_require_code_grant': False, 'verify_key': '', 'owner': self.bot_user, 'flags': 0,
+        })
+
+    async def sync_commands(self, request):
+        return json_response([])
+
+    async def get_channel(self, request):
+        return json_response(self.channels[request.match_info['channel_id']])
+
+    async def edit_channel(self, request):
+        channel = self.channels[request.match_info['channel_id']]
+        body = await request.json()
+        if 'name' in body:
+            channel['name'] = body['name']
+        for field in ('archived', 'locked'):
+            if field in body and 'thread_metadata' in channel:
+                channel['thread_metadata'][field] = body[field]
+        return json_response(channel)
+
+    async def send_message(self, request):
+        return json_response(self.message(request.match_info['channel_id'], await request.json()))
+
+    async def edit_message(self, request):
+        return json_response(self.message(request.match_info['channel_id'], await request.json()))
+
+    async def delete_message(self, request):
+        return web.Response(status=204)
+
+    async def create_thread(self, request):
+        body = await request.json()
+        thread = self.thread(request.match_info['channel_id'], body['name'])
+        self.channels[thread['id']] = thread
+        thread['message'] = self.message(thread['id'], body.get('message', {}))
+        return json_response(thread)
+
+    async def archived_threads(self, request):
+        # Los hilos creados por el bot no llegan a la caché sin gateway: se devuelven aquí como archivados
+        parent_id = request.match_info['channel_id']
+        threads = []
+        for channel in self.channels.values():
+            if channel.get('parent_id') == parent_id and channel['type'] == 11:
+                channel['thread_metadata']['archived'] = True
+                threads.append({key: value for key, value in channel.items() if key != 'message'})
+        return json_response({'threads': threads, 'members': [], 'has_more': False})
+
+    def app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get(f"{API_PREFIX}/users/@me", self.get_me)
+        app.router.add_get(f"{API_PREFIX}/oauth2/applications/@me", self.get_application)
+        app.router.add_put(f"{API_PREFIX}/applications/{{application_id}}/commands", self.sync_commands)
+        app.router.add_get(f"{API_PREFIX}/channels/{{channel_id}}", self.get_channel)
+        app.router.add_patch(f"{API_PREFIX}/channels/{{channel_id}}", self.edit_channel)
+        app.router.add_post(f"{API_PREFIX}/channels/{{channel_id}}/messages", self.send_message)
+        app.router.add_patch(f"{API_PREFIX}/channels/{{channel_id}}/messages/{{message_id}}", self.edit_message)
+        app.router.add_delete(f"{API_PREFIX}/channels/{{channel_id}}/messages/{{message_id}}", self.delete_message)
+        app.router.add_post(f"{API_PREFIX}/channels/{{channel_id}}/threads", self.create_thread)
+        app.router.add_get(f"{API_PREFIX}/channels/{{channel_id}}/threads/archived/public", self.archived_threads)
+        return app
+
+# ============================================
+# MÉTRICAS
+# ============================================
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    if not samples:
+        return float('nan')
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+async def monitor_loop_lag(stop, samples, interval=0.05):
+    """Mide cuánto se retrasa un sleep corto: es el tiempo que el bucle estuvo bloqueado"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+# ============================================
+# ESCENARIO
+# ============================================
+async def fetch_into_cache(client, guild, channel_id):
+    """Descarga un canal de la API falsa y lo deja en la caché para que bot.get_channel lo encuentre"""
+    channel = await client.fetch_channel(int(channel_id))
+    guild._add_channel(channel)
+    return channel
+
+async def run(args):
+    fake = FakeDiscord(args.bucket_limit, args.bucket_window)
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    discord.http.Route.BASE = f"http://127.0.0.1:{port}{API_PREFIX}"
+
+    prydwen = benchmarks.StandInServer(benchmarks.build_sample_page(), latency=args.prydwen_latency)
+    prydwen.__enter__()
+    scraper = bot.scraper
+    scraper.sources = [bot.HtmlBannerSource(scraper, "prydwen", prydwen.url)]
+    scraper.fetcher = bot.HedgedFetcher(scraper.sources)
+    bot.character_enricher.base_url = prydwen.url + "characters/"
+    bot.SNAPSHOT_TTL = args.snapshot_ttl
+
+    client = bot.bot
+    await client.login("loadtest-token")
+    guild = discord.Guild._create_unavailable(state=client._connection, guild_id=GUILD_ID)
+    client._connection._add_guild(guild)
+
+    text_channels = [
+        await fetch_into_cache(client, guild, fake.add_channel(0, f"general-{i}")['id'])
+        for i in range(args.channels)
+    ]
+    for feed in bot.FORUM_FEEDS.values():
+        forum = await fetch_into_cache(client, guild, fake.add_channel(15, f"foro-{feed.key}")['id'])
+        feed.channel_id = forum.id
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(stop, lag_samples))
+
+    # ---------- comandos concurrentes ----------
+    commands = [bot.personajes_command, bot.endgame_command, bot.banner_stats]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = {command.name: [] for command in commands}
+    calls_before = fake.total_calls
+
+    async def invoke(index):
+        command = commands[index % len(commands)]
+        channel = text_channels[index % len(text_channels)]
+        ctx = SimpleNamespace(send=channel.send, channel=channel, author=SimpleNamespace(id=5000 + index))
+        async with semaphore:
+            start = time.perf_counter()
+            await command.callback(ctx)
+            latencies[command.name].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(invoke(i) for i in range(args.commands)))
+    command_elapsed = time.perf_counter() - start
+    command_calls = fake.total_calls - calls_before
+
+    # ---------- sincronizaciones de foros ----------
+    sync_calls = []
+    sync_times = []
+    for _ in range(args.syncs):
+        calls_before = fake.total_calls
+        start = time.perf_counter()
+        await bot.update_forum_posts()
+        sync_times.append(time.perf_counter() - start)
+        sync_calls.append(fake.total_calls - calls_before)
+
+    stop.set()
+    await lag_task
+    await client.close()
+    await runner.cleanup()
+    prydwen.__exit__(None, None, None)
+
+    # ---------- informe ----------
+    all_latencies = [s for samples in latencies.values() for s in samples]
+    print()
+    print(f"Comandos: {args.commands} en {command_elapsed:.2f}s → {args.commands / command_elapsed:.1f} cmd/s "
+          f"(concurrencia {args.concurrency}, {args.channels} canales)")
+    print(f"  {'total':<12} p50 {percentile(all_latencies, 0.5) * 1000:7.1f} ms   p99 {percentile(all_latencies, 0.99) * 1000:7.1f} ms")
+    for name, samples in latencies.items():
+        print(f"  {name:<12} p50 {percentile(samples, 0.5) * 1000:7.1f} ms   p99 {percentile(samples, 0.99) * 1000:7.1f} ms")
+    print(f"  llamadas a Discord: {command_calls} ({command_calls / args.commands:.2f} por comando), "
+          f"429 recibidos: {fake.rate_limited}, peticiones a Prydwen: {prydwen.requests}")
+    for run_index, (elapsed, calls) in enumerate(zip(sync_times, sync_calls), start=1):
+        print(f"Sincronización {run_index}: {elapsed:.2f}s, {calls} llamadas a Discord")
+    print(f"Retraso del bucle: p50 {percentile(lag_samples, 0.5) * 1000:.1f} ms   "
+          f"p99 {percentile(lag_samples, 0.99) * 1000:.1f} ms   máx {max(lag_samples, default=0) * 1000:.1f} ms")
+    print("Llamadas por ruta:")
+    for route, count in fake.calls.most_common():
+        print(f"  {count:6d}  {route}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Prueba de carga con Discord y Prydwen locales")
+    arg_parser.add_argument('--commands', type=int, default=300)
+    arg_parser.add_argument('--concurrency', type=int, default=100)
+    arg_parser.add_argument('--channels', type=int, default=20)
+    arg_parser.add_argument('--syncs', type=int, default=1)
+    arg_parser.add_argument('--prydwen-latency', type=float, default=0.3)
+    arg_parser.add_argument('--snapshot-ttl', type=float, default=0,
+                            help="0 fuerza una revalidación en segundo plano en cada comando")
+    arg_parser.add_argument('--bucket-limit', type=int, default=5)
+    arg_parser.add_argument('--bucket-window', type=float, default=1.0)
+    args = arg_parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Proceso dedicado al scraping que publica los snapshots a los procesos del bot.
+
+Con varios procesos del bot (shards, réplicas), cada uno scrapeaba Prydwen por su
+cuenta. Este worker es el único que descarga y parsea la página: publica cada
+snapshot nuevo, versionado, en un socket Unix (una línea JSON por versión) y lo
+guarda en su snapshot en disco. Los bots arrancados con SCRAPER_SOCKET apuntando al
+mismo socket solo se suscriben; el primero conectado es el único que avisa a los
+suscriptores de personajes (si se desconecta, hereda el papel el siguiente).
+
+Uso:
+    python scraper_worker.py [--socket /run/hsr/snapshots.sock] [--interval 900]
+    SCRAPER_SOCKET=/run/hsr/snapshots.sock python bot.py
+"""
+import argparse
+import asyncio
+import os
+
+import bot
+
+async def run(args):
+    publisher = bot.SnapshotPublisher(args.socket)
+    await publisher.start()
+
+    # El snapshot del disco sirve a los bots mientras llega el primer scrape
+    if bot.scraper.last_snapshot:
+        bot.scraper.last_snapshot.stale = True
+        await publisher.publish(bot.scraper.last_snapshot)
+
+    while True:
+        waiters = publisher.take_refresh_waiters()
+        snapshot = None
+        try:
+            snapshot = await asyncio.to_thread(bot.scraper.get_snapshot)
+            published = await publisher.publish(snapshot)
+        except Exception as e:
+            published = False
+            bot.logger.error(f"❌ Scrape fallido en el worker: {e}")
+
+        # Con el scrape fallido (snapshot anterior marcado obsoleto) o sin cambios puede no haber versión
+        # nueva: los bots que pidieron el refresco esperan esta respuesta
+        if snapshot is None or snapshot.stale:
+            status = 'failed'
+        else:
+            status = 'published' if published else 'unchanged'
+        await publisher.answer_refresh(waiters, status)
+
+        if published:
+            # El catálogo compartido se recarga solo en cada bot
+            try:
+                await bot.character_enricher.enrich(snapshot)
+            except Exception as e:
+                bot.logger.error(f"❌ Error enriqueciendo el catálogo en el worker: {e}")
+
+        # Un !refresh_forum en cualquier bot adelanta el siguiente scrape
+        try:
+            await asyncio.wait_for(publisher.refresh_requested.wait(), timeout=args.interval)
+            bot.logger.info("🔄 Refresco pedido por un bot")
+        except asyncio.TimeoutError:
+            pass
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Worker de scraping que publica snapshots a los bots")
+    arg_parser.add_argument('--socket', default=os.environ.get('SCRAPER_SOCKET', 'scraper.sock'))
+    arg_parser.add_argument('--interval', type=float, default=bot.SNAPSHOT_TTL, help="Segundos entre scrapes")
+    args = arg_parser.parse_args()
+
+    bot.tracer.start()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""Los ficheros de estado del bot (catálogo, snapshot, foros) van a un directorio temporal"""
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="hsr-tests-")
+shutil.copy(os.path.join(REPO_DIR, 'characters.json'), WORK_DIR)
+os.chdir(WORK_DIR)
+sys.path.insert(0, REPO_DIR)
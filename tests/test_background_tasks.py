@@ -0,0 +1,29 @@
+import asyncio
+import gc
+import logging
+
+import bot
+
+def test_background_tasks_are_kept_until_done_and_failures_logged(caplog):
+    async def scenario():
+        finished = asyncio.Event()
+        
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.set()
+        
+        async def broken():
+            raise RuntimeError("sin red")
+        
+        bot.spawn_background(slow(), "lenta")
+        bot.spawn_background(broken(), "rota")
+        gc.collect()
+        assert len(bot._background_tasks) == 2
+        
+        await asyncio.wait_for(finished.wait(), 1)
+        await asyncio.sleep(0)
+        assert not bot._background_tasks
+    
+    with caplog.at_level(logging.ERROR, logger=bot.logger.name):
+        asyncio.run(scenario())
+    assert any("'rota'" in record.getMessage() and "sin red" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,29 @@
+import copy
+
+import bot
+
+def catalog_with(characters):
+    return bot.CharacterCatalog(characters)
+
+def test_path_fix_is_reported_as_changed():
+    old = copy.deepcopy(bot.CATALOG.characters)
+    new = copy.deepcopy(old)
+    kafka = next(c for c in new if c['id'] == 'kafka')
+    kafka['path'] = 'Erudition'
+    
+    assert bot.diff_catalogs(catalog_with(old), catalog_with(new)) == ([], [], ['Kafka'])
+
+def test_duplicate_ids_are_compared_in_order():
+    old = copy.deepcopy(bot.CATALOG.characters)
+    new = copy.deepcopy(old)
+    trailblazers = [c for c in new if c['id'] == 'trailblazer']
+    assert len(trailblazers) > 1
+    trailblazers[-1]['element'] = 'Quantum'
+    
+    added, removed, changed = bot.diff_catalogs(catalog_with(old), catalog_with(new))
+    assert (added, removed) == ([], [])
+    assert changed == [trailblazers[-1]['name']]
+    
+    extra = dict(trailblazers[0], path='Elation')
+    added, removed, changed = bot.diff_catalogs(catalog_with(old), catalog_with(old + [extra]))
+    assert (added, removed, changed) == ([extra['name']], [], [])
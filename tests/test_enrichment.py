@@ -0,0 +1,39 @@
+import bot
+
+NAV = '<nav><img alt="Harmony"><span>Fire</span><span>Nihility</span></nav>'
+TEAMS = '<div class="teams"><img alt="Abundance"><span>Quantum</span></div>'
+
+class StaticCache:
+    def __init__(self, html):
+        self.html = html
+    
+    def get(self, session, url):
+        return self.html
+
+def fetch(html, element="Unknown"):
+    enricher = bot.CharacterEnricher({}, StaticCache(html))
+    char_data = {'name': "New Hero", 'char_key': 'new-hero', 'element': element}
+    return enricher.fetch_details(char_data, None)
+
+def test_labels_come_from_the_character_header():
+    html = (f'<html><body>{NAV}<div class="character-top"><h1>New Hero</h1>'
+            f'<img alt="Erudition"><span>Lightning</span></div>{TEAMS}</body></html>')
+    details = fetch(html)
+    
+    assert (details['path'], details['element']) == ("Erudition", "Lightning")
+
+def test_banner_element_wins_over_the_page():
+    html = '<html><body><div class="character-top"><h1>New Hero</h1><span>Lightning</span></div></body></html>'
+    
+    assert fetch(html, element="Wind")['element'] == "Wind"
+
+def test_ambiguous_header_is_left_unknown():
+    html = (f'<html><body><div class="character-header"><h1>New Hero</h1>'
+            f'<img alt="Erudition"><img alt="Harmony"></div></body></html>')
+    
+    assert fetch(html)['path'] == "Unknown"
+
+def test_page_without_header_is_left_unknown():
+    details = fetch(f'<html><body>{NAV}{TEAMS}</body></html>')
+    
+    assert (details['path'], details['element']) == ("Unknown", "Unknown")
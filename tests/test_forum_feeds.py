@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import bot
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+def run_cone_sync(monkeypatch, tmp_path, snapshot, records):
+    """Sincroniza el feed de conos sin Discord; devuelve los trabajos de retirada pedidos"""
+    manager = bot.ForumManager()
+    manager.posts_file = str(tmp_path / "forum_posts.json")
+    manager.posts = {}
+    for content_id, record in records.items():
+        manager.posts[f"77_{content_id}"] = record
+    
+    created = []
+    async def create_thread(name, embed, auto_archive_duration):
+        created.append(name)
+        thread_id = 1000 + len(created)
+        return SimpleNamespace(id=thread_id), SimpleNamespace(id=thread_id)
+    
+    async def list_forum_threads(channel):
+        return []
+    
+    jobs = []
+    async def apply_lifecycle_jobs(batch, actual_forum_id=None):
+        jobs.extend(batch)
+        return {'promoted': 0, 'retired': len(batch), 'errors': 0, 'failed': []}
+    
+    async def no_sleep(delay):
+        pass
+    
+    feed = bot.FORUM_FEEDS['conos']
+    monkeypatch.setattr(feed, 'channel_id', 77)
+    monkeypatch.setattr(bot, 'forum_manager', manager)
+    monkeypatch.setattr(bot, 'resolve_forum_channel', lambda channel_id: SimpleNamespace(name="conos", create_thread=create_thread))
+    monkeypatch.setattr(bot, 'list_forum_threads', list_forum_threads)
+    monkeypatch.setattr(bot, 'apply_lifecycle_jobs', apply_lifecycle_jobs)
+    monkeypatch.setattr(bot.asyncio, 'sleep', no_sleep)
+    
+    stats = asyncio.run(bot.sync_forum_feed(feed, snapshot, NOW))
+    return stats, created, jobs, manager
+
+def test_cones_missing_from_partial_scrape_are_kept_until_their_end_date(monkeypatch, tmp_path):
+    records = {
+        'alongthepassingshore': {'thread_id': 1, 'end_date': (NOW + timedelta(days=3)).isoformat()},
+        'patienceisallyouneed': {'thread_id': 2, 'end_date': (NOW - timedelta(hours=1)).isoformat()},
+        'sinfecha': {'thread_id': 3},
+    }
+    stats, created, jobs, _ = run_cone_sync(monkeypatch, tmp_path, bot.Snapshot([], [], source="test"), records)
+    
+    assert created == []
+    assert [job[1] for job in jobs] == ['patienceisallyouneed']
+    assert stats['errors'] == 0
+
+def test_cone_posts_record_their_end_date(monkeypatch, tmp_path):
+    end_date = NOW + timedelta(days=10)
+    banner = bot.Banner("Deadly Dancer", "Mixto", "", [], [], [{'name': "Along the Passing Shore"}], [],
+                        start_date=NOW - timedelta(days=5), end_date=end_date, banner_id="deadlydancer")
+    stats, created, jobs, manager = run_cone_sync(monkeypatch, tmp_path, bot.Snapshot([banner], [], source="test"), {})
+    
+    assert created == ["🔴 Along the Passing Shore"]
+    assert jobs == []
+    assert manager.get_post(77, 'alongthepassingshore')['end_date'] == end_date.isoformat()
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import bot
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+def make_snapshot(*banners):
+    return bot.Snapshot(list(banners), [], source="test")
+
+def make_banner(character, end_date, banner_id="deadlydancer"):
+    start_date = end_date - timedelta(days=21) if end_date else None
+    return bot.Banner("Deadly Dancer", "Personaje", "", [{'name': character}], [], [], [],
+                      start_date=start_date, end_date=end_date, banner_id=banner_id)
+
+def test_missing_banner_without_end_date_is_not_retired(tmp_path):
+    lifecycle = bot.PostLifecycle(str(tmp_path / "lifecycle.json"))
+    observed = lifecycle.observe(make_snapshot(make_banner("Kafka", None)), NOW)
+    lifecycle.commit(observed, lifecycle.diff(observed, NOW), NOW)
+    
+    # Un scrape roto que no trae el banner no puede retirarlo
+    assert lifecycle.diff({}, NOW + timedelta(days=1)) == []
+
+def test_missing_banner_is_retired_only_after_its_end_date(tmp_path):
+    lifecycle = bot.PostLifecycle(str(tmp_path / "lifecycle.json"))
+    observed = lifecycle.observe(make_snapshot(make_banner("Kafka", NOW + timedelta(days=2))), NOW)
+    lifecycle.commit(observed, lifecycle.diff(observed, NOW), NOW)
+    
+    assert lifecycle.diff({}, NOW + timedelta(days=1)) == []
+    transitions = lifecycle.diff({}, NOW + timedelta(days=3))
+    assert [(t['character'], t['from'], t['to']) for t in transitions] == [("Kafka", 'actual', 'terminado')]
+
+def test_failed_transitions_are_replanned(tmp_path):
+    lifecycle = bot.PostLifecycle(str(tmp_path / "lifecycle.json"))
+    observed = lifecycle.observe(make_snapshot(make_banner("Kafka", NOW + timedelta(days=2))), NOW)
+    lifecycle.commit(observed, lifecycle.diff(observed, NOW), NOW)
+    
+    later = NOW + timedelta(days=3)
+    transitions = lifecycle.diff({}, later)
+    lifecycle.commit({}, transitions, later, failed={'kafka'})
+    assert lifecycle.diff({}, later) == transitions
+    
+    lifecycle.commit({}, transitions, later)
+    assert lifecycle.diff({}, later) == []
+
+def test_failed_promotion_keeps_previous_stage(tmp_path):
+    lifecycle = bot.PostLifecycle(str(tmp_path / "lifecycle.json"))
+    banner = make_banner("Kafka", NOW + timedelta(days=30))
+    banner.start_date = NOW + timedelta(days=5)
+    observed = lifecycle.observe(make_snapshot(banner), NOW)
+    lifecycle.commit(observed, lifecycle.diff(observed, NOW), NOW)
+    
+    later = NOW + timedelta(days=6)
+    observed = lifecycle.observe(make_snapshot(banner), later)
+    transitions = lifecycle.diff(observed, later)
+    assert [(t['from'], t['to']) for t in transitions] == [('proximo', 'actual')]
+    
+    lifecycle.commit(observed, transitions, later, failed={'kafka'})
+    assert lifecycle.diff(observed, later) == transitions
@@ -0,0 +1,32 @@
+import time
+
+import benchmarks
+import bot
+
+PAGE = benchmarks.build_sample_page(filler_kb=200)
+
+def fetch_archived(monkeypatch, tmp_path, full_body):
+    monkeypatch.setattr(bot, 'PAGE_ARCHIVE_FULL_BODY', full_body)
+    archive = bot.PageArchive(str(tmp_path / "page_archive"))
+    scraper = bot.BannerScraper(archive=archive)
+    with benchmarks.StandInServer(PAGE) as server:
+        snapshot = bot.HtmlBannerSource(scraper, "prydwen", server.url).fetch()
+        # Con el cuerpo completo, el resto se lee en segundo plano
+        deadline = time.monotonic() + 5
+        while not archive.entries and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert snapshot.banners
+    assert len(archive.entries) == 1
+    return archive, archive.entries[0]
+
+def test_archive_keeps_the_full_body_after_early_stop(monkeypatch, tmp_path):
+    archive, entry = fetch_archived(monkeypatch, tmp_path, full_body=True)
+    
+    assert entry['truncated'] is False
+    assert archive.read(entry['sha256']) == PAGE.encode('utf-8')
+
+def test_prefix_only_archive_is_marked_truncated(monkeypatch, tmp_path):
+    archive, entry = fetch_archived(monkeypatch, tmp_path, full_body=False)
+    
+    assert entry['truncated'] is True
+    assert entry['size'] < len(PAGE.encode('utf-8'))
@@ -0,0 +1,29 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+    
+    async def send_message(self, content, ephemeral=False):
+        self.sent.append((content, ephemeral))
+
+def make_interaction(user_id):
+    return SimpleNamespace(user=SimpleNamespace(id=user_id), response=FakeResponse())
+
+def test_only_the_invoker_can_use_the_controls():
+    async def scenario():
+        view = bot.SnapshotPaginator(lambda: ["página 1", "página 2"])
+        view.owner_id = 42
+        
+        owner = make_interaction(42)
+        assert await view.interaction_check(owner)
+        assert owner.response.sent == []
+        
+        other = make_interaction(7)
+        assert not await view.interaction_check(other)
+        assert [ephemeral for _, ephemeral in other.response.sent] == [True]
+    
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import bot
+
+class FakeFollowup:
+    """Como Webhook.send: solo devuelve el mensaje enviado con wait=True"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def send(self, wait=False, **message):
+        self.sent.append(message)
+        return SimpleNamespace(id=len(self.sent)) if wait else None
+
+class FakeResponse:
+    def __init__(self):
+        self.ephemeral = None
+    
+    async def defer(self, ephemeral=False, thinking=False):
+        self.ephemeral = ephemeral
+
+def make_snapshot():
+    now = datetime.now()
+    banner = bot.Banner("Deadly Dancer", "Personaje", "5d", [{'name': "Kafka", 'char_key': 'kafka'}], [], [], [],
+                        duration_text="Event Duration", start_date=now - timedelta(days=2),
+                        end_date=now + timedelta(days=5), banner_id="deadlydancer")
+    return bot.Snapshot([banner], [], source="test")
+
+def test_slash_reply_keeps_its_message_for_the_view(monkeypatch):
+    snapshot = make_snapshot()
+    async def get_current_snapshot(force_refresh=False):
+        return snapshot
+    monkeypatch.setattr(bot, 'get_current_snapshot', get_current_snapshot)
+    
+    interaction = SimpleNamespace(user=SimpleNamespace(id=42), response=FakeResponse(), followup=FakeFollowup())
+    asyncio.run(bot.personajes_slash.callback(interaction))
+    
+    [message] = interaction.followup.sent
+    view = message['view']
+    assert view.message is not None
+    assert view.owner_id == 42
+    # Por defecto la respuesta es solo para quien pregunta
+    assert interaction.response.ephemeral is True
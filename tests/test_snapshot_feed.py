@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import os
+
+import bot
+import scraper_worker
+
+def make_snapshot(version):
+    return bot.Snapshot([], [], source=f"v{version}")
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+def test_only_one_subscriber_notifies(monkeypatch, tmp_path):
+    notified = []
+    async def notify_new_featured(previous, snapshot):
+        notified.append(snapshot.source)
+    monkeypatch.setattr(bot, 'notify_new_featured', notify_new_featured)
+    monkeypatch.setattr(bot.banner_history, 'record', lambda snapshot: None)
+    monkeypatch.setattr(bot.scraper, 'last_snapshot', make_snapshot(0))
+    
+    async def scenario():
+        path = os.path.join(str(tmp_path), "feed.sock")
+        publisher = bot.SnapshotPublisher(path)
+        await publisher.start()
+        subscribers = [bot.SnapshotSubscriber(path) for _ in range(3)]
+        for subscriber in subscribers:
+            subscriber.start()
+            await wait_for(lambda: len(publisher.clients) == subscribers.index(subscriber) + 1)
+        await wait_for(lambda: subscribers[0].notifier)
+        
+        await publisher.publish(make_snapshot(1))
+        await wait_for(lambda: all(s.version == 1 for s in subscribers))
+        await asyncio.sleep(0.05)
+        assert notified == ["v1"]
+        assert [s.notifier for s in subscribers] == [True, False, False]
+        
+        # Si el que avisa se va, el siguiente hereda el papel
+        subscribers[0].task.cancel()
+        subscribers[0].writer.close()
+        await wait_for(lambda: subscribers[1].notifier)
+        await publisher.publish(make_snapshot(2))
+        await wait_for(lambda: all(s.version == 2 for s in subscribers[1:]))
+        await asyncio.sleep(0.05)
+        assert notified == ["v1", "v2"]
+        
+        for subscriber in subscribers[1:]:
+            subscriber.task.cancel()
+        publisher.server.close()
+    
+    asyncio.run(scenario())
+
+def run_worker_refresh(monkeypatch, tmp_path, get_snapshot, last_snapshot=None):
+    """Arranca el worker con un scrape simulado y devuelve lo que responde a un refresco pedido"""
+    monkeypatch.setattr(bot.scraper, 'get_snapshot', get_snapshot)
+    monkeypatch.setattr(bot.scraper, 'last_snapshot', last_snapshot)
+    monkeypatch.setattr(bot.banner_history, 'record', lambda snapshot: None)
+    async def enrich(snapshot):
+        return []
+    monkeypatch.setattr(bot.character_enricher, 'enrich', enrich)
+    
+    async def scenario():
+        path = os.path.join(str(tmp_path), "worker.sock")
+        worker = asyncio.create_task(scraper_worker.run(argparse.Namespace(socket=path, interval=3600)))
+        await wait_for(lambda: os.path.exists(path))
+        subscriber = bot.SnapshotSubscriber(path)
+        subscriber.start()
+        await wait_for(lambda: subscriber.writer is not None)
+        
+        start = asyncio.get_running_loop().time()
+        status = await subscriber.request_refresh(timeout=10)
+        elapsed = asyncio.get_running_loop().time() - start
+        
+        subscriber.task.cancel()
+        worker.cancel()
+        return status, elapsed
+    
+    return asyncio.run(scenario())
+
+def test_refresh_is_answered_when_the_worker_scrape_fails(monkeypatch, tmp_path):
+    def get_snapshot():
+        raise bot.ScrapeError("sin red")
+    
+    status, elapsed = run_worker_refresh(monkeypatch, tmp_path, get_snapshot)
+    
+    assert status == 'failed'
+    assert elapsed < 5
+
+def test_refresh_is_answered_when_nothing_changed(monkeypatch, tmp_path):
+    snapshot = make_snapshot(1)
+    
+    status, elapsed = run_worker_refresh(monkeypatch, tmp_path, lambda: snapshot)
+    
+    assert status == 'unchanged'
+    assert elapsed < 5
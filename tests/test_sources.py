@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+import benchmarks
+import bot
+
+PAGE = benchmarks.build_sample_page(filler_kb=20)
+# Al principal le falta el tiempo restante del primer banner; el espejo lo tiene
+PAGE_WITHOUT_TIME = PAGE.replace('<span class="time">12d 5h</span>', '', 1)
+
+@pytest.fixture
+def servers():
+    with benchmarks.StandInServer(PAGE) as primary, benchmarks.StandInServer(PAGE) as mirror:
+        yield primary, mirror
+
+def make_fetcher(primary, mirror):
+    scraper = bot.BannerScraper()
+    sources = [bot.HtmlBannerSource(scraper, "prydwen", primary.url),
+               bot.HtmlBannerSource(scraper, "espejo1", mirror.url)]
+    return bot.HedgedFetcher(sources)
+
+def test_slow_primary_loses_to_the_hedged_mirror(monkeypatch, servers):
+    primary, mirror = servers
+    monkeypatch.setattr(bot, 'HEDGE_DEFAULT_DELAY', 0.2)
+    monkeypatch.setattr(bot, 'HEDGE_MERGE_GRACE', 0.05)
+    primary.latency = 3.0
+    
+    start = time.perf_counter()
+    snapshot = make_fetcher(primary, mirror).fetch()
+    
+    assert time.perf_counter() - start < 2.0
+    assert snapshot.source == "espejo1"
+    assert snapshot.banners
+    assert (primary.requests, mirror.requests) == (1, 1)
+
+def test_erroring_primary_fails_over_without_waiting(monkeypatch, servers):
+    primary, mirror = servers
+    monkeypatch.setattr(bot, 'HEDGE_DEFAULT_DELAY', 30.0)
+    primary.status = 503
+    
+    start = time.perf_counter()
+    snapshot = make_fetcher(primary, mirror).fetch()
+    
+    assert time.perf_counter() - start < 5.0
+    assert snapshot.source == "espejo1"
+    assert snapshot.banners
+
+def test_missing_fields_are_merged_from_the_mirror(monkeypatch, servers):
+    primary, mirror = servers
+    primary.page = PAGE_WITHOUT_TIME.encode('utf-8')
+    # El principal llega primero, pero el espejo (lanzado por cobertura) entra en el margen de combinación
+    monkeypatch.setattr(bot, 'HEDGE_DEFAULT_DELAY', 0.1)
+    monkeypatch.setattr(bot, 'HEDGE_MERGE_GRACE', 5.0)
+    primary.latency = 0.4
+    mirror.latency = 0.4
+    
+    snapshot = make_fetcher(primary, mirror).fetch()
+    
+    assert snapshot.source == "prydwen+espejo1"
+    assert snapshot.banners[0].time_remaining == "12d 5h"
+
+def test_sources_must_implement_fetch():
+    with pytest.raises(TypeError):
+        bot.BannerSource("incompleta")
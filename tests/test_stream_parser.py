@@ -0,0 +1,45 @@
+import os
+
+import bot
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+def split_chunks(text, chunk_size):
+    return (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+
+def event_names(html, chunk_size=bot.STREAM_CHUNK_SIZE, **kwargs):
+    items = bot.iter_accordion_items_from_chunks(split_chunks(html, chunk_size), **kwargs)
+    return [item.find('div', class_='event-name').text for item in items]
+
+def test_events_in_separate_accordions_are_all_parsed():
+    html = read_fixture('two_event_sections.html')
+    
+    # Trozos pequeños: el corte no puede depender de dónde caen los límites
+    for chunk_size in (64, 1024, bot.STREAM_CHUNK_SIZE):
+        assert event_names(html, chunk_size) == [
+            "Deadly Dancer 0", "Evil March Strikes Back 1",
+            "Full of Malice 2", "Seer Strategist 3", "Memory of Chaos (3.1)"
+        ]
+
+def test_parsing_stops_at_the_first_section_after_the_events():
+    html = read_fixture('two_event_sections.html')
+    snapshot = bot.scraper.build_snapshot(bot.iter_accordion_items_from_chunks(split_chunks(html, 64)))
+    
+    assert "Bone of My Sword 5" not in [banner.name for banner in snapshot.banners]
+    assert len(snapshot.banners) == 4
+    assert len(snapshot.endgame) == 1
+
+def test_page_without_stop_marker_is_read_to_the_end():
+    html = read_fixture('two_event_sections.html').replace('class="tier-list"', 'class="more-events"')
+    
+    assert event_names(html)[-1] == "Bone of My Sword 5"
+    assert event_names(html, stop_classes={'more-events'})[-1] == "Memory of Chaos (3.1)"
+
+def test_empty_stop_classes_disable_the_early_stop():
+    html = read_fixture('two_event_sections.html')
+    
+    assert event_names(html, stop_classes=set())[-1] == "Bone of My Sword 5"
@@ -0,0 +1,19 @@
+import os
+
+import bot
+
+def test_importing_bot_does_not_open_trace_file():
+    assert bot.tracer.exporter is None
+    assert not os.path.exists(bot.TRACE_FILE)
+    with bot.tracer.trace("scrape") as span:
+        assert span is bot.NOOP_SPAN
+
+def test_tracer_starts_only_with_a_path(tmp_path):
+    tracer = bot.Tracer()
+    tracer.start('')
+    assert tracer.exporter is None
+    
+    path = tmp_path / "trazas.jsonl"
+    tracer.start(str(path))
+    assert tracer.exporter is not None
+    assert path.exists()